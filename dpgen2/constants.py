@@ -7,9 +7,13 @@ lmp_index_pattern = "%06d"
 lmp_task_pattern = 'task.' + lmp_index_pattern
 lmp_conf_name = 'conf.lmp'
 lmp_input_name = 'in.lammps'
+lmp_input_spec_name = 'in.lammps.json'
 lmp_traj_name = 'traj.dump'
 lmp_log_name = 'log.lammps'
 lmp_model_devi_name = 'model_devi.out'
+lmp_file_store_name = 'file_store'
+lmp_partition_input_name = 'in.partition.lammps'
+lmp_partition_log_name = 'log.partition.lammps'
 vasp_index_pattern = '%06d'
 vasp_task_pattern = 'task.' + vasp_index_pattern
 vasp_conf_name = 'POSCAR'
@@ -18,6 +22,8 @@ vasp_pot_name = 'POTCAR'
 vasp_kp_name = 'KPOINTS'
 vasp_default_log_name = 'vasp.log'
 vasp_default_out_data_name = 'data'
+fingerprint_index_name = 'fingerprints.npz'
+fingerprint_table_name = 'fingerprint_tables.npz'
 
 default_image = 'dptechnology/dpgen2:latest'
 default_host = '127.0.0.1:2746'
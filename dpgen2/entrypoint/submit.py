@@ -31,6 +31,7 @@ from dpgen2.op import (
     RunDPTrain,
     PrepLmp,
     RunLmp,
+    RunLmpPartition,
     PrepVasp,
     RunVasp,
     SelectConfs,
@@ -51,15 +52,21 @@ from dpgen2.fp import (
 from dpgen2.exploration.scheduler import (
     ExplorationScheduler,
     ConvergenceCheckStageScheduler,
+    MDLengthPolicy,
 )
 from dpgen2.exploration.task import (
     ExplorationStage,
     ExplorationTask,
     NPTTaskGroup,
+    LazyNPTTaskGroup,
 )
 from dpgen2.exploration.selector import (
     ConfSelectorLammpsFrames,
     TrustLevel,
+    TrustLevelPolicy,
+    ConfFilters,
+    DistanceConfFilter,
+    ClusterConfFilter,
 )
 from dpgen2.constants import (
     default_image,
@@ -75,6 +82,10 @@ from dpgen2.utils import (
     workflow_config_from_dict,
     matched_step_key,
 )
+from dpgen2.utils.fingerprint import (
+    default_fingerprint_rcut,
+    default_fingerprint_nbins,
+)
 from dpgen2.utils.step_config import normalize as normalize_step_dict
 from dpgen2.entrypoint.submit_args import normalize as normalize_submit_args
 from typing import (
@@ -110,6 +121,10 @@ def make_concurrent_learning_op (
         collect_data_config : str = default_config,
         cl_step_config : str = default_config,
         upload_python_package : bool = None,
+        explore_group_size : int = None,
+        explore_pool_size : int = None,
+        explore_partition : bool = False,
+        fingerprint_config : dict = None,
 ):
     if train_style == 'dp':
         prep_run_train_op = PrepRunDPTrain(
@@ -126,10 +141,12 @@ def make_concurrent_learning_op (
         prep_run_explore_op = PrepRunLmp(
             "prep-run-lmp",
             PrepLmp,
-            RunLmp,
+            RunLmpPartition if explore_partition else RunLmp,
             prep_config = prep_explore_config,
             run_config = run_explore_config,
             upload_python_package = upload_python_package,
+            group_size = explore_group_size,
+            pool_size = explore_pool_size,
         )
     else:
         raise RuntimeError(f'unknown explore_style {explore_style}')
@@ -156,6 +173,7 @@ def make_concurrent_learning_op (
         select_confs_config = select_confs_config,
         collect_data_config = collect_data_config,
         upload_python_package = upload_python_package,
+        fingerprint_config = fingerprint_config,
     )    
     # dpgen
     dpgen_op = ConcurrentLearning(
@@ -215,11 +233,43 @@ def make_naive_exploration_scheduler(
     conv_accuracy = config['conv_accuracy'] if old_style else config['explore']['conv_accuracy']
     max_numb_iter = config['max_numb_iter'] if old_style else config['explore']['max_numb_iter']
     fatal_at_max = config.get('fatal_at_max', True) if old_style else config['explore']['fatal_at_max']
+    select_confs_config = config.get('select_confs_config', {}) if old_style else config['step_configs']['select_confs_config']
+    select_nproc = select_confs_config.get('nproc', 1)
+    select_mode = config.get('select_mode', 'random') if old_style else config['explore']['select_mode']
+    auto_trust_level = config.get('auto_trust_level', False) if old_style else config['explore']['auto_trust_level']
+    auto_trust_level_max_scale = config.get('auto_trust_level_max_scale', 2.) if old_style else config['explore']['auto_trust_level_max_scale']
+    auto_trust_level_f_lo_bounds = config.get('auto_trust_level_f_lo_bounds') if old_style else config['explore']['auto_trust_level_f_lo_bounds']
+    auto_trust_level_f_hi_bounds = config.get('auto_trust_level_f_hi_bounds') if old_style else config['explore']['auto_trust_level_f_hi_bounds']
+    dedup_tol = config.get('dedup_tol') if old_style else config['explore']['dedup_tol']
+    fingerprint_rcut = config.get('fingerprint_rcut', default_fingerprint_rcut) if old_style else config['explore']['fingerprint_rcut']
+    fingerprint_nbins = config.get('fingerprint_nbins', default_fingerprint_nbins) if old_style else config['explore']['fingerprint_nbins']
+    min_dist = config.get('min_dist') if old_style else config['explore']['min_dist']
+    cluster_cutoff = config.get('cluster_cutoff') if old_style else config['explore']['cluster_cutoff']
+    carve_radius = config.get('carve_radius') if old_style else config['explore']['carve_radius']
+    carve_vacuum = config.get('carve_vacuum', 10.) if old_style else config['explore']['carve_vacuum']
+    lazy_tasks = config.get('lazy_tasks', False) if old_style else config['explore']['lazy_tasks']
+    input_spec = config.get('input_spec', False) if old_style else config['explore']['input_spec']
+    dump_on_devi = config.get('dump_on_devi', False) if old_style else config['explore']['dump_on_devi']
+    if dump_on_devi and auto_trust_level:
+        # the frames below the tuned trust levels would not be dumped
+        raise RuntimeError('dump_on_devi is not compatible with auto_trust_level')
+    halt_patience = config.get('halt_patience') if old_style else config['explore']['halt_patience']
+    restart_from_trajs = config.get('restart_from_trajs', False) if old_style else config['explore']['restart_from_trajs']
+    if dump_on_devi and restart_from_trajs:
+        # the accurate frames to restart from would not be dumped
+        raise RuntimeError('dump_on_devi is not compatible with restart_from_trajs')
+    prune_patience = config.get('prune_patience') if old_style else config['explore']['prune_patience']
+    prune_n_sample = config.get('prune_n_sample', 0) if old_style else config['explore']['prune_n_sample']
+    adaptive_nsteps = config.get('adaptive_nsteps', False) if old_style else config['explore']['adaptive_nsteps']
+    nsteps_scale_bounds = config.get('nsteps_scale_bounds', [0.25, 4.]) if old_style else config['explore']['nsteps_scale_bounds']
+    f_trust_lo = config['model_devi_f_trust_lo'] if old_style else config['explore']['f_trust_lo']
+    f_trust_hi = config['model_devi_f_trust_hi'] if old_style else config['explore']['f_trust_hi']
+    v_trust_lo = config.get('model_devi_v_trust_lo') if old_style else config['explore']['v_trust_lo']
     scheduler = ExplorationScheduler()
 
     for job in model_devi_jobs:
         # task group
-        tgroup = NPTTaskGroup()
+        tgroup = LazyNPTTaskGroup() if lazy_tasks else NPTTaskGroup()
         ##  ignore the expansion of sys_idx
         # get all file names of md initial configurations
         try:
@@ -248,7 +298,15 @@ def make_naive_exploration_scheduler(
             press = press,
             ens = ensemble,
             nsteps = nsteps,
+            use_clusters = carve_radius is not None,
+            input_spec = input_spec,
+            dump_f_trust_lo = f_trust_lo if dump_on_devi else None,
+            dump_v_trust_lo = v_trust_lo if dump_on_devi else None,
+            halt_f_trust_hi = f_trust_hi if halt_patience is not None else None,
+            halt_patience = halt_patience if halt_patience is not None else 1,
         )
+        if prune_patience is not None:
+            tgroup.set_pruning(conv_accuracy, prune_patience, prune_n_sample)
         tasks = tgroup.make_task()
         # stage
         stage = ExplorationStage()
@@ -260,10 +318,26 @@ def make_naive_exploration_scheduler(
             level_v_lo=config.get('model_devi_v_trust_lo') if old_style else config['explore']['v_trust_lo'],
             level_v_hi=config.get('model_devi_v_trust_hi') if old_style else config['explore']['v_trust_hi'],
         )
+        # conf filters
+        conf_filters = None
+        if min_dist is not None or cluster_cutoff is not None:
+            conf_filters = ConfFilters()
+            if min_dist is not None:
+                conf_filters.add(DistanceConfFilter(min_dist))
+            if cluster_cutoff is not None:
+                conf_filters.add(ClusterConfFilter(cluster_cutoff))
         # selector
         selector = ConfSelectorLammpsFrames(
             trust_level,
             fp_task_max,
+            conf_filters = conf_filters,
+            nproc = select_nproc,
+            select_mode = select_mode,
+            dedup_tol = dedup_tol,
+            fingerprint_rcut = fingerprint_rcut,
+            fingerprint_nbins = fingerprint_nbins,
+            carve_radius = carve_radius,
+            carve_vacuum = carve_vacuum,
         )
         # stage_scheduler
         stage_scheduler = ConvergenceCheckStageScheduler(
@@ -272,6 +346,14 @@ def make_naive_exploration_scheduler(
             conv_accuracy = conv_accuracy,
             max_numb_iter = max_numb_iter,
             fatal_at_max = fatal_at_max,
+            trust_level_policy = TrustLevelPolicy(
+                fp_task_max,
+                level_f_lo_bounds = auto_trust_level_f_lo_bounds,
+                level_f_hi_bounds = auto_trust_level_f_hi_bounds,
+                max_scale = auto_trust_level_max_scale,
+            ) if auto_trust_level else None,
+            restart_from_trajs = restart_from_trajs,
+            md_length_policy = MDLengthPolicy(scale_bounds=nsteps_scale_bounds) if adaptive_nsteps else None,
         )
         # scheduler
         scheduler.add_stage_scheduler(stage_scheduler)
@@ -310,13 +392,30 @@ def workflow_concurrent_learning(
     run_train_config = normalize_step_dict(config.get('run_train_config', default_config)) if old_style else config['step_configs']['run_train_config']
     prep_explore_config = normalize_step_dict(config.get('prep_explore_config', default_config)) if old_style else config['step_configs']['prep_explore_config']
     run_explore_config = normalize_step_dict(config.get('run_explore_config', default_config)) if old_style else config['step_configs']['run_explore_config']
+    # group_size, pool_size and partition are used by the slices, they are not configs of the step
+    explore_group_size = run_explore_config.get('group_size')
+    explore_pool_size = run_explore_config.get('pool_size')
+    explore_partition = run_explore_config.get('partition', False)
+    run_explore_config = {kk: vv for kk, vv in run_explore_config.items() if kk not in ['group_size', 'pool_size', 'partition']}
     prep_fp_config = normalize_step_dict(config.get('prep_fp_config', default_config)) if old_style else config['step_configs']['prep_fp_config']
     run_fp_config = normalize_step_dict(config.get('run_fp_config', default_config)) if old_style else config['step_configs']['run_fp_config']
     select_confs_config = normalize_step_dict(config.get('select_confs_config', default_config)) if old_style else config['step_configs']['select_confs_config']
+    # nproc is used by the conf selector, it is not a config of the step
+    select_confs_config = {kk: vv for kk, vv in select_confs_config.items() if kk != 'nproc'}
     collect_data_config = normalize_step_dict(config.get('collect_data_config', default_config)) if old_style else config['step_configs']['collect_data_config']
     cl_step_config = normalize_step_dict(config.get('cl_step_config', default_config)) if old_style else config['step_configs']['cl_step_config']
     upload_python_package = config.get('upload_python_package', None)
     init_models_paths = config.get('training_iter0_model_path')
+    # the fingerprints of the labeled frames are used to skip the 
+    # near-duplicates, and are written only if dedup is enabled
+    dedup_tol = config.get('dedup_tol') if old_style else config['explore']['dedup_tol']
+    fingerprint_config = None
+    if dedup_tol is not None:
+        fingerprint_config = {
+            'tol' : dedup_tol,
+            'rcut' : config.get('fingerprint_rcut', default_fingerprint_rcut) if old_style else config['explore']['fingerprint_rcut'],
+            'nbins' : config.get('fingerprint_nbins', default_fingerprint_nbins) if old_style else config['explore']['fingerprint_nbins'],
+        }
 
     concurrent_learning_op = make_concurrent_learning_op(
         train_style,
@@ -332,6 +431,10 @@ def workflow_concurrent_learning(
         collect_data_config = collect_data_config,
         cl_step_config = cl_step_config,
         upload_python_package = upload_python_package,
+        explore_group_size = explore_group_size,
+        explore_pool_size = explore_pool_size,
+        explore_partition = explore_partition,
+        fingerprint_config = fingerprint_config,
     )
     scheduler = make_naive_exploration_scheduler(config, old_style=old_style)
 
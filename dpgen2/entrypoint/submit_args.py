@@ -12,6 +12,10 @@ from dpgen2.utils import (
     step_conf_args,
     normalize_step_dict,
 )
+from dpgen2.utils.fingerprint import (
+    default_fingerprint_rcut,
+    default_fingerprint_nbins,
+)
 
 def dp_train_args():
     doc_numb_models = "Number of models trained for evaluating the model deviation"
@@ -42,6 +46,27 @@ def lmp_args():
     doc_configuration_prefix = "The path prefix of lmp initial configurations"
     doc_configuration = "A list of initial configurations."
     doc_stages = "A list of exploration stages."
+    doc_select_mode = "How the candidates are picked if there are more than `fp/task_max`. `random`: uniformly random. `topk`: the candidates with the largest model deviations. `weighted`: random, weighted by the model deviation. `fps`: the most diverse candidates by the farthest point sampling on the structural fingerprints."
+    doc_auto_trust_level = "Tune the force trust levels after each iteration from the histogram of the force model deviation, so the number of candidates is close to `fp/task_max`. The ratio of the higher and lower trust levels is kept. The convergence is still checked by the configured trust levels."
+    doc_auto_trust_level_max_scale = "With `auto_trust_level`, the tuned force trust levels are bounded within the configured ones divided and multiplied by this scale, unless either `auto_trust_level_f_lo_bounds` or `auto_trust_level_f_hi_bounds` is set. No default bound if not set."
+    doc_auto_trust_level_f_lo_bounds = "With `auto_trust_level`, the lower and upper bounds of the tuned `f_trust_lo`. `null` for no bound."
+    doc_auto_trust_level_f_hi_bounds = "With `auto_trust_level`, the lower and upper bounds of the tuned `f_trust_hi`. `null` for no bound."
+    doc_dedup_tol = "Remove the near-duplicated candidates before they are picked. Two candidates are near-duplicates if the Euclidean distance between their radial fingerprints is not larger than this tolerance. The candidates near-duplicated to the frames labeled in the previous iterations are also removed, for which the fingerprints of the labeled frames are written in the iteration data. No dedup if not set."
+    doc_fingerprint_rcut = "The cut-off radius of the radial fingerprints used by `dedup_tol`."
+    doc_fingerprint_nbins = "The number of bins of the radial fingerprints used by `dedup_tol`."
+    doc_min_dist = "The selected configurations having any pair of atoms closer than this distance are rejected. No check if not set."
+    doc_cluster_cutoff = "The selected configurations are rejected if the atoms fragment into more than one cluster, two atoms are in the same cluster if they are closer than this cut-off. No check if not set."
+    doc_carve_radius = "If set, the per-atom force model deviations are written by LAMMPS, and a spherical cluster of this radius centered at the atom with the largest force model deviation is carved from each selected configuration, placed in a cubic box with vacuum, and sent to the FP calculation instead of the configuration. No carving if not set."
+    doc_carve_vacuum = "The thickness of the vacuum between the carved cluster and its periodic images."
+    doc_input_spec = "The LAMMPS tasks carry the MD settings, the temperature, pressure and the velocity seed as a small json spec instead of the rendered LAMMPS input, and the input is rendered by the LAMMPS run step."
+    doc_dump_on_devi = "LAMMPS dumps a frame only if its force model deviation is not lower than `f_trust_lo`, or its virial model deviation is not lower than `v_trust_lo` if it is set. The accurate frames are not dumped, while the model deviations of all the frames are still written. Needs LAMMPS with the PYTHON package, the LAMMPS python module and `dump_modify skip`. Supports single-rank LAMMPS runs only, as only the rank 0 writes the model deviations, and a run of more ranks stops with an error. Not compatible with `auto_trust_level`."
+    doc_halt_patience = "If set, the LAMMPS run is stopped once the force model deviation is not lower than `f_trust_hi` for this number of consecutive records of the model deviation, the frames after that are failed anyway. Needs LAMMPS with the PYTHON package. No stop if not set."
+    doc_restart_from_trajs = "If the stage is not converged, the LAMMPS tasks of the next iteration start from the last accurate or candidate frames of the trajectories of this iteration, instead of the configurations sampled from `configurations`. Not compatible with `dump_on_devi`."
+    doc_prune_patience = "If set, a pair of temperature and pressure of a stage is pruned once the ratio of the accurate frames of its LAMMPS tasks is not lower than `conv_accuracy` for this number of consecutive iterations, and the hard pairs keep being explored. The pair is not pruned any more once its accuracy falls below `conv_accuracy`. No pruning if not set."
+    doc_prune_n_sample = "The number of configurations explored at a pruned pair of temperature and pressure. The pruned pair is dropped if 0."
+    doc_adaptive_nsteps = "The `nsteps` and `trj_freq` of the stages are scaled in each iteration from the report of the last iteration: halved if the failed ratio is higher than 0.1, doubled if the failed ratio is not higher than 0.01 and the accurate ratio is not lower than 0.5. The number of frames of each trajectory is kept."
+    doc_nsteps_scale_bounds = "The lower and upper bounds of the scale of `nsteps` and `trj_freq` with `adaptive_nsteps`."
+    doc_lazy_tasks = "Make the LAMMPS tasks on demand. Only the configurations, the sampled configuration indexes and the MD settings are passed to the task preparation, instead of all the rendered tasks."
 
     return [
         Argument("config", dict, RunLmp.lmp_args(), optional=True, default=RunLmp.normalize_config({}), doc=doc_config),
@@ -55,6 +80,27 @@ def lmp_args():
         Argument("configuration_prefix", str, optional=True, default=None, doc=doc_configuration_prefix),
         Argument("configurations", list, optional=False, doc=doc_configuration, alias=["configuration"]),
         Argument("stages", list, optional=False, doc=doc_stages),
+        Argument("auto_trust_level", bool, optional=True, default=False, doc=doc_auto_trust_level),
+        Argument("auto_trust_level_max_scale", float, optional=True, default=2., doc=doc_auto_trust_level_max_scale),
+        Argument("auto_trust_level_f_lo_bounds", list, optional=True, default=None, doc=doc_auto_trust_level_f_lo_bounds),
+        Argument("auto_trust_level_f_hi_bounds", list, optional=True, default=None, doc=doc_auto_trust_level_f_hi_bounds),
+        Argument("select_mode", str, optional=True, default='random', doc=doc_select_mode),
+        Argument("dedup_tol", float, optional=True, default=None, doc=doc_dedup_tol),
+        Argument("fingerprint_rcut", float, optional=True, default=default_fingerprint_rcut, doc=doc_fingerprint_rcut),
+        Argument("fingerprint_nbins", int, optional=True, default=default_fingerprint_nbins, doc=doc_fingerprint_nbins),
+        Argument("min_dist", float, optional=True, default=None, doc=doc_min_dist),
+        Argument("cluster_cutoff", float, optional=True, default=None, doc=doc_cluster_cutoff),
+        Argument("carve_radius", float, optional=True, default=None, doc=doc_carve_radius),
+        Argument("carve_vacuum", float, optional=True, default=10., doc=doc_carve_vacuum),
+        Argument("lazy_tasks", bool, optional=True, default=False, doc=doc_lazy_tasks),
+        Argument("input_spec", bool, optional=True, default=False, doc=doc_input_spec),
+        Argument("dump_on_devi", bool, optional=True, default=False, doc=doc_dump_on_devi),
+        Argument("halt_patience", int, optional=True, default=None, doc=doc_halt_patience),
+        Argument("restart_from_trajs", bool, optional=True, default=False, doc=doc_restart_from_trajs),
+        Argument("prune_patience", int, optional=True, default=None, doc=doc_prune_patience),
+        Argument("prune_n_sample", int, optional=True, default=0, doc=doc_prune_n_sample),
+        Argument("adaptive_nsteps", bool, optional=True, default=False, doc=doc_adaptive_nsteps),
+        Argument("nsteps_scale_bounds", list, optional=True, default=[0.25, 4.], doc=doc_nsteps_scale_bounds),
     ]
 
 def variant_explore():
@@ -120,6 +166,24 @@ def default_step_config_args():
     ]
 
 
+def select_confs_step_config_args():
+    doc_nproc = "Number of processes used to classify the trajectories and extract the selected frames in the select confs step."
+    return step_conf_args() + [
+        Argument("nproc", int, optional=True, default=1, doc=doc_nproc),
+    ]
+
+
+def run_explore_step_config_args():
+    doc_group_size = "The number of exploration tasks packed in one slice of the run exploration step. Each task is run in one slice if not set."
+    doc_pool_size = "The number of exploration tasks run in parallel in one slice. The tasks of a slice are run sequentially if not set."
+    doc_partition = "Run the tasks of a slice in one LAMMPS run in the multi-partition mode. The `group_size` should be set and the `pool_size` should not be set. Each task runs in its own partition, i.e. its own LAMMPS world, so each task still loads the models by itself. The only gain over running the tasks of a slice sequentially is fewer process launches."
+    return step_conf_args() + [
+        Argument("group_size", int, optional=True, default=None, doc=doc_group_size),
+        Argument("pool_size", int, optional=True, default=None, doc=doc_pool_size),
+        Argument("partition", bool, optional=True, default=False, doc=doc_partition),
+    ]
+
+
 def dpgen_step_config_args(default_config):
     doc_prep_train_config = "Configuration for prepare train"
     doc_run_train_config = "Configuration for run train"
@@ -135,10 +199,10 @@ def dpgen_step_config_args(default_config):
         Argument("prep_train_config", dict, step_conf_args(), optional=True, default=default_config, doc=doc_prep_train_config),
         Argument("run_train_config", dict, step_conf_args(), optional=True, default=default_config, doc=doc_run_train_config),
         Argument("prep_explore_config", dict, step_conf_args(), optional=True, default=default_config, doc=doc_prep_explore_config),
-        Argument("run_explore_config", dict, step_conf_args(), optional=True, default=default_config, doc=doc_run_explore_config),
+        Argument("run_explore_config", dict, run_explore_step_config_args(), optional=True, default=default_config, doc=doc_run_explore_config),
         Argument("prep_fp_config", dict, step_conf_args(), optional=True, default=default_config, doc=doc_prep_fp_config),
         Argument("run_fp_config", dict, step_conf_args(), optional=True, default=default_config, doc=doc_run_fp_config),
-        Argument("select_confs_config", dict, step_conf_args(), optional=True, default=default_config, doc=doc_select_confs_config),
+        Argument("select_confs_config", dict, select_confs_step_config_args(), optional=True, default=default_config, doc=doc_select_confs_config),
         Argument("collect_data_config", dict, step_conf_args(), optional=True, default=default_config, doc=doc_collect_data_config),
         Argument("cl_step_config", dict, step_conf_args(), optional=True, default=default_config, doc=doc_cl_step_config),
     ]
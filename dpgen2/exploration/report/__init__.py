@@ -1,6 +1,9 @@
 from .report import (
     ExplorationReport,
 )
+from .compact_report import (
+    CompactExplorationReport,
+)
 from .naive_report import (
     NaiveExplorationReport,
 )
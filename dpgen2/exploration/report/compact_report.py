@@ -0,0 +1,141 @@
+import numpy as np
+from . import ExplorationReport
+from typing import (
+    List,
+    Tuple,
+    Optional,
+)
+
+class CompactExplorationReport(ExplorationReport):
+    """
+    The compact form of an exploration report. Only the numbers of the
+    accurate, candidate and failed frames of each trajectory, the model
+    deviation histograms and the picked candidates are kept, all stored
+    in `numpy` arrays, so the report is small and fast to pickle.
+
+    Parameters
+    ----------
+    traj_counts : numpy.ndarray
+        The numbers of the accurate, candidate and failed frames of each
+        trajectory, of shape ntraj x 3.
+    traj_cand_picked : List[Tuple[int,int]]
+        The picked candidates, [(traj_idx, frame_idx), ...].
+    model_devi_f_hist : numpy.ndarray
+        The histogram of the force model deviation, binned by the left
+        edges `hist_edges` shared by all the reports. `None` if the 
+        histograms are not recorded.
+    model_devi_v_hist : numpy.ndarray
+        The histogram of the virial model deviation.
+    traj_last_good : List[int]
+        The index of the last accurate or candidate frame of each
+        trajectory, -1 if none. `None` if not recorded.
+    ref_counts : numpy.ndarray
+        The numbers of the accurate, candidate and failed frames judged
+        by the reference trust levels. `None` if not recorded.
+
+    """
+    # left edges of the bins of the model deviation histograms. the first
+    # bin collects the deviations below 1e-3, the last one those above 1e2.
+    hist_edges = np.concatenate(([0.], np.geomspace(1e-3, 1e2, 251)))
+
+    def __init__(
+            self,
+            traj_counts : np.ndarray,
+            traj_cand_picked : List[Tuple[int,int]] = None,
+            model_devi_f_hist : np.ndarray = None,
+            model_devi_v_hist : np.ndarray = None,
+            traj_last_good : List[int] = None,
+            ref_counts : np.ndarray = None,
+    ):
+        self.traj_counts = np.asarray(traj_counts, dtype=np.int64).reshape(-1, 3)
+        self.cand_picked = np.asarray(
+            [] if traj_cand_picked is None else traj_cand_picked,
+            dtype=np.int64).reshape(-1, 2)
+        self.model_devi_f_hist = model_devi_f_hist
+        self.model_devi_v_hist = model_devi_v_hist
+        self.last_good = None if traj_last_good is None else \
+            np.asarray(traj_last_good, dtype=np.int64)
+        self.ref_counts = None if ref_counts is None else \
+            np.asarray(ref_counts, dtype=np.int64)
+
+    def __getstate__(self):
+        return {
+            'traj_counts' : self.traj_counts,
+            'cand_picked' : self.cand_picked,
+            'model_devi_f_hist' : self.model_devi_f_hist,
+            'model_devi_v_hist' : self.model_devi_v_hist,
+            'last_good' : self.last_good,
+            'ref_counts' : self.ref_counts,
+        }
+
+    @property
+    def traj_nframes(self) -> List[int]:
+        """The number of frames of the trajectories."""
+        return self.traj_counts.sum(axis=1).tolist()
+
+    @property
+    def traj_cand_picked(self) -> List[Tuple[int,int]]:
+        """The picked candidates, [(traj_idx, frame_idx), ...]."""
+        return [(int(ii[0]), int(ii[1])) for ii in self.cand_picked]
+
+    @property
+    def numb_accu(self) -> int:
+        return int(self.traj_counts[:,0].sum())
+
+    @property
+    def numb_cand(self) -> int:
+        return int(self.traj_counts[:,1].sum())
+
+    @property
+    def numb_fail(self) -> int:
+        return int(self.traj_counts[:,2].sum())
+
+    def _ratio(
+            self,
+            numb,
+    ) -> float:
+        return float(numb) / float(self.traj_counts.sum())
+
+    def failed_ratio(
+            self,
+            tag = None,
+    ):
+        return self._ratio(self.numb_fail)
+
+    def accurate_ratio(
+            self,
+            tag = None,
+    ):
+        return self._ratio(self.numb_accu)
+
+    def candidate_ratio(
+            self,
+            tag = None,
+    ):
+        return self._ratio(self.numb_cand)
+
+    def traj_frame_counts(
+            self,
+    ) -> np.ndarray:
+        return self.traj_counts.copy()
+
+    def reference_ratios(
+            self,
+    ) -> Optional[Tuple[float, float, float]]:
+        if self.ref_counts is None:
+            return None
+        return tuple((self.ref_counts / float(self.ref_counts.sum())).tolist())
+
+    def traj_last_good_frames(
+            self,
+    ) -> Optional[List[int]]:
+        if self.last_good is None:
+            return None
+        return self.last_good.tolist()
+
+    def model_devi_hist(
+            self,
+    ) -> Optional[Tuple[np.ndarray, np.ndarray]] :
+        if self.model_devi_f_hist is None:
+            return None
+        return self.hist_edges, self.model_devi_f_hist
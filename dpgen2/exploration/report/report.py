@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import Tuple
+from typing import Tuple, Optional, List
+import numpy as np
 
 class ExplorationReport(ABC):
     def __init__(self):
@@ -27,3 +28,72 @@ class ExplorationReport(ABC):
         pass
 
 
+
+    def model_devi_hist (
+            self,
+    ) -> Optional[Tuple[np.ndarray, np.ndarray]] :
+        """The histogram of the force model deviation of all the frames.
+
+        Returns
+        -------
+        hist : Tuple[numpy.ndarray, numpy.ndarray] or None
+                The left edges of the bins and the counts of frames in
+                the bins. The last bin has no right edge. `None` if the
+                report does not record the histogram.
+
+        """
+        return None
+
+    def reference_ratios (
+            self,
+    ) -> Optional[Tuple[float, float, float]] :
+        """The accurate, candidate and failed ratios judged by the 
+        reference trust levels, e.g. the configured trust levels when the
+        trust levels of the selection are tuned.
+
+        Returns
+        -------
+        ratios : Tuple[float, float, float] or None
+                The ratios. `None` if the report does not record them.
+
+        """
+        return None
+
+    def traj_last_good_frames (
+            self,
+    ) -> Optional[List[int]] :
+        """The index of the last frame that is not failed, i.e. the last
+        accurate or candidate frame, of each trajectory.
+
+        Returns
+        -------
+        frames : List[int] or None
+                The frame indexes, -1 if all the frames of the trajectory
+                are failed. `None` if the report does not record them.
+
+        """
+        return None
+
+    def traj_frame_counts (
+            self,
+    ) -> Optional[np.ndarray] :
+        """The numbers of the accurate, candidate and failed frames of 
+        each trajectory.
+
+        Returns
+        -------
+        counts : numpy.ndarray or None
+                The numbers of frames of shape ntraj x 3. `None` if the 
+                report does not record them.
+
+        """
+        return None
+
+    def compact (
+            self,
+    ) -> "ExplorationReport" :
+        """The compact form of the report, which is retained by the
+        schedulers. By default the report itself.
+
+        """
+        return self
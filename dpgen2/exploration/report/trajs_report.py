@@ -1,12 +1,28 @@
 import numpy as np
 import random
-from . import ExplorationReport
+from . import ExplorationReport, CompactExplorationReport
+from dflow.python import (
+    FatalError,
+)
 from typing import (
     List,
     Tuple,
+    Set,
+    Optional,
 )
 
 class TrajsExplorationReport(ExplorationReport):
+    """
+    The exploration report of trajectories. The status of each frame is
+    stored in an `int8` array per trajectory, the value is one of
+    `status_accurate`, `status_candidate` and `status_failed`.
+
+    """
+    status_accurate = 0
+    status_candidate = 1
+    status_failed = 2
+    hist_edges = CompactExplorationReport.hist_edges
+
     def __init__(
             self,
     ):
@@ -16,10 +32,37 @@ class TrajsExplorationReport(ExplorationReport):
             self,
     ):
         self.traj_nframes = []
-        self.traj_cand = []
-        self.traj_accu = []
-        self.traj_fail = []        
+        self.traj_status = []
         self.traj_cand_picked = []
+        self.traj_cand_excluded = {}
+        self.numb_accu = 0
+        self.numb_cand = 0
+        self.numb_fail = 0
+        self.ref_counts = None
+        self.model_devi_f_hist = np.zeros(self.hist_edges.size, dtype=np.int64)
+        self.model_devi_v_hist = np.zeros(self.hist_edges.size, dtype=np.int64)
+
+    @staticmethod
+    def _make_hist(
+            model_devi,
+    ) -> np.ndarray:
+        edges = TrajsExplorationReport.hist_edges
+        idx = np.searchsorted(edges, model_devi, side='right') - 1
+        return np.bincount(np.maximum(idx, 0), minlength=edges.size)
+
+    @staticmethod
+    def _make_status(
+            nframes,
+            id_accu,
+            id_cand,
+            id_fail,
+    ) -> np.ndarray:
+        status = np.full(nframes, -1, dtype=np.int8)
+        status[np.asarray(id_accu, dtype=int)] = TrajsExplorationReport.status_accurate
+        status[np.asarray(id_cand, dtype=int)] = TrajsExplorationReport.status_candidate
+        status[np.asarray(id_fail, dtype=int)] = TrajsExplorationReport.status_failed
+        assert(np.all(status >= 0))
+        return status
 
     def record_traj(
             self,
@@ -29,9 +72,16 @@ class TrajsExplorationReport(ExplorationReport):
             id_v_accu,
             id_v_cand,
             id_v_fail,
+            model_devi_f = None,
+            model_devi_v = None,
+            ref_counts = None,
     ):
         """
-        Record one trajctory. inputs are the indexes of candidate, accurate and failed frames. 
+        Record one trajctory. inputs are the indexes of candidate, accurate and failed frames.
+        If the force and virial model deviations of the frames are provided,
+        they are recorded in the histograms. The numbers of the accurate,
+        candidate and failed frames judged by the reference trust levels,
+        if provided as `ref_counts`, are summed up for `reference_ratios`.
 
         """
         # check consistency
@@ -42,79 +92,214 @@ class TrajsExplorationReport(ExplorationReport):
         nframes = np.size(np.concatenate((id_f_cand, id_f_accu, id_f_fail)))
         if (not novirial) and nframes != np.size(np.concatenate((id_v_cand, id_v_accu, id_v_fail))):
             raise FatalError("number of frames by virial ")
-        # nframes
-        # to sets
-        set_f_accu = set(id_f_accu)
-        set_f_cand = set(id_f_cand)
-        set_f_fail = set(id_f_fail)
-        set_v_accu = set([ii for ii in range(nframes)]) if novirial else set(id_v_accu)
-        set_v_cand = set([]) if novirial else set(id_v_cand)
-        set_v_fail = set([]) if novirial else set(id_v_fail)
-        # accu, cand, fail
-        set_accu = set_f_accu & set_v_accu
-        set_cand = ( (set_f_cand & set_v_accu) | 
-                     (set_f_cand & set_v_cand) | 
-                     (set_f_accu & set_v_cand) )
-        set_fail = ( set_f_fail | set_v_fail)
-        # check size
-        assert(nframes == len(set_accu | set_cand | set_fail))
-        assert(0 == len(set_accu & set_cand))
-        assert(0 == len(set_accu & set_fail))
-        assert(0 == len(set_cand & set_fail))
+        # status by force and virial
+        status = TrajsExplorationReport._make_status(
+            nframes, id_f_accu, id_f_cand, id_f_fail)
+        if not novirial:
+            status_v = TrajsExplorationReport._make_status(
+                nframes, id_v_accu, id_v_cand, id_v_fail)
+            # accurate only if both are accurate, failed if any is failed,
+            # otherwise candidate
+            status = np.maximum(status, status_v)
         # record
+        counts = np.bincount(status, minlength=3)
         self.traj_nframes.append(nframes)
-        self.traj_cand.append(set_cand)
-        self.traj_accu.append(set_accu)
-        self.traj_fail.append(set_fail)
+        self.traj_status.append(status)
+        self.numb_accu += int(counts[TrajsExplorationReport.status_accurate])
+        self.numb_cand += int(counts[TrajsExplorationReport.status_candidate])
+        self.numb_fail += int(counts[TrajsExplorationReport.status_failed])
+        if model_devi_f is not None:
+            self.model_devi_f_hist += TrajsExplorationReport._make_hist(model_devi_f)
+        if model_devi_v is not None:
+            self.model_devi_v_hist += TrajsExplorationReport._make_hist(model_devi_v)
+        if ref_counts is not None:
+            if self.ref_counts is None:
+                self.ref_counts = np.zeros(3, dtype=np.int64)
+            self.ref_counts += np.asarray(ref_counts, dtype=np.int64)
+
+    def __setstate__(self, state):
+        # the reports pickled before the status arrays were introduced
+        # keep the sets of the accurate, candidate and failed frames.
+        if 'traj_status' in state:
+            self.ref_counts = None
+            self.__dict__.update(state)
+            return
+        self.clear()
+        self.traj_cand_picked = state.get('traj_cand_picked', [])
+        for nn, accu, cand, fail in zip(
+                state['traj_nframes'], state['traj_accu'], 
+                state['traj_cand'], state['traj_fail']):
+            status = TrajsExplorationReport._make_status(
+                nn, sorted(accu), sorted(cand), sorted(fail))
+            counts = np.bincount(status, minlength=3)
+            self.traj_nframes.append(nn)
+            self.traj_status.append(status)
+            self.numb_accu += int(counts[TrajsExplorationReport.status_accurate])
+            self.numb_cand += int(counts[TrajsExplorationReport.status_candidate])
+            self.numb_fail += int(counts[TrajsExplorationReport.status_failed])
+
+    def _frames_of_status(
+            self,
+            status,
+    ) -> List[Set[int]]:
+        return [set(np.where(ii == status)[0].tolist()) for ii in self.traj_status]
+
+    @property
+    def traj_accu(self) -> List[Set[int]]:
+        """The accurate frames of the trajectories."""
+        return self._frames_of_status(TrajsExplorationReport.status_accurate)
+
+    @property
+    def traj_cand(self) -> List[Set[int]]:
+        """The candidate frames of the trajectories."""
+        return self._frames_of_status(TrajsExplorationReport.status_candidate)
+
+    @property
+    def traj_fail(self) -> List[Set[int]]:
+        """The failed frames of the trajectories."""
+        return self._frames_of_status(TrajsExplorationReport.status_failed)
 
-        
     def failed_ratio(
             self,
             tag = None,
     ):
-        traj_nf = [len(ii) for ii in self.traj_fail]
-        return float(sum(traj_nf)) / float(sum(self.traj_nframes))
+        return float(self.numb_fail) / float(sum(self.traj_nframes))
 
     def accurate_ratio(
             self,
             tag = None,
     ):
-        traj_nf = [len(ii) for ii in self.traj_accu]
-        return float(sum(traj_nf)) / float(sum(self.traj_nframes))
+        return float(self.numb_accu) / float(sum(self.traj_nframes))
 
     def candidate_ratio(
             self,
             tag = None,
     ):
-        traj_nf = [len(ii) for ii in self.traj_cand]
-        return float(sum(traj_nf)) / float(sum(self.traj_nframes))
+        return float(self.numb_cand) / float(sum(self.traj_nframes))
+
+    def exclude_candidates(
+            self,
+            traj_idx : int,
+            frames : List[int],
+    ):
+        """
+        Exclude the candidate frames of a trajectory from being picked by
+        `get_candidates`, e.g. the near-duplicates. The excluded frames
+        are still counted as candidates in the ratios.
+
+        """
+        frames = np.asarray(frames, dtype=int)
+        if traj_idx in self.traj_cand_excluded:
+            frames = np.union1d(self.traj_cand_excluded[traj_idx], frames)
+        self.traj_cand_excluded[traj_idx] = frames
+
+    def candidate_frames(
+            self,
+            traj_idx : int,
+    ) -> np.ndarray:
+        """
+        The candidate frames of a trajectory that are not excluded.
+
+        """
+        frames = np.where(
+            self.traj_status[traj_idx] == TrajsExplorationReport.status_candidate)[0]
+        if traj_idx in self.traj_cand_excluded:
+            frames = np.setdiff1d(frames, self.traj_cand_excluded[traj_idx])
+        return frames
+
+    def model_devi_hist(
+            self,
+    ):
+        return self.hist_edges, self.model_devi_f_hist
+
+    def reference_ratios(
+            self,
+    ) -> Optional[Tuple[float, float, float]]:
+        if self.ref_counts is None:
+            return None
+        return tuple((self.ref_counts / float(self.ref_counts.sum())).tolist())
+
+    def traj_last_good_frames(
+            self,
+    ) -> List[int]:
+        ret = []
+        for tt in self.traj_status:
+            good = np.where(tt != TrajsExplorationReport.status_failed)[0]
+            ret.append(int(good[-1]) if good.size > 0 else -1)
+        return ret
+
+    def traj_frame_counts(
+            self,
+    ) -> np.ndarray:
+        ret = np.zeros([len(self.traj_status), 3], dtype=np.int64)
+        for ii, tt in enumerate(self.traj_status):
+            ret[ii] = np.bincount(tt, minlength=3)
+        return ret
+
+    def compact(
+            self,
+    ) -> CompactExplorationReport:
+        """
+        The compact report. The per-frame status is reduced to the numbers
+        of accurate, candidate and failed frames of each trajectory.
+
+        """
+        return CompactExplorationReport(
+            self.traj_frame_counts(),
+            self.traj_cand_picked,
+            self.model_devi_f_hist.copy(),
+            self.model_devi_v_hist.copy(),
+            self.traj_last_good_frames(),
+            ref_counts = None if self.ref_counts is None else self.ref_counts.copy(),
+        )
 
     def get_candidates(
             self,
             max_nframes : int = None,
+            seed : int = None,
     )->List[Tuple[int,int]]:
         """
-        Get candidates. If number of candidates is larger than `max_nframes`, 
+        Get candidates, the excluded candidates are not considered.
+        If number of candidates is larger than `max_nframes`,
         then randomly pick `max_nframes` frames from the candidates. 
 
+        The frames are picked by sampling `max_nframes` distinct indexes 
+        of the candidates counted over all trajectories. The memory and time
+        scale with `max_nframes` rather than the number of candidates.
+
         Parameters
         ----------
         max_nframes    int
                 The maximal number of frames of candidates.
+        seed           int
+                The seed of the random sampling. If `None`, the sampling 
+                is not reproducible.
 
         Returns
         -------
         cand_frames   List[Tuple[int,int]]
-                Candidate frames. A list of tuples: [(traj_idx, frame_idx), ...]
+                Candidate frames. A list of tuples: [(traj_idx, frame_idx), ...], 
+                sorted by trajectory index and then frame index.
         """
-        self.traj_cand_picked = []
-        for tidx,tt in enumerate(self.traj_cand):
-            for ff in tt:
-                self.traj_cand_picked.append((tidx, ff))
-        if max_nframes and max_nframes < len(self.traj_cand_picked):
-            random.shuffle(self.traj_cand_picked)
-            ret = sorted(self.traj_cand_picked[:max_nframes])
+        traj_ncand = np.array(
+            [np.count_nonzero(tt == TrajsExplorationReport.status_candidate) 
+             for tt in self.traj_status], dtype=np.int64)
+        for ii, ff in self.traj_cand_excluded.items():
+            traj_ncand[ii] -= ff.size
+        ncand = int(traj_ncand.sum())
+        if max_nframes and max_nframes < ncand:
+            # random.sample on a range does not expand the population
+            picked = random.Random(seed).sample(range(ncand), max_nframes)
+            picked = np.sort(np.array(picked, dtype=np.int64))
         else:
-            ret = self.traj_cand_picked
-        return ret
-        
+            picked = np.arange(ncand, dtype=np.int64)
+        # locate the picked indexes in the trajectories
+        cum_ncand = np.cumsum(traj_ncand)
+        picked_traj = np.searchsorted(cum_ncand, picked, side='right')
+        picked_local = picked - (cum_ncand - traj_ncand)[picked_traj]
+        self.traj_cand_picked = []
+        for tidx in np.unique(picked_traj):
+            cand_frames = self.candidate_frames(tidx)
+            for ff in cand_frames[picked_local[picked_traj == tidx]]:
+                self.traj_cand_picked.append((int(tidx), int(ff)))
+        return self.traj_cand_picked
@@ -1,6 +1,9 @@
 from .stage_scheduler import (
     StageScheduler,
 )
+from .md_length_policy import (
+    MDLengthPolicy,
+)
 from .convergence_check_stage_scheduler import (
     ConvergenceCheckStageScheduler,
 )
@@ -8,8 +8,8 @@ from dflow.python import (
 from pathlib import Path
 from dpgen2.exploration.report import ExplorationReport
 from dpgen2.exploration.task import ExplorationTaskGroup, ExplorationStage
-from dpgen2.exploration.selector import ConfSelector
-from . import StageScheduler
+from dpgen2.exploration.selector import ConfSelector, TrustLevelPolicy
+from . import StageScheduler, MDLengthPolicy
 
 class ConvergenceCheckStageScheduler(StageScheduler):    
     def __init__(
@@ -19,18 +19,61 @@ class ConvergenceCheckStageScheduler(StageScheduler):
             conv_accuracy : float = 0.9,
             max_numb_iter : int = None,
             fatal_at_max : bool = True,
+            trust_level_policy : TrustLevelPolicy = None,
+            restart_from_trajs : bool = False,
+            md_length_policy : MDLengthPolicy = None,
     ):
+        """
+        Parameters
+        ----------
+        restart_from_trajs : bool
+            If the stage is not converged, the MD tasks of the next
+            iteration start from the last accurate or candidate frames of
+            the trajectories of this iteration, instead of the confs
+            sampled from the conf list. Needs the report recording the
+            last good frames, and the groups supporting the seeding.
+        trust_level_policy : TrustLevelPolicy
+            If set, the trust levels of the selector are tuned by the 
+            policy from the report of each iteration. The convergence is
+            still checked by the configured trust levels, i.e. those of
+            the selector when the scheduler is made, which are recorded in
+            the report as the reference trust levels.
+        md_length_policy : MDLengthPolicy
+            If set, the length of the MD runs of the next iteration is 
+            scaled by the policy from the report of this iteration. Needs
+            the groups supporting the scaling.
+
+        """
         self.stage = stage
         self.selector = selector
         self.conv_accuracy = conv_accuracy
         self.max_numb_iter = max_numb_iter
         self.fatal_at_max = fatal_at_max
+        self.trust_level_policy = trust_level_policy
+        self.ref_trust_level = None
+        if trust_level_policy is not None:
+            self.ref_trust_level = selector.trust_level
+            self.selector.ref_trust_level = self.ref_trust_level
+        self.restart_from_trajs = restart_from_trajs
+        self.md_length_policy = md_length_policy
+        self.md_scale = 1.
         self.nxt_iter = 0
         self.conv = False
         self.reached_max_iter = False
         self.complete_ = False
         self.reports = []
 
+    def _accurate_ratio(
+            self,
+            report : ExplorationReport,
+    ) -> float:
+        # the accurate ratio judged by the configured trust levels, if it
+        # is recorded as the reference
+        ratios = report.reference_ratios() if self.ref_trust_level is not None else None
+        if ratios is None:
+            return report.accurate_ratio()
+        return ratios[0]
+
     def complete(self):
         return self.complete_
 
@@ -51,10 +94,11 @@ class ConvergenceCheckStageScheduler(StageScheduler):
             lmp_task_grp = self.stage.make_task()
             ret_selector = self.selector
         else :
-            stg_complete = report.accurate_ratio() >= self.conv_accuracy
+            stg_complete = self._accurate_ratio(report) >= self.conv_accuracy
             self.conv = stg_complete
             if not stg_complete:
-                # check if we have any candidate to improve the quality of the model
+                # check if we have any candidate to improve the quality of the model.
+                # the candidates are selected by the tuned trust levels.
                 if report.candidate_ratio() == 0.0:
                     raise FatalError(
                         'The iteration is not converted, but we find that '
@@ -76,9 +120,25 @@ class ConvergenceCheckStageScheduler(StageScheduler):
                 lmp_task_grp = None
                 ret_selector = None
             else :                        
+                # the groups may prune the conditions by the accuracy
+                if self.stage.pruning_enabled() and \
+                   report.traj_frame_counts() is not None:
+                    self.stage.record_traj_counts(report.traj_frame_counts())
+                if self.restart_from_trajs and trajs is not None and \
+                   report.traj_last_good_frames() is not None:
+                    self.stage.set_traj_seeds(trajs, report.traj_last_good_frames())
+                if self.md_length_policy is not None:
+                    self.md_scale = self.md_length_policy.update(self.md_scale, report)
+                    self.stage.set_md_scale(self.md_scale)
                 lmp_task_grp = self.stage.make_task()
+                if self.trust_level_policy is not None:
+                    self.selector.trust_level = self.trust_level_policy.update(
+                        self.selector.trust_level, report, 
+                        ref_trust_level = self.ref_trust_level)
                 ret_selector = self.selector
-            self.reports.append(report)
+            # only the compact form is retained, the scheduler is
+            # pickled in every iteration.
+            self.reports.append(report.compact())
         self.nxt_iter += 1
         self.complete_ = stg_complete
         return stg_complete, lmp_task_grp, ret_selector
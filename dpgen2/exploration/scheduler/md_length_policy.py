@@ -0,0 +1,77 @@
+from dpgen2.exploration.report import ExplorationReport
+
+class MDLengthPolicy():
+    """Tune the length of the MD runs of a stage from the failed and
+    accurate ratios recorded by the exploration report.
+
+    The length is a scale of the `nsteps` and `trj_freq` set to the
+    exploration groups, so the number of frames of each trajectory is
+    kept. The frames after the model fails are wasted, so the runs are
+    shortened by `factor` if the failed ratio is higher than `failed_hi`.
+    The runs that are mostly accurate and hardly fail do not go far
+    from the initial configurations, so the runs are lengthened by
+    `factor` if the failed ratio is not higher than `failed_lo` and the
+    accurate ratio is not lower than `accurate_hi`. Otherwise the length
+    is kept.
+
+    Parameters
+    ----------
+    failed_hi : float
+        The runs are shortened if the failed ratio is higher than it.
+    failed_lo : float
+        The runs may be lengthened if the failed ratio is not higher than it.
+    accurate_hi : float
+        The runs may be lengthened if the accurate ratio is not lower than it.
+    factor : float
+        The factor of shortening or lengthening, larger than 1.
+    scale_bounds : Tuple[float, float]
+        The lower and upper bounds of the scale. `None` for no bound.
+
+    """
+    def __init__(
+            self,
+            failed_hi : float = 0.1,
+            failed_lo : float = 0.01,
+            accurate_hi : float = 0.5,
+            factor : float = 2.,
+            scale_bounds = (0.25, 4.),
+    ):
+        if factor <= 1.:
+            raise RuntimeError(f'the factor should be larger than 1, got {factor}')
+        self.failed_hi = failed_hi
+        self.failed_lo = failed_lo
+        self.accurate_hi = accurate_hi
+        self.factor = factor
+        self.scale_bounds = scale_bounds
+
+    def update(
+            self,
+            scale : float,
+            report : ExplorationReport,
+    ) -> float:
+        """Propose the scale of the MD length for the next iteration.
+
+        Parameters
+        ----------
+        scale : float
+                The scale of the reported iteration.
+        report : ExplorationReport
+                The report of the iteration.
+
+        Returns
+        -------
+        scale : float
+                The proposed scale.
+
+        """
+        failed = report.failed_ratio()
+        if failed > self.failed_hi:
+            scale = scale / self.factor
+        elif failed <= self.failed_lo and report.accurate_ratio() >= self.accurate_hi:
+            scale = scale * self.factor
+        lo, hi = self.scale_bounds
+        if lo is not None:
+            scale = max(scale, lo)
+        if hi is not None:
+            scale = min(scale, hi)
+        return scale
@@ -1,10 +1,18 @@
 from .trust_level import (
     TrustLevel,
 )
+from .trust_level_policy import (
+    TrustLevelPolicy,
+)
 from .conf_filter import (
     ConfFilter,
+    BatchedConfFilter,
     ConfFilters,
 )
+from .distance_conf_filter import (
+    DistanceConfFilter,
+    ClusterConfFilter,
+)
 from .conf_selector import (
     ConfSelector,
 )
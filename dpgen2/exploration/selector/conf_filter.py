@@ -33,6 +33,69 @@ class ConfFilter(ABC):
         """
         pass
 
+    def batched_check(
+            self,
+            coords : np.array,
+            cells : np.array,
+            atom_types : np.array,
+            nopbc : bool,
+    ) -> np.array :
+        """Check if the configurations are valid. By default the
+        configurations are checked frame by frame by `check`. The derived
+        classes may override this method with a vectorized implementation.
+        
+        Parameters
+        ----------
+        coords : numpy.array
+                The coordinates, numpy array of shape nframes x natoms x 3
+        cells : numpy.array
+                The cell tensors. numpy array of shape nframes x 3 x 3
+        atom_types : numpy.array
+                The atom types. numpy array of shape natoms
+        nopbc : bool
+                If no periodic boundary condition.
+
+        Returns
+        -------
+        valid : numpy.array
+                Boolean array of shape nframes, `True` if the configuration
+                is a valid configuration, else `False`.
+
+        """
+        return np.array(
+            [ self.check(coords[ii], cells[ii], atom_types, nopbc) 
+              for ii in range(len(coords)) ],
+            dtype=bool,
+        ).reshape(len(coords))
+
+
+class BatchedConfFilter(ConfFilter):
+    """The configuration filter that checks all the frames at once. The
+    derived classes implement `batched_check`, and the per-frame `check`
+    is adapted from it.
+
+    """
+    @abstractmethod
+    def batched_check(
+            self,
+            coords : np.array,
+            cells : np.array,
+            atom_types : np.array,
+            nopbc : bool,
+    ) -> np.array :
+        pass
+
+    def check (
+            self,
+            coords : np.array,
+            cell: np.array,
+            atom_types : np.array,
+            nopbc: bool,
+    ) -> bool :
+        return bool(self.batched_check(
+            coords[None, ...], cell[None, ...], atom_types, nopbc)[0])
+
+
 class ConfFilters():
     def __init__(
             self,
@@ -50,16 +113,13 @@ class ConfFilters():
             self,
             conf : dpdata.System,
     ) -> bool : 
-        natoms = sum(conf['atom_numbs'])
-        selected_idx = np.arange(conf.get_nframes())
+        valid = np.ones(conf.get_nframes(), dtype=bool)
         for ff in self._filters:                         
-            fsel = np.where (
-                [ ff.check(conf['coords'][ii], 
-                           conf['cells'][ii],
-                           conf['atom_types'],
-                           conf.nopbc)
-                  for ii in range(conf.get_nframes()) ]
-            )[0]
-            selected_idx = np.intersect1d(selected_idx, fsel)
-        return conf.sub_system(selected_idx)
+            valid &= ff.batched_check(
+                conf['coords'], 
+                conf['cells'],
+                conf['atom_types'],
+                conf.nopbc,
+            )
+        return conf.sub_system(np.where(valid)[0])
     
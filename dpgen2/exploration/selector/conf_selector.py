@@ -18,6 +18,7 @@ class ConfSelector(ABC):
             model_devis : List[Path],
             traj_fmt : str = 'deepmd/npy',
             type_map : List[str] = None,
+            iter_data : List[Path] = None,
     ) -> Tuple[List[ Path ], ExplorationReport]:
         pass
 
@@ -1,6 +1,9 @@
 import dpdata
 import numpy as np
 from collections import Counter
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from typing import (
     List,
     Tuple,
@@ -11,6 +14,28 @@ from . import (
     ConfFilters,
 )
 from dpgen2.exploration.report import ExplorationReport, TrajsExplorationReport
+from dpgen2.utils.lmp_dump_index import (
+    make_dump_index,
+    read_dump_timesteps,
+    read_dump_frames,
+)
+from dpgen2.utils.model_devi import (
+    load_model_devi,
+    load_atomic_model_devi,
+)
+from dpgen2.utils.cluster_carve import (
+    carve_system,
+)
+from dpgen2.utils.fingerprint import (
+    radial_fingerprints,
+    dedup_fingerprints,
+    farthest_point_sampling,
+    default_fingerprint_rcut,
+    default_fingerprint_nbins,
+)
+from dpgen2.utils.fingerprint_index import (
+    load_fingerprint_index,
+)
 
 class ConfSelectorLammpsFrames(ConfSelector):
     """Select frames from trajectories as confs.
@@ -18,19 +43,79 @@ class ConfSelectorLammpsFrames(ConfSelector):
     Parameters:
     trust_level: TrustLevel
         The trust level
-    conf_filter: ConfFilters
-        The configuration filter
+    conf_filters: ConfFilters
+        The configuration filters applied to the selected frames
+    nproc: int
+        Number of worker processes used to classify and extract the
+        trajectories. Serial if `nproc` is 1.
+    select_mode: str
+        How the candidates are picked if there are more than `max_numb_sel`.
+        `random`: uniformly random. `topk`: the candidates with the largest
+        model deviations. `weighted`: random, weighted by the model deviation.
+        The model deviation of a frame is the force model deviation divided
+        by `level_f_hi`, or the larger one of it and the virial model
+        deviation divided by `level_v_hi` if the virial trust levels are set.
+    seed: int
+        The random seed used to pick the candidates.
+    dedup_tol: float
+        If set, the near-duplicated candidates are removed before the 
+        candidates are picked. Two candidates are near-duplicates if the 
+        Euclidean distance between their radial fingerprints is not larger
+        than `dedup_tol`. All the candidate frames are read to compute the 
+        fingerprints. The candidates that are near-duplicates of the
+        labeled frames in the iteration data are also removed.
+    fingerprint_rcut: float
+        The cut-off radius of the radial fingerprints.
+    fingerprint_nbins: int
+        The number of bins of the radial fingerprints.
+    carve_radius: float
+        If set, a spherical cluster of radius `carve_radius` centered at
+        the atom with the largest force model deviation is carved from
+        each selected frame, and placed in a cubic box with vacuum. The
+        clusters are selected instead of the frames. The per-atom force model deviations should
+        be written in the model deviation files.
+    carve_vacuum: float
+        The thickness of the vacuum between the carved cluster and its
+        periodic images.
+    ref_trust_level: TrustLevel
+        If set, the numbers of the accurate, candidate and failed frames
+        judged by `ref_trust_level` are also recorded in the report, see
+        `ExplorationReport.reference_ratios`. It is used to check the
+        convergence by the configured trust levels when `trust_level` is
+        tuned.
 
     """
+    select_modes = ('random', 'topk', 'weighted', 'fps')
+
     def __init__(
             self,
             trust_level,
             max_numb_sel : int = None,
             conf_filters : ConfFilters = None,
+            nproc : int = 1,
+            select_mode : str = 'random',
+            seed : int = None,
+            dedup_tol : float = None,
+            fingerprint_rcut : float = default_fingerprint_rcut,
+            fingerprint_nbins : int = default_fingerprint_nbins,
+            carve_radius : float = None,
+            carve_vacuum : float = 10.,
+            ref_trust_level = None,
     ):
         self.trust_level = trust_level
         self.max_numb_sel = max_numb_sel
         self.conf_filters = conf_filters
+        self.nproc = nproc
+        if select_mode not in ConfSelectorLammpsFrames.select_modes:
+            raise RuntimeError(f'unknown select_mode {select_mode}')
+        self.select_mode = select_mode
+        self.seed = seed
+        self.dedup_tol = dedup_tol
+        self.fingerprint_rcut = fingerprint_rcut
+        self.fingerprint_nbins = fingerprint_nbins
+        self.carve_radius = carve_radius
+        self.carve_vacuum = carve_vacuum
+        self.ref_trust_level = ref_trust_level
         self.report = TrajsExplorationReport()
     
     def select (
@@ -39,6 +124,7 @@ class ConfSelectorLammpsFrames(ConfSelector):
             model_devis : List[Path],
             traj_fmt : str = 'lammps/dump',
             type_map : List[str] = None,
+            iter_data : List[Path] = None,
     ) -> Tuple[List[ Path ], ExplorationReport]:
         """Select configurations
 
@@ -55,6 +141,10 @@ class ConfSelectorLammpsFrames(ConfSelector):
                 Format of the trajectory, by default it is the dump file of LAMMPS
         type_map : List[str]
                 The `type_map` of the systems
+        iter_data : List[Path]
+                The iteration data directories. If `dedup_tol` is set, the 
+                candidates that are near-duplicates of the labeled frames 
+                (by the fingerprints written by `CollectData`) are not selected.
 
         Returns
         -------
@@ -70,50 +160,340 @@ class ConfSelectorLammpsFrames(ConfSelector):
                          (self.trust_level.level_v_hi is not None) )
         self.report.clear()
 
-        for ii in range(ntraj):
-            self.record_one_traj(trajs[ii], model_devis[ii], traj_fmt, type_map)
+        if self.nproc is not None and self.nproc > 1:
+            with ProcessPoolExecutor(max_workers=self.nproc) as executor:
+                ms = self._select(
+                    executor.map, trajs, model_devis, traj_fmt, type_map, iter_data)
+        else:
+            ms = self._select(
+                map, trajs, model_devis, traj_fmt, type_map, iter_data)
+            
+        out_path = Path('confs')
+        out_path.mkdir(exist_ok=True)
+        ms.to_deepmd_npy(out_path)
 
-        id_cand = self.report.get_candidates(self.max_numb_sel)
+        return [out_path], self.report
+        
+
+    def _select(
+            self,
+            mapper,
+            trajs,
+            model_devis,
+            traj_fmt,
+            type_map,
+            iter_data = None,
+    )->dpdata.MultiSystems:
+        ntraj = len(trajs)
+        # the candidates are ranked only if they are going to be truncated
+        rank_mode = None
+        if self.select_mode in ('topk', 'weighted') and self.max_numb_sel is not None:
+            rank_mode = self.select_mode
+        dedup = self.dedup_tol is not None
+        use_fps = self.select_mode == 'fps' and self.max_numb_sel is not None
+        # classify the frames by the model deviation. no trajectory is
+        # loaded at this stage. the mapper returns the results in the
+        # order of the trajectories, so the report is deterministic.
+        # when ranking, each trajectory returns at most `max_numb_sel`
+        # ranked candidates, and a bounded heap keeps the global top ones.
+        # with dedup, all the candidates are ranked, and the duplicates
+        # are removed before they are pushed to the heap.
+        numb_rank = None if dedup else self.max_numb_sel
+        heap = []
+        ranked_list = []
+        # each model deviation file is parsed once, the timesteps are kept
+        # to find the frames in the dump files.
+        steps = []
+        for tidx, (ii, ranked, tsteps) in enumerate(mapper(
+                ConfSelectorLammpsFrames._classify_traj,
+                model_devis,
+                repeat(self.trust_level),
+                repeat(rank_mode),
+                repeat(numb_rank),
+                repeat(self.seed),
+                range(ntraj),
+                repeat(self.ref_trust_level),
+        )):
+            self.report.record_traj(*ii)
+            steps.append(tsteps)
+            if ranked is not None:
+                if dedup:
+                    ranked_list.append((tidx, ranked))
+                else:
+                    self._push_ranked(heap, tidx, *ranked)
+
+        if dedup or use_fps:
+            pool, fps = self._candidate_fingerprints(
+                mapper, trajs, steps, traj_fmt, type_map)
+        if dedup:
+            keep = self._dedup_candidates(pool, fps, iter_data)
+            pool, fps = pool[keep], fps[keep]
+            for tidx, (keys, frames) in ranked_list:
+                if tidx in self.report.traj_cand_excluded:
+                    kept = np.logical_not(np.isin(
+                        frames, self.report.traj_cand_excluded[tidx]))
+                    keys, frames = keys[kept], frames[kept]
+                self._push_ranked(heap, tidx, keys, frames)
+
+        if use_fps:
+            sel = farthest_point_sampling(fps, self.max_numb_sel)
+            id_cand = sorted((int(ii[0]), int(ii[1])) for ii in pool[sel])
+            self.report.traj_cand_picked = id_cand
+        elif rank_mode is None:
+            id_cand = self.report.get_candidates(self.max_numb_sel, seed=self.seed)
+        else:
+            id_cand = sorted((-ii[1], -ii[2]) for ii in heap)
+            self.report.traj_cand_picked = id_cand
         id_cand_list = [[] for ii in range(ntraj)]
         for ii in id_cand:
             id_cand_list[ii[0]].append(ii[1])
 
+        # each trajectory is loaded at most once, and only if it has
+        # picked candidates.
+        sel_trajs = [ii for ii in range(ntraj) if len(id_cand_list[ii]) > 0]
         ms = dpdata.MultiSystems(type_map=type_map)
-        for ii in range(ntraj):
-            if len(id_cand_list[ii]) > 0:
-                ss = dpdata.System(trajs[ii], fmt=traj_fmt, type_map=type_map)
-                ss = ss.sub_system(id_cand_list[ii])        
+        if self.carve_radius is None:
+            loaded = mapper(
+                ConfSelectorLammpsFrames._load_traj,
+                [trajs[ii] for ii in sel_trajs],
+                repeat(traj_fmt),
+                repeat(type_map),
+                [id_cand_list[ii] for ii in sel_trajs],
+                [steps[ii] for ii in sel_trajs],
+            )
+        else:
+            loaded = (ss for cms in mapper(
+                ConfSelectorLammpsFrames._load_traj_carved,
+                [trajs[ii] for ii in sel_trajs],
+                [model_devis[ii] for ii in sel_trajs],
+                repeat(traj_fmt),
+                repeat(type_map),
+                [id_cand_list[ii] for ii in sel_trajs],
+                repeat(self.carve_radius),
+                repeat(self.carve_vacuum),
+                [steps[ii] for ii in sel_trajs],
+            ) for ss in cms)
+        for ss in loaded:
+            if self.conf_filters is not None:
+                ss = self.conf_filters.check(ss)
+            if ss.get_nframes() > 0:
                 ms.append(ss)
-            
-        out_path = Path('confs')
-        out_path.mkdir(exist_ok=True)
-        ms.to_deepmd_npy(out_path)
+        return ms
 
-        return [out_path], self.report
-        
+    def _push_ranked(
+            self,
+            heap,
+            tidx,
+            keys,
+            frames,
+    ):
+        for kk, ff in zip(keys, frames):
+            item = (float(kk), -tidx, -int(ff))
+            if len(heap) < self.max_numb_sel:
+                heapq.heappush(heap, item)
+            else:
+                heapq.heappushpop(heap, item)
+
+    def _candidate_fingerprints(
+            self,
+            mapper,
+            trajs,
+            steps,
+            traj_fmt,
+            type_map,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Compute the fingerprints of the candidates that are not excluded.
+        Returns the candidates as an array of (traj_idx, frame_idx), in 
+        the order of trajectories and frames, and their fingerprints.
+
+        """
+        cand_frames = [self.report.candidate_frames(ii) for ii in range(len(trajs))]
+        sel_trajs = [ii for ii in range(len(trajs)) if cand_frames[ii].size > 0]
+        fps = list(mapper(
+            ConfSelectorLammpsFrames._traj_fingerprints,
+            [trajs[ii] for ii in sel_trajs],
+            repeat(traj_fmt),
+            repeat(type_map),
+            [cand_frames[ii] for ii in sel_trajs],
+            repeat(self.fingerprint_rcut),
+            repeat(self.fingerprint_nbins),
+            [steps[ii] for ii in sel_trajs],
+        ))
+        pool = np.zeros([0, 2], dtype=int)
+        if len(fps) == 0:
+            return pool, np.zeros([0, 0])
+        pool = np.concatenate(
+            [np.stack((np.full(cand_frames[ii].size, ii), cand_frames[ii]), axis=1)
+             for ii in sel_trajs])
+        return pool, np.concatenate(fps)
+
+    def _dedup_candidates(
+            self,
+            pool,
+            fps,
+            iter_data = None,
+    ) -> np.ndarray:
+        """Exclude the near-duplicated candidates in the report. The 
+        candidates are visited in the order of trajectories and frames,
+        and the first one of the near-duplicates is kept. The candidates
+        near-duplicated to the labeled frames in `iter_data` are excluded.
+        Returns the mask of the kept candidates in the pool.
+
+        """
+        keep = np.ones(len(pool), dtype=bool)
+        if len(pool) == 0:
+            return keep
+        if iter_data is not None and len(iter_data) > 0:
+            index = load_fingerprint_index(
+                iter_data, self.dedup_tol, self.fingerprint_rcut, self.fingerprint_nbins)
+            keep = np.logical_not(index.query(fps))
+        keep[keep] = dedup_fingerprints(fps[keep], self.dedup_tol)
+        dropped = pool[np.logical_not(keep)]
+        for ii in np.unique(dropped[:,0]):
+            self.report.exclude_candidates(int(ii), dropped[dropped[:,0] == ii, 1])
+        return keep
+
+    @staticmethod
+    def _traj_fingerprints(
+            fname : Path,
+            fmt : str,
+            type_map : List[str],
+            frames : List[int],
+            rcut : float,
+            nbins : int,
+            steps : np.ndarray = None,
+    ) -> np.ndarray:
+        ss = ConfSelectorLammpsFrames._load_traj(
+            fname, fmt, type_map, list(frames), steps)
+        # with the type map, the fingerprints of all the systems have the
+        # same layout.
+        ntypes = len(type_map) if type_map is not None else len(ss['atom_names'])
+        return radial_fingerprints(
+            ss['coords'], ss['cells'], ss['atom_types'], ntypes,
+            rcut, nbins, ss.nopbc)
 
     def record_one_traj(
             self,
             traj, 
             model_devi,
-            traj_fmt, 
-            type_map,
+            traj_fmt = None, 
+            type_map = None,
     )->None:
-        ss = ConfSelectorLammpsFrames._load_traj(traj, traj_fmt, type_map)
-        mdf, mdv = ConfSelectorLammpsFrames._load_model_devi(model_devi)
+        # the frames are classified by the model deviation only, the 
+        # trajectory is not loaded. `traj`, `traj_fmt` and `type_map` are
+        # kept for the compatibility of the signature.
+        self.report.record_traj(
+            *ConfSelectorLammpsFrames._classify_traj(
+                model_devi, self.trust_level, 
+                ref_trust_level = self.ref_trust_level)[0]
+        )
+
+    @staticmethod
+    def _classify_traj(
+            model_devi,
+            trust_level,
+            rank_mode = None,
+            numb_rank = None,
+            seed = None,
+            traj_idx = 0,
+            ref_trust_level = None,
+    ):
+        """Classify the frames of one trajectory. Returns the indexes 
+        of accurate, candidate and failed frames judged by force and virial,
+        the force and virial model deviations, and the numbers of frames
+        judged by `ref_trust_level` (`None` if not set), in the order 
+        expected by `TrajsExplorationReport.record_traj`, the ranked 
+        candidates and the timesteps of the frames. The model deviation
+        file is parsed once, and only the columns of the timesteps and the
+        max force and virial model deviations are read.
+
+        If `rank_mode` is `topk` or `weighted`, the ranked candidates are the
+        keys and the frame indexes of at most `numb_rank` candidates having
+        the largest keys. The key is the model deviation for `topk`, and
+        the random key `log(u)/md` (u uniform in (0,1)) for `weighted`, so 
+        the frames with the largest keys are a weighted sample. 
+        Otherwise the ranked candidates are `None`.
+
+        """
+        v_level = ( (trust_level.level_v_lo is not None) and \
+                    (trust_level.level_v_hi is not None) )
+        steps, mdf, mdv = ConfSelectorLammpsFrames._load_model_devi(model_devi)
         id_f_cand, id_f_accu, id_f_fail = ConfSelectorLammpsFrames._get_indexes(
-            mdf, self.trust_level.level_f_lo, self.trust_level.level_f_hi)
-        if self.v_level:
+            mdf, trust_level.level_f_lo, trust_level.level_f_hi)
+        if v_level:
             id_v_cand, id_v_accu, id_v_fail = ConfSelectorLammpsFrames._get_indexes(
-                mdv, self.trust_level.level_v_lo, self.trust_level.level_v_hi)
+                mdv, trust_level.level_v_lo, trust_level.level_v_hi)
         else :
             id_v_cand = id_v_accu = id_v_fail = None
-        self.report.record_traj(
+        ranked = None
+        if rank_mode is not None:
+            ranked = ConfSelectorLammpsFrames._rank_candidates(
+                mdf, mdv if v_level else None, trust_level, 
+                rank_mode, numb_rank, seed, traj_idx)
+        ref_counts = None
+        if ref_trust_level is not None:
+            ref_counts = ConfSelectorLammpsFrames._count_status(
+                mdf, mdv, ref_trust_level)
+        return (
             id_f_accu, id_f_cand, id_f_fail,
             id_v_accu, id_v_cand, id_v_fail,
-        )
+            mdf, mdv if v_level else None,
+            ref_counts,
+        ), ranked, steps
+
+    @staticmethod
+    def _count_status(
+            mdf,
+            mdv,
+            trust_level,
+    ) -> np.ndarray:
+        # the numbers of the accurate, candidate and failed frames. a frame
+        # is accurate only if both are accurate, failed if any is failed,
+        # otherwise candidate.
+        status = (mdf >= trust_level.level_f_lo).astype(int) + \
+            (mdf >= trust_level.level_f_hi)
+        if trust_level.level_v_lo is not None and trust_level.level_v_hi is not None:
+            status = np.maximum(
+                status, 
+                (mdv >= trust_level.level_v_lo).astype(int) + (mdv >= trust_level.level_v_hi))
+        return np.bincount(status, minlength=3)
+
+    @staticmethod
+    def _rank_candidates(
+            mdf,
+            mdv,
+            trust_level,
+            rank_mode,
+            numb_rank,
+            seed,
+            traj_idx,
+    ) -> Tuple[np.array, np.array]:
+        # a frame is a candidate if it is not failed by force nor virial,
+        # and is not accurate by both.
+        score = mdf / trust_level.level_f_hi
+        is_cand = np.logical_and(mdf >= trust_level.level_f_lo, mdf < trust_level.level_f_hi)
+        if mdv is not None:
+            score = np.maximum(score, mdv / trust_level.level_v_hi)
+            is_cand = np.logical_or(
+                is_cand, 
+                np.logical_and(mdv >= trust_level.level_v_lo, mdf < trust_level.level_f_hi),
+            )
+            is_cand = np.logical_and(is_cand, mdv < trust_level.level_v_hi)
+        frames = np.where(is_cand)[0]
+        if rank_mode == 'topk':
+            keys = score[frames]
+        elif rank_mode == 'weighted':
+            # different trajectories use different random streams
+            rng = np.random.default_rng(None if seed is None else [seed, traj_idx])
+            uu = 1. - rng.random(frames.size)
+            keys = np.log(uu) / np.maximum(score[frames], np.finfo(float).tiny)
+        else:
+            raise RuntimeError(f'unknown rank mode {rank_mode}')
+        if numb_rank is not None and frames.size > numb_rank:
+            sel = np.argpartition(-keys, numb_rank-1)[:numb_rank]
+            keys, frames = keys[sel], frames[sel]
+        return keys, frames
 
-                
     @staticmethod
     def _get_indexes(
             md, 
@@ -130,12 +510,89 @@ class ConfSelectorLammpsFrames(ConfSelector):
             fname : Path,
             fmt : str,
             type_map : List[str],
+            frames : List[int] = None,
+            steps : np.ndarray = None,
     ) -> dpdata.System : 
-        return dpdata.System(str(fname), fmt = fmt, type_map = type_map)
+        """Load the trajectory. If `frames` is provided, only the frames
+        are returned. The frames of LAMMPS dump files are read by random 
+        access, other formats are fully parsed.
+
+        The `frames` are the indexes of the frames in the model deviation
+        file, whose timesteps are `steps`. If the LAMMPS dump file has less
+        frames than `steps`, i.e. the frames are dumped only if the model
+        deviation is high, the frames are found in the dump file by the 
+        timesteps.
+
+        """
+        if frames is not None and fmt == 'lammps/dump':
+            index = make_dump_index(fname)
+            if steps is not None:
+                frames = ConfSelectorLammpsFrames._dump_frames(
+                    fname, index, steps, frames)
+            return read_dump_frames(fname, frames, type_map, index=index)
+        ss = dpdata.System(str(fname), fmt = fmt, type_map = type_map)
+        if frames is not None:
+            ss = ss.sub_system(frames)
+        return ss
+
+    @staticmethod
+    def _dump_frames(
+            fname : Path,
+            index : np.ndarray,
+            steps : np.ndarray,
+            frames : List[int],
+    ) -> List[int]:
+        """Map the indexes of the frames in the model deviation file to
+        the indexes of the frames in the LAMMPS dump file.
+
+        """
+        if index.size - 1 == steps.size:
+            return frames
+        dump_steps = read_dump_timesteps(fname, index)
+        req_steps = steps[list(frames)].astype(np.int64)
+        ret = np.searchsorted(dump_steps, req_steps)
+        ret = np.minimum(ret, max(dump_steps.size - 1, 0))
+        if dump_steps.size == 0 or np.any(dump_steps[ret] != req_steps):
+            missing = req_steps if dump_steps.size == 0 else req_steps[dump_steps[ret] != req_steps]
+            raise RuntimeError(
+                f'the frames of timesteps {missing.tolist()} recorded in '
+                f'the model deviations are not dumped in {fname}')
+        return ret.tolist()
+
+    @staticmethod
+    def _load_traj_carved(
+            fname : Path,
+            model_devi : Path,
+            fmt : str,
+            type_map : List[str],
+            frames : List[int],
+            radius : float,
+            vacuum : float,
+            steps : np.ndarray = None,
+    ) -> List[dpdata.System] :
+        """Load the frames of the trajectory, and carve the cluster 
+        around the atom with the largest force model deviation from
+        each frame. The atoms of the trajectory are in the order of the
+        atom ids, the same as the per-atom model deviations.
+
+        """
+        ss = ConfSelectorLammpsFrames._load_traj(
+            fname, fmt, type_map, frames, steps)
+        atomic = load_atomic_model_devi(model_devi, frames=frames)
+        if atomic.shape[1] != ss.get_natoms():
+            raise RuntimeError(
+                f'the number of per-atom model deviations {atomic.shape[1]} in '
+                f'{model_devi} does not match the number of atoms '
+                f'{ss.get_natoms()}, the per-atom model deviations should be '
+                'written to carve the clusters')
+        centers = np.argmax(atomic, axis=1)
+        return list(carve_system(ss, centers, radius, vacuum).systems.values())
 
     @staticmethod
     def _load_model_devi(
             fname : Path,
-    ) -> Tuple[np.array, np.array] : 
-        dd = np.loadtxt(fname)
-        return dd[:,4], dd[:,1]
+    ) -> Tuple[np.array, np.array, np.array] : 
+        # column 0 is the timestep, columns 4 and 1 are the max force and
+        # virial model deviations
+        dd = load_model_devi(fname, columns=[0, 4, 1])
+        return dd[0], dd[1], dd[2]
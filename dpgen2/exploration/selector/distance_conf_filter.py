@@ -0,0 +1,78 @@
+import numpy as np
+from . import (
+    BatchedConfFilter,
+)
+from dpgen2.utils.neighbor_list import (
+    batched_neighbor_pairs,
+    cluster_labels,
+)
+
+class DistanceConfFilter(BatchedConfFilter):
+    """Reject the configurations that have any pair of atoms closer than
+    the minimal distance. The pairs are searched by a cell list, in all
+    the frames of the batch at once.
+
+    Parameters
+    ----------
+    min_dist : float
+        The minimal allowed distance between atoms.
+
+    """
+    def __init__(
+            self,
+            min_dist : float,
+    ):
+        self.min_dist = min_dist
+
+    def batched_check(
+            self,
+            coords : np.array,
+            cells : np.array,
+            atom_types : np.array,
+            nopbc : bool,
+    ) -> np.array :
+        ff, _, _, _ = batched_neighbor_pairs(coords, cells, self.min_dist, nopbc)
+        return np.bincount(ff, minlength=len(coords)) == 0
+
+
+class ClusterConfFilter(BatchedConfFilter):
+    """Reject the fragmented configurations. Two atoms are bonded if they
+    are closer than the cut-off, and the configuration is valid if the
+    bonded atoms form no more than `max_numb_clusters` clusters.
+    The bonds are searched by a cell list, and the clusters are labeled,
+    in all the frames of the batch at once.
+
+    Parameters
+    ----------
+    rcut : float
+        The bond cut-off radius.
+    max_numb_clusters : int
+        The maximal allowed number of clusters.
+
+    """
+    def __init__(
+            self,
+            rcut : float,
+            max_numb_clusters : int = 1,
+    ):
+        self.rcut = rcut
+        self.max_numb_clusters = max_numb_clusters
+
+    def batched_check(
+            self,
+            coords : np.array,
+            cells : np.array,
+            atom_types : np.array,
+            nopbc : bool,
+    ) -> np.array :
+        nframes = len(coords)
+        natoms = len(atom_types)
+        ff, pi, pj, _ = batched_neighbor_pairs(coords, cells, self.rcut, nopbc)
+        # the atoms of all the frames are labeled as one graph, the frames
+        # are not bonded to each other.
+        labels = cluster_labels(
+            nframes * natoms, ff * natoms + pi, ff * natoms + pj)
+        # each cluster is labeled by its own smallest atom
+        roots = np.where(labels == np.arange(nframes * natoms))[0]
+        numb_clusters = np.bincount(roots // max(natoms, 1), minlength=nframes)
+        return numb_clusters <= self.max_numb_clusters
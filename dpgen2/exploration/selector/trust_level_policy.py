@@ -0,0 +1,115 @@
+import numpy as np
+from . import (
+    TrustLevel,
+)
+from dpgen2.exploration.report import ExplorationReport
+
+class TrustLevelPolicy():
+    """Tune the force trust levels from the histogram of the force model
+    deviation recorded by the exploration report.
+
+    The ratio `level_f_hi / level_f_lo` is kept, and `level_f_lo` is
+    chosen such that the number of frames falling in
+    `[level_f_lo, level_f_hi)` is as close as possible to the target.
+    The virial trust levels are not changed.
+
+    Parameters
+    ----------
+    target_numb_cand : int
+        The target number of candidates, usually `fp_task_max` or a small
+        multiple of it.
+    level_f_lo_bounds : Tuple[float, float]
+        The lower and upper bounds of `level_f_lo`. `None` for no bound.
+    level_f_hi_bounds : Tuple[float, float]
+        The lower and upper bounds of `level_f_hi`. `None` for no bound.
+    max_scale : float
+        If neither `level_f_lo_bounds` nor `level_f_hi_bounds` is set,
+        the bounds of `level_f_lo` and `level_f_hi` are the configured 
+        ones divided and multiplied by `max_scale`. No default bound if
+        `None`.
+
+    """
+    def __init__(
+            self,
+            target_numb_cand : int,
+            level_f_lo_bounds = None,
+            level_f_hi_bounds = None,
+            max_scale : float = 2.,
+    ):
+        self.target_numb_cand = target_numb_cand
+        self.level_f_lo_bounds = level_f_lo_bounds
+        self.level_f_hi_bounds = level_f_hi_bounds
+        self.max_scale = max_scale
+
+    def _bounds(
+            self,
+            ref_trust_level : TrustLevel,
+    ):
+        # the bounds of level_f_lo and level_f_hi
+        if self.level_f_lo_bounds is not None or self.level_f_hi_bounds is not None:
+            return (
+                self.level_f_lo_bounds or (None, None),
+                self.level_f_hi_bounds or (None, None),
+            )
+        if self.max_scale is None:
+            return (None, None), (None, None)
+        return tuple(
+            (ll / self.max_scale, ll * self.max_scale) for ll in 
+            [ref_trust_level.level_f_lo, ref_trust_level.level_f_hi])
+
+    def update(
+            self,
+            trust_level : TrustLevel,
+            report : ExplorationReport,
+            ref_trust_level : TrustLevel = None,
+    ) -> TrustLevel:
+        """Propose the trust levels for the next iteration.
+
+        Parameters
+        ----------
+        trust_level : TrustLevel
+                The trust levels of the reported iteration.
+        report : ExplorationReport
+                The report of the iteration.
+        ref_trust_level : TrustLevel
+                The configured trust levels, around which the default
+                bounds are set. `trust_level` if not provided.
+
+        Returns
+        -------
+        trust_level : TrustLevel
+                The proposed trust levels. The input trust levels are
+                returned if the report does not record the histogram.
+
+        """
+        hist = report.model_devi_hist()
+        if hist is None or trust_level.level_f_lo <= 0.:
+            return trust_level
+        edges, counts = hist
+        if np.sum(counts) == 0:
+            return trust_level
+        ratio = trust_level.level_f_hi / trust_level.level_f_lo
+        # number of frames below each edge, interpolated between edges.
+        numb_below = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        def count_below(xx):
+            return np.interp(xx, edges, numb_below)
+        if ref_trust_level is None:
+            ref_trust_level = trust_level
+        (lo_min, lo_max), (hi_min, hi_max) = self._bounds(ref_trust_level)
+        # the bounds of f_hi are translated to the bounds of f_lo
+        lo_min = max([ii for ii in [lo_min, None if hi_min is None else hi_min / ratio]
+                      if ii is not None], default=None)
+        lo_max = min([ii for ii in [lo_max, None if hi_max is None else hi_max / ratio]
+                      if ii is not None], default=None)
+        trials = np.concatenate((edges[1:], [trust_level.level_f_lo]))
+        if lo_min is not None or lo_max is not None:
+            trials = np.clip(trials, lo_min, lo_max)
+        trials = np.unique(trials)
+        numb_cand = count_below(trials * ratio) - count_below(trials)
+        level_f_lo = float(trials[np.argmin(np.abs(numb_cand - self.target_numb_cand))])
+        return TrustLevel(
+            level_f_lo,
+            level_f_lo * ratio,
+            level_v_lo = trust_level.level_v_lo,
+            level_v_hi = trust_level.level_v_hi,
+        )
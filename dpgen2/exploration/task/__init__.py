@@ -1,9 +1,11 @@
 from .task import (
     ExplorationTask,
     ExplorationTaskGroup,
+    LazyExplorationTaskGroup,
 )
 from .npt_task_group import (
     NPTTaskGroup,
+    LazyNPTTaskGroup,
 )
 from .stage import (
     ExplorationStage,
@@ -1 +1,2 @@
-from .lmp_input import make_lmp_input
+from .lmp_input import make_lmp_input, make_lmp_partition_input
+from .traj_seeds import make_traj_seeds
@@ -8,6 +8,8 @@ from distutils.version import (
 )
 from dpgen2.constants import (
     lmp_traj_name,
+    lmp_input_name,
+    lmp_log_name,
 )
 
 def _sample_sphere() :
@@ -18,6 +20,84 @@ def _sample_sphere() :
             continue
         return vv / vn
 
+def _py_model_devi_of_step() :
+    # the python function that reads the model deviations of the step
+    # from the last line of model_devi.out written by the pair style.
+    # None if the line is not of the step.
+    ret = "def model_devi_of_step(step):\n"
+    ret+= "    try:\n"
+    ret+= "        with open('model_devi.out', 'rb') as fp:\n"
+    ret+= "            fp.seek(0, 2)\n"
+    ret+= "            pos = fp.tell()\n"
+    ret+= "            buff = b''\n"
+    ret+= "            while pos > 0 and buff.strip().count(b'\\n') == 0:\n"
+    ret+= "                nn = min(pos, 4096)\n"
+    ret+= "                pos -= nn\n"
+    ret+= "                fp.seek(pos)\n"
+    ret+= "                buff = fp.read(nn) + buff\n"
+    ret+= "        words = buff.strip().split(b'\\n')[-1].split()\n"
+    ret+= "        if int(words[0]) != step:\n"
+    ret+= "            return None\n"
+    ret+= "        return [float(ii) for ii in words[:7]]\n"
+    ret+= "    except Exception:\n"
+    ret+= "        return None\n"
+    return ret
+
+def _make_dump_skip(
+        f_trust_lo : float,
+        v_trust_lo : float = None,
+) :
+    # the frame is skipped if the model deviations of the step are below
+    # the trust levels. the model deviations of all the frames are still
+    # written to model_devi.out.
+    # model_devi.out is written by the rank 0 only, the other ranks would
+    # decide by a stale file while the dump is collective, so the skipping
+    # supports the single-rank runs only, which is checked by the size of
+    # the LAMMPS world passed as SELF.
+    if v_trust_lo is None:
+        skip_cond = "md[4] < %.16g" % f_trust_lo
+    else:
+        skip_cond = "md[4] < %.16g and md[1] < %.16g" % (f_trust_lo, v_trust_lo)
+    ret = "variable        DUMP_STEP       equal step\n"
+    ret+= "variable        DUMP_SKIP       python dump_skip\n"
+    ret+= "python          dump_skip input 2 SELF v_DUMP_STEP return v_DUMP_SKIP format pii here \"\"\"\n"
+    ret+= _py_model_devi_of_step()
+    ret+= "dump_world_size = [None]\n"
+    ret+= "def dump_skip(lmpptr, step):\n"
+    ret+= "    if dump_world_size[0] is None:\n"
+    ret+= "        from lammps import lammps\n"
+    ret+= "        dump_world_size[0] = lammps(ptr=lmpptr).extract_setting('world_size')\n"
+    ret+= "    if dump_world_size[0] != 1:\n"
+    ret+= "        raise RuntimeError('dump skipping supports single-rank runs only')\n"
+    ret+= "    md = model_devi_of_step(step)\n"
+    ret+= "    if md is None:\n"
+    ret+= "        return 0\n"
+    ret+= "    return int(%s)\n" % skip_cond
+    ret+= "\"\"\"\n"
+    ret+= "dump_modify     1 skip v_DUMP_SKIP\n"
+    return ret
+
+def _make_halt(
+        f_trust_hi : float,
+        patience : int,
+) :
+    # the run is stopped if the force model deviation is not lower than
+    # the trust level for `patience` consecutive records of model_devi.out.
+    # the soft error ends the run without an error exit.
+    ret = "variable        HALT_STEP       equal step\n"
+    ret+= "variable        HALT_COUNT      python halt_count\n"
+    ret+= "python          halt_count input 1 v_HALT_STEP return v_HALT_COUNT format ii here \"\"\"\n"
+    ret+= _py_model_devi_of_step()
+    ret+= "halt_counter = [0]\n"
+    ret+= "def halt_count(step):\n"
+    ret+= "    md = model_devi_of_step(step)\n"
+    ret+= "    if md is not None:\n"
+    ret+= "        halt_counter[0] = halt_counter[0] + 1 if md[4] >= %.16g else 0\n" % f_trust_hi
+    ret+= "    return halt_counter[0]\n"
+    ret+= "\"\"\"\n"
+    ret+= "fix             halt all halt ${THERMO_FREQ} v_HALT_COUNT >= %d error soft\n" % patience
+    return ret
+
 def make_lmp_input(
         conf_file : str,
         ensemble : str,
@@ -41,6 +121,11 @@ def make_lmp_input(
         max_seed : int = 1000000,
         deepmd_version = '2.0', 
         trj_seperate_files = True,
+        seed : int = None,
+        dump_f_trust_lo : float = None,
+        dump_v_trust_lo : float = None,
+        halt_f_trust_hi : float = None,
+        halt_patience : int = 1,
 ) :
     if (ele_temp_f is not None or ele_temp_a is not None) and LooseVersion(deepmd_version) < LooseVersion('1'):
         raise RuntimeError('the electron temperature is only supported by deepmd-kit >= 1.0.0, please upgrade your deepmd-kit')
@@ -48,6 +133,12 @@ def make_lmp_input(
         raise RuntimeError('the frame style ele_temp and atom style ele_temp should not be set at the same time')
     if 'npt' in ensemble and pres is None:
         raise RuntimeError('the pressre should be provided for npt ensemble')
+    if dump_f_trust_lo is not None and LooseVersion(deepmd_version) < LooseVersion('1'):
+        raise RuntimeError('dumping the frames by the model deviation is only supported by deepmd-kit >= 1.0.0, please upgrade your deepmd-kit')
+    if halt_f_trust_hi is not None and LooseVersion(deepmd_version) < LooseVersion('1'):
+        raise RuntimeError('halting the run by the model deviation is only supported by deepmd-kit >= 1.0.0, please upgrade your deepmd-kit')
+    if halt_f_trust_hi is not None and halt_patience < 1:
+        raise RuntimeError('the halt patience should be a positive integer')
     ret = "variable        NSTEPS          equal %d\n" % nsteps
     ret+= "variable        THERMO_FREQ     equal %d\n" % trj_freq
     ret+= "variable        DUMP_FREQ       equal %d\n" % trj_freq
@@ -106,10 +197,14 @@ def make_lmp_input(
         ret+= "dump            1 all custom ${DUMP_FREQ} traj/*.lammpstrj id type x y z fx fy fz\n"
     else:
         ret+= "dump            1 all custom ${DUMP_FREQ} %s id type x y z fx fy fz\n" % lmp_traj_name
+    if dump_f_trust_lo is not None:
+        ret+= _make_dump_skip(dump_f_trust_lo, dump_v_trust_lo)
     ret+= "restart         10000 dpgen.restart\n"
     ret+= "\n"
     if pka_e is None :
-        ret+= "if \"${restart} == 0\" then \"velocity        all create ${TEMP} %d\"" % (random.randrange(max_seed-1)+1)
+        if seed is None:
+            seed = random.randrange(max_seed-1)+1
+        ret+= "if \"${restart} == 0\" then \"velocity        all create ${TEMP} %d\"" % seed
     else :
         sys = dpdata.System(conf_file, fmt = 'lammps/lmp')
         sys_data = sys.data
@@ -143,7 +238,32 @@ def make_lmp_input(
     if nopbc:
         ret+= "velocity        all zero linear\n"
         ret+= "fix             fm all momentum 1 linear 1 1 1\n"
+    if halt_f_trust_hi is not None:
+        ret+= _make_halt(halt_f_trust_hi, halt_patience)
     ret+= "\n"
     ret+= "timestep        %f\n" % dt
     ret+= "run             ${NSTEPS} upto\n"
     return ret
+
+
+def make_lmp_partition_input(
+        task_dirs : List[str],
+        input_name : str = lmp_input_name,
+        log_name : str = lmp_log_name,
+) :
+    """
+    Make the master input of the LAMMPS multi-partition mode
+    (`lmp -partition`). Each partition (world) enters its own task
+    directory, switches the log to the directory and includes the input
+    of the task, so the outputs of the tasks stay in their directories.
+    The number of the partitions should be the number of the task
+    directories.
+
+    """
+    if len(task_dirs) == 0:
+        raise RuntimeError('no task directory is provided to the partition input')
+    ret = "variable        TASK            world %s\n" % (" ".join([str(ii) for ii in task_dirs]))
+    ret+= "shell           cd ${TASK}\n"
+    ret+= "log             %s\n" % log_name
+    ret+= "include         %s\n" % input_name
+    return ret
@@ -0,0 +1,54 @@
+import tempfile
+from pathlib import Path
+from typing import (
+    List,
+    Optional,
+)
+from dpgen2.utils.lmp_dump_index import (
+    make_dump_index,
+    read_dump_frames,
+)
+
+def make_traj_seeds(
+        trajs : List[Path],
+        frames : List[int],
+        ntypes : int,
+) -> List[Optional[str]] :
+    """
+    Make the initial configurations of the MD from the frames of the
+    LAMMPS dump trajectories. Only the requested frame of each trajectory
+    is read by the frame index of the dump file.
+
+    Parameters
+    ----------
+    trajs : List[Path]
+        The LAMMPS dump trajectories.
+    frames : List[int]
+        The index of the frame of each trajectory. No configuration is
+        made from the trajectory if the index is negative or out of range.
+    ntypes : int
+        The number of atom types. The LAMMPS atom types of the dump are
+        kept in the configurations.
+
+    Returns
+    -------
+    seeds : List[str]
+        The contents of the configurations in the LAMMPS data format,
+        `None` for the trajectories without configuration.
+
+    """
+    assert len(trajs) == len(frames)
+    type_map = ['Type%d' % ii for ii in range(ntypes)]
+    seeds = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        conf_file = Path(tmpdir) / 'seed.lmp'
+        for traj, ff in zip(trajs, frames):
+            seed = None
+            if traj is not None and ff >= 0:
+                index = make_dump_index(traj)
+                if ff < index.size - 1:
+                    ss = read_dump_frames(traj, [ff], type_map, index=index)
+                    ss.to('lammps/lmp', str(conf_file), frame_idx=0)
+                    seed = conf_file.read_text()
+            seeds.append(seed)
+    return seeds
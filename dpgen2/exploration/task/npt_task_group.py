@@ -1,15 +1,18 @@
-import itertools, random
+import itertools, random, copy, json, bisect
 from typing import (
     List,
+    Optional,
+    Tuple,
 )
 from . import (
     ExplorationTask,
     ExplorationTaskGroup,
 )
-from .lmp import make_lmp_input
+from .lmp import make_lmp_input, make_traj_seeds
 from dpgen2.constants import (
     lmp_conf_name, 
     lmp_input_name,
+    lmp_input_spec_name,
     model_name_pattern,
 )
 
@@ -20,6 +23,38 @@ class NPTTaskGroup(ExplorationTaskGroup):
         super().__init__()
         self.conf_set = False
         self.md_set = False
+        self.last_conf_idx = []
+        self.last_cond_nconf = None
+        self.traj_seeds = None
+        self.prune_accuracy = None
+        self.cond_streak = []
+        self.cond_accuracy = []
+        self.md_scale = 1.
+
+    def __setstate__(self, state):
+        # the groups pickled before the input spec, dump skipping, halting,
+        # seeding and pruning were added
+        self.input_spec = False
+        self.dump_f_trust_lo = None
+        self.dump_v_trust_lo = None
+        self.halt_f_trust_hi = None
+        self.halt_patience = 1
+        self.last_conf_idx = []
+        self.last_cond_nconf = None
+        self.traj_seeds = None
+        self.prune_accuracy = None
+        self.cond_streak = []
+        self.cond_accuracy = []
+        self.md_scale = 1.
+        super().__setstate__(state)
+        # the queue of the groups pickled before stores the confs, which 
+        # are converted to their indexes in the conf list
+        queue = getattr(self, 'conf_queue', [])
+        if any(isinstance(ii, str) for ii in queue):
+            index = {}
+            for ii, cc in enumerate(self.conf_list):
+                index.setdefault(cc, ii)
+            self.conf_queue = [index[ii] for ii in queue]
 
     def set_conf(
             self,
@@ -71,9 +106,22 @@ class NPTTaskGroup(ExplorationTaskGroup):
             relative_v_epsilon : float = None,
             ele_temp_f : float = None,
             ele_temp_a : float = None,
+            input_spec : bool = False,
+            dump_f_trust_lo : float = None,
+            dump_v_trust_lo : float = None,
+            halt_f_trust_hi : float = None,
+            halt_patience : int = 1,
     ):
         """
-        Set MD parameters
+        Set MD parameters. If `input_spec` is set, the tasks carry the
+        arguments of `make_lmp_input` as a json file instead of the 
+        rendered LAMMPS input, and the input is rendered by `RunLmp`.
+        If `dump_f_trust_lo` is set, a frame is dumped only if its force
+        model deviation is not lower than `dump_f_trust_lo`, or its virial
+        model deviation is not lower than `dump_v_trust_lo` if it is set.
+        If `halt_f_trust_hi` is set, the MD is stopped once the force model
+        deviation is not lower than `halt_f_trust_hi` for `halt_patience`
+        consecutive records of the model deviation.
         """
         self.graphs = [model_name_pattern % ii for ii in range(numb_models)]
         self.mass_map = mass_map
@@ -93,6 +141,11 @@ class NPTTaskGroup(ExplorationTaskGroup):
         self.relative_v_epsilon = relative_v_epsilon
         self.ele_temp_f = ele_temp_f
         self.ele_temp_a = ele_temp_a
+        self.input_spec = input_spec
+        self.dump_f_trust_lo = dump_f_trust_lo
+        self.dump_v_trust_lo = dump_v_trust_lo
+        self.halt_f_trust_hi = halt_f_trust_hi
+        self.halt_patience = halt_patience
         self.md_set = True
 
     def make_task(
@@ -107,6 +160,8 @@ class NPTTaskGroup(ExplorationTaskGroup):
             The returned lammps task group. The number of tasks is nconf*nT*nP.
             nconf is set by `n_sample` parameter of `set_conf`. 
             nT and nP are lengths of the `temps` and `press` parameters of `set_md`.
+            The tasks of the pruned conditions are dropped or down-sampled,
+            see `set_pruning`.
 
         """
         if not self.conf_set:
@@ -115,46 +170,263 @@ class NPTTaskGroup(ExplorationTaskGroup):
             raise RuntimeError('MD settings are not set')
         # clear all existing tasks
         self.clear()
-        confs = self._sample_confs()
-        for cc,tt,pp in itertools.product(confs, self.temps, self.press):
-            self.add_task(self._make_lmp_task(cc, tt, pp))
+        conf_idx, cond_nconf, seed_grid = self._next_tasks()
+        for recipe in self._recipes(conf_idx, cond_nconf):
+            ic, it, ip = recipe
+            self.add_task(self._make_lmp_task(
+                self._task_conf(recipe, conf_idx, seed_grid), 
+                self.temps[it], self.press[ip]))
         return self
 
+    def set_traj_seeds(
+            self,
+            trajs : List,
+            frames : List[int],
+    ):
+        """
+        Seed the tasks made next time from the frames of the trajectories
+        of the tasks made last time. The next `make_task` makes the tasks
+        from the same confs as the last time, and each task of the same 
+        conf, temperature and pressure starts from the seed frame of its
+        trajectory, or from its conf if it has no seed frame. The frames
+        are read from the LAMMPS dump trajectories. The velocities are not
+        kept.
+
+        """
+        ntasks = self._count_recipes(self.last_conf_idx, self.last_cond_nconf)
+        if len(trajs) != ntasks:
+            raise RuntimeError(
+                f'the number of trajectories {len(trajs)} does not match '
+                f'the number of tasks {ntasks} made last time')
+        self.traj_seeds = make_traj_seeds(trajs, frames, len(self.mass_map))
+
+    def set_pruning(
+            self,
+            accuracy : float,
+            patience : int = 1,
+            n_sample : int = 0,
+    ):
+        """
+        Set the pruning of the conditions, i.e. the pairs of temperature
+        and pressure. A condition is pruned once the ratio of the accurate
+        frames of its tasks is not lower than `accuracy` for `patience`
+        consecutive recorded iterations, see `record_traj_counts`. The 
+        tasks of a pruned condition are made from the first `n_sample` 
+        sampled confs only, and the condition is dropped if `n_sample` is 0.
+        The condition is not pruned any more once its accuracy falls below
+        `accuracy`. If all the conditions are dropped, each condition is
+        explored from one conf.
+
+        """
+        if patience < 1:
+            raise RuntimeError(f'the patience of pruning should be positive, got {patience}')
+        self.prune_accuracy = accuracy
+        self.prune_patience = patience
+        self.prune_n_sample = n_sample
+
+    def record_traj_counts(
+            self,
+            counts,
+    ):
+        """
+        Record the numbers of the accurate, candidate and failed frames of
+        the trajectories of the tasks made last time. The accuracy of 
+        each condition is the ratio of the accurate frames of all its 
+        tasks, and is kept in `cond_accuracy`. Nothing is recorded if the
+        pruning is not set. Raise `RuntimeError` if the number of the 
+        counts does not match the number of the tasks made last time.
+
+        """
+        if self.prune_accuracy is None:
+            return
+        recipes = list(self._recipes(self.last_conf_idx, self.last_cond_nconf))
+        if len(counts) != len(recipes):
+            raise RuntimeError(
+                f'the number of trajectory counts {len(counts)} does not match '
+                f'the number of tasks {len(recipes)}')
+        ncond = len(self.temps) * len(self.press)
+        naccu = [0] * ncond
+        ntot = [0] * ncond
+        for (ic, it, ip), cc in zip(recipes, counts):
+            naccu[it*len(self.press)+ip] += cc[0]
+            ntot[it*len(self.press)+ip] += sum(cc)
+        if len(self.cond_streak) != ncond:
+            self.cond_streak = [0] * ncond
+        self.cond_accuracy = [
+            float(aa) / float(tt) if tt > 0 else None for aa, tt in zip(naccu, ntot)]
+        for ii, aa in enumerate(self.cond_accuracy):
+            # the conditions not explored keep their streaks
+            if aa is None:
+                continue
+            if aa >= self.prune_accuracy:
+                self.cond_streak[ii] += 1
+            else:
+                self.cond_streak[ii] = 0
+
+    def pruning_enabled(
+            self,
+    ) -> bool:
+        """
+        If the pruning of the conditions is set.
+
+        """
+        return self.prune_accuracy is not None
+
+    def set_md_scale(
+            self,
+            scale : float,
+    ):
+        """
+        Scale the length of the MD runs of the tasks made next time. The
+        `nsteps` and `trj_freq` set by `set_md` are both scaled, so the
+        number of frames of each trajectory is kept.
+
+        """
+        self.md_scale = scale
+
+    def _md_length(
+            self,
+    ) -> Tuple[int, int]:
+        # the scaled nsteps and trj_freq
+        return (
+            max(1, int(round(self.nsteps * self.md_scale))),
+            max(1, int(round(self.trj_freq * self.md_scale))),
+        )
+
+    def _next_tasks(
+            self,
+    ):
+        # the confs, the number of confs of each condition, and the seeds
+        # of the tasks. the seeded tasks are made from the confs of the 
+        # last time.
+        seed_grid = None
+        if self.traj_seeds is None:
+            self.last_conf_idx = self._sample_conf_indexes()
+        else:
+            # the seeds on the full grid of the confs and conditions
+            seed_grid = [None] * self._count_recipes(self.last_conf_idx, None)
+            recipes = self._recipes(self.last_conf_idx, self.last_cond_nconf)
+            for rr, ss in zip(recipes, self.traj_seeds):
+                seed_grid[self._grid_index(rr)] = ss
+        self.last_cond_nconf = self._cond_nconf()
+        self.traj_seeds = None
+        return self.last_conf_idx, self.last_cond_nconf, seed_grid
+
+    def _cond_nconf(
+            self,
+    ) -> Optional[List[int]]:
+        # `None` if no condition is pruned
+        ncond = len(self.temps) * len(self.press)
+        if self.prune_accuracy is None or len(self.cond_streak) != ncond:
+            return None
+        pruned = [ss >= self.prune_patience for ss in self.cond_streak]
+        if not any(pruned):
+            return None
+        nconf = [self.prune_n_sample if pp else self.n_sample for pp in pruned]
+        if sum(nconf) == 0:
+            nconf = [1] * ncond
+        return nconf
+
+    def _recipes(
+            self,
+            conf_idx : List[int],
+            cond_nconf : Optional[List[int]],
+    ):
+        # the positions in `conf_idx`, the temperature and pressure indexes
+        # of the tasks, in the order of the tasks
+        for ic, it, ip in itertools.product(
+                range(len(conf_idx)), range(len(self.temps)), range(len(self.press))):
+            if cond_nconf is None or ic < cond_nconf[it*len(self.press)+ip]:
+                yield (ic, it, ip)
+
+    def _count_recipes(
+            self,
+            conf_idx : List[int],
+            cond_nconf : Optional[List[int]],
+    ) -> int:
+        if cond_nconf is None:
+            return len(conf_idx) * len(self.temps) * len(self.press)
+        return sum(min(nn, len(conf_idx)) for nn in cond_nconf)
+
+    def _task_offsets(
+            self,
+            conf_idx : List[int],
+            cond_nconf : List[int],
+    ) -> List[int]:
+        # the index of the first task of each position in `conf_idx`, and
+        # the number of tasks at the end
+        offsets = [0]
+        for ic in range(len(conf_idx)):
+            offsets.append(offsets[-1] + sum(nn > ic for nn in cond_nconf))
+        return offsets
+
+    def _grid_index(
+            self,
+            recipe : Tuple[int, int, int],
+    ) -> int:
+        ic, it, ip = recipe
+        return (ic * len(self.temps) + it) * len(self.press) + ip
+
+    def _task_conf(
+            self,
+            recipe : Tuple[int, int, int],
+            conf_idx : List[int],
+            seed_grid : Optional[List[Optional[str]]],
+    ) -> str:
+        if seed_grid is not None and seed_grid[self._grid_index(recipe)] is not None:
+            return seed_grid[self._grid_index(recipe)]
+        return self.conf_list[conf_idx[recipe[0]]]
+
     def _sample_confs(
             self,
     ):
-        confs = []
+        return [self.conf_list[ii] for ii in self._sample_conf_indexes()]
+
+    def _sample_conf_indexes(
+            self,
+    ) -> List[int]:
+        # the queue stores the indexes of the confs in the conf list
+        idx = []
         for ii in range(self.n_sample):
             if len(self.conf_queue) == 0:
-                add_list = self.conf_list.copy()
+                add_list = list(range(len(self.conf_list)))
                 if self.random_sample:
                     random.shuffle(add_list)
                 self.conf_queue += add_list
-            confs.append(self.conf_queue.pop(0))
-        return confs
+            idx.append(self.conf_queue.pop(0))
+        return idx
                 
     def _make_lmp_task(
             self,
             conf : str,
             tt : float,
             pp : float,
+            seed : int = None,
     ) -> ExplorationTask:
+        # the velocity seed is drawn if `seed` is not set
+        nsteps, trj_freq = self._md_length()
         task = ExplorationTask()
         task\
             .add_file(
                 lmp_conf_name, 
                 conf,
-            )\
-            .add_file(
+            )
+        if self.input_spec:
+            task.add_file(
+                lmp_input_spec_name,
+                json.dumps(self._make_lmp_input_spec(tt, pp, seed)),
+            )
+        else:
+            task.add_file(
                 lmp_input_name,
                 make_lmp_input(
                     lmp_conf_name,
                     self.ens,
                     self.graphs,
-                    self.nsteps,
+                    nsteps,
                     self.dt,
                     self.neidelay,
-                    self.trj_freq,
+                    trj_freq,
                     self.mass_map,
                     tt,
                     self.tau_t,
@@ -168,7 +440,135 @@ class NPTTaskGroup(ExplorationTaskGroup):
                     self.ele_temp_a,
                     self.no_pbc,
                     trj_seperate_files = False,
+                    dump_f_trust_lo = self.dump_f_trust_lo,
+                    dump_v_trust_lo = self.dump_v_trust_lo,
+                    halt_f_trust_hi = self.halt_f_trust_hi,
+                    halt_patience = self.halt_patience,
+                    seed = seed,
                 )
             )
         return task
 
+    def _make_lmp_input_spec(
+            self,
+            tt : float,
+            pp : float,
+            seed : int = None,
+            max_seed : int = 1000000,
+    ) -> dict:
+        # the keyword arguments of make_lmp_input. the velocity seed is
+        # fixed in the spec, so the rendered input does not depend on 
+        # where it is rendered. it is drawn here if `seed` is not set.
+        nsteps, trj_freq = self._md_length()
+        return {
+            'conf_file' : lmp_conf_name,
+            'ensemble' : self.ens,
+            'graphs' : self.graphs,
+            'nsteps' : nsteps,
+            'dt' : self.dt,
+            'neidelay' : self.neidelay,
+            'trj_freq' : trj_freq,
+            'mass_map' : self.mass_map,
+            'temp' : tt,
+            'tau_t' : self.tau_t,
+            'pres' : pp,
+            'tau_p' : self.tau_p,
+            'use_clusters' : self.use_clusters,
+            'relative_f_epsilon' : self.relative_f_epsilon,
+            'relative_v_epsilon' : self.relative_v_epsilon,
+            'pka_e' : self.pka_e,
+            'ele_temp_f' : self.ele_temp_f,
+            'ele_temp_a' : self.ele_temp_a,
+            'nopbc' : self.no_pbc,
+            'trj_seperate_files' : False,
+            'seed' : seed if seed is not None else random.randrange(max_seed-1)+1,
+            'dump_f_trust_lo' : self.dump_f_trust_lo,
+            'dump_v_trust_lo' : self.dump_v_trust_lo,
+            'halt_f_trust_hi' : self.halt_f_trust_hi,
+            'halt_patience' : self.halt_patience,
+        }
+
+
+class LazyNPTTaskGroup(NPTTaskGroup):
+    """The NPT task group that makes the tasks on demand.
+
+    `make_task` only samples the indexes of the confs, and returns a
+    snapshot of the group that stores the recipe of the tasks: the conf
+    list, the sampled conf indexes and the grid of the temperatures and 
+    pressures. The LAMMPS inputs are rendered when the tasks are accessed,
+    so the pickled group does not grow with the number of tasks, unless
+    the tasks are seeded from the trajectories, whose seed confs are kept
+    in the snapshot. The numbers of confs of the conditions, and the 
+    index of the first task of each conf are kept in the snapshot if any
+    condition is pruned. The velocity seeds of the tasks are derived from
+    a base seed drawn by `make_task` and the task index, so a task is the
+    same however many times it is accessed.
+
+    """
+    lazy = True
+    cond_nconf = None
+    task_offsets = None
+    seed_grid = None
+    seed_base = None
+    max_seed = 1000000
+
+    def make_task(
+            self,
+    )->'LazyNPTTaskGroup':
+        """
+        Make the lazy LAMMPS task group.
+        
+        Returns
+        -------
+        task_grp: LazyNPTTaskGroup
+            The returned lazy lammps task group. The tasks are the same and
+            in the same order as `NPTTaskGroup`.
+
+        """
+        if not self.conf_set:
+            raise RuntimeError('confs are not set')
+        if not self.md_set:
+            raise RuntimeError('MD settings are not set')
+        conf_idx, cond_nconf, seed_grid = self._next_tasks()
+        ret = copy.copy(self)
+        ret.conf_idx = conf_idx
+        ret.cond_nconf = cond_nconf
+        if cond_nconf is not None:
+            ret.task_offsets = self._task_offsets(conf_idx, cond_nconf)
+        ret.seed_grid = seed_grid
+        ret.seed_base = random.randrange(self.max_seed - 1)
+        ret.conf_queue = list(self.conf_queue)
+        ret.cond_streak = list(self.cond_streak)
+        return ret
+
+    def __len__(self) -> int:
+        """Get the number of tasks in the group"""
+        return self._count_recipes(
+            getattr(self, 'conf_idx', []), self.cond_nconf)
+
+    def __getitem__(self, ii:int) -> ExplorationTask:
+        """Make the `ii`th task"""
+        nn = len(self)
+        if ii < 0:
+            ii += nn
+        if ii < 0 or ii >= nn:
+            raise IndexError('task index out of range')
+        if self.cond_nconf is None:
+            ic, rr = divmod(ii, len(self.temps) * len(self.press))
+            recipe = (ic,) + divmod(rr, len(self.press))
+        else:
+            # the tasks of a conf are made from the conditions not pruned
+            # for it, in the order of the conditions
+            ic = bisect.bisect_right(self.task_offsets, ii) - 1
+            conds = [cc for cc, nn in enumerate(self.cond_nconf) if nn > ic]
+            recipe = (ic,) + divmod(conds[ii - self.task_offsets[ic]], len(self.press))
+        ic, it, ip = recipe
+        seed = (self.seed_base + ii) % (self.max_seed - 1) + 1
+        return self._make_lmp_task(
+            self._task_conf(recipe, self.conf_idx, self.seed_grid), 
+            self.temps[it], self.press[ip], seed)
+
+    @property
+    def task_list(self) -> List[ExplorationTask]:
+        """Get the `list` of `ExplorationTask`. All the tasks are made."""
+        return [self[ii] for ii in range(len(self))]
@@ -10,6 +10,7 @@ from dpgen2.constants import (
 )
 from . import (
     ExplorationTaskGroup,
+    LazyExplorationTaskGroup,
     ExplorationTask,
 )
 from typing import (
@@ -31,6 +32,7 @@ class ExplorationStage():
 
         """
         self.explor_groups = []
+        self.group_sizes = []
 
     def add_task_group(
             self,
@@ -59,14 +61,101 @@ class ExplorationStage():
         task_grp: ExplorationTaskGroup
             The returned lammps task group. The number of tasks is equal to
             the summation of task groups defined by all the exploration groups
-            added to the stage.
+            added to the stage. If any of the groups is lazy, the returned
+            group is a `LazyExplorationTaskGroup` and the groups are not
+            expanded.
 
         """
 
-        lmp_task_grp = ExplorationTaskGroup()
-        for ii in self.explor_groups:
+        grps = [ii.make_task() for ii in self.explor_groups]
+        # the numbers of tasks, to assign the trajectories to the groups
+        self.group_sizes = [len(ii) for ii in grps]
+        if any(ii.lazy for ii in grps):
+            lmp_task_grp = LazyExplorationTaskGroup()
+        else:
+            lmp_task_grp = ExplorationTaskGroup()
+        for ii in grps:
             # lmp_task_grp.add_group(ii.make_task())
-            lmp_task_grp += ii.make_task()
+            lmp_task_grp += ii
         return lmp_task_grp
 
+    def set_traj_seeds(
+            self,
+            trajs : List,
+            frames : List[int],
+    ):
+        """
+        Seed the tasks made next time from the trajectories of the tasks
+        made last time. The trajectories are assigned to the exploration
+        groups in the order of the tasks.
+
+        Parameters
+        ----------
+        trajs : List[Path]
+            The trajectories, in the order of the tasks made last time.
+        frames : List[int]
+            The index of the seed frame of each trajectory, -1 if none.
+
+        """
+        if len(trajs) != sum(self.group_sizes) or len(frames) != len(trajs):
+            raise RuntimeError(
+                f'the number of trajectories {len(trajs)} does not match '
+                f'the number of tasks {sum(self.group_sizes)}')
+        start = 0
+        for grp, nn in zip(self.explor_groups, self.group_sizes):
+            grp.set_traj_seeds(trajs[start:start+nn], frames[start:start+nn])
+            start += nn
+
+
+
+    def record_traj_counts(
+            self,
+            counts,
+    ):
+        """
+        Record the numbers of the accurate, candidate and failed frames of
+        the trajectories of the tasks made last time. The counts are 
+        assigned to the exploration groups in the order of the tasks. 
+
+        Parameters
+        ----------
+        counts : numpy.ndarray
+            The numbers of frames of shape ntasks x 3, in the order of the
+            tasks made last time.
+
+        """
+        if len(counts) != sum(self.group_sizes):
+            raise RuntimeError(
+                f'the number of trajectory counts {len(counts)} does not match '
+                f'the number of tasks {sum(self.group_sizes)}')
+        start = 0
+        for grp, nn in zip(self.explor_groups, self.group_sizes):
+            grp.record_traj_counts(counts[start:start+nn])
+            start += nn
+
+    def pruning_enabled(
+            self,
+    ) -> bool:
+        """
+        If any exploration group prunes its tasks by the recorded counts
+        of frames.
+
+        """
+        return any(grp.pruning_enabled() for grp in self.explor_groups)
 
+    def set_md_scale(
+            self,
+            scale : float,
+    ):
+        """
+        Scale the length of the MD runs of the tasks made next time by
+        all the exploration groups.
+
+        Parameters
+        ----------
+        scale : float
+            The scale of the MD length set to the groups.
+
+        """
+        for grp in self.explor_groups:
+            grp.set_md_scale(scale)
@@ -1,4 +1,7 @@
 import os
+import copy
+import bisect
+import itertools
 from abc import (
     ABC,
     abstractmethod,
@@ -62,6 +65,9 @@ class ExplorationTaskGroup(Sequence):
     """A group of exploration tasks. Implemented as a `list` of `ExplorationTask`.
 
     """
+    # if the tasks are made on demand when they are accessed.
+    lazy = False
+
     def __init__(self):
         super().__init__()
         self.clear()
@@ -87,13 +93,99 @@ class ExplorationTaskGroup(Sequence):
         self.task_list.append(task)
         return self
 
+    def set_traj_seeds(
+            self,
+            trajs : List,
+            frames : List[int],
+    ):
+        """Seed the tasks made next time from the frames of the 
+        trajectories of the tasks made last time. The group does not 
+        support the seeding by default, and the seeds are ignored.
+
+        Parameters
+        ----------
+        trajs : List[Path]
+            The trajectories, in the order of the tasks made last time.
+        frames : List[int]
+            The index of the seed frame of each trajectory, -1 if none.
+
+        """
+        pass
+
+    def record_traj_counts(
+            self,
+            counts,
+    ):
+        """Record the numbers of the accurate, candidate and failed frames
+        of the trajectories of the tasks made last time. The group does not
+        use them by default.
+
+        Parameters
+        ----------
+        counts : numpy.ndarray
+            The numbers of frames of shape ntasks x 3, in the order of the
+            tasks made last time.
+
+        """
+        pass
+
+    def pruning_enabled(
+            self,
+    ) -> bool:
+        """If the group prunes its tasks by the recorded counts of frames,
+        see `record_traj_counts`. The group does not prune by default.
+
+        """
+        return False
+
+    def set_md_scale(
+            self,
+            scale : float,
+    ):
+        """Scale the length of the MD runs of the tasks made next time.
+        The group does not support the scaling by default, and the scale
+        is ignored.
+
+        Parameters
+        ----------
+        scale : float
+            The scale of the MD length set to the group.
+
+        """
+        pass
+
+    def __getstate__(self):
+        # the tasks carry the indexes of the file contents, so each
+        # distinct content, e.g. the conf shared by the tasks of different
+        # temperatures and pressures, is serialized only once.
+        state = self.__dict__.copy()
+        if '_task_list' in state:
+            index = {}
+            tasks = []
+            for tt in state['_task_list']:
+                tt = copy.copy(tt)
+                tt._files = {nn : index.setdefault(cc, len(index)) 
+                             for nn, cc in tt.files().items()}
+                tasks.append(tt)
+            state['_task_list'] = tasks
+            state['_file_contents'] = list(index.keys())
+        return state
+
+    def __setstate__(self, state):
+        contents = state.pop('_file_contents', None)
+        if contents is not None:
+            for tt in state['_task_list']:
+                tt._files = {nn : contents[ii] for nn, ii in tt._files.items()}
+        self.__dict__.update(state)
+
     def add_group(
             self,
             group : 'ExplorationTaskGroup',
     ):
         """Add another group to the group."""
         # see https://www.python.org/dev/peps/pep-0484/#forward-references for forward references
-        self._task_list = self._task_list + group._task_list
+        # the tasks of a lazy group are made.
+        self._task_list = self._task_list + group.task_list
         return self
 
     def __add__(
@@ -104,6 +196,57 @@ class ExplorationTaskGroup(Sequence):
         return self.add_group(group)
 
 
+class LazyExplorationTaskGroup(ExplorationTaskGroup):
+    """A chain of exploration task groups. The groups are not expanded 
+    when they are added, so the tasks of the lazy groups are only made 
+    when they are accessed, e.g. one by one when the group is iterated.
+
+    """
+    lazy = True
+
+    def __getitem__(self, ii:int) -> ExplorationTask:
+        """Get the `ii`th task"""
+        nn = len(self)
+        if ii < 0:
+            ii += nn
+        if ii < 0 or ii >= nn:
+            raise IndexError('task index out of range')
+        ends = list(itertools.accumulate(len(gg) for gg in self._groups))
+        gidx = bisect.bisect_right(ends, ii)
+        start = ends[gidx-1] if gidx > 0 else 0
+        return self._groups[gidx][ii - start]
+
+    def __len__(self) -> int:
+        """Get the number of tasks in the group"""
+        return sum(len(gg) for gg in self._groups)
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(self._groups)
+
+    def clear(self)->None:
+        self._groups = []
+
+    @property
+    def task_list(self) -> List[ExplorationTask]:
+        """Get the `list` of `ExplorationTask`. All the tasks are made."""
+        return list(self)
+
+    def add_task(self, task: ExplorationTask):
+        """Add one task to the group."""
+        if len(self._groups) == 0 or self._groups[-1].lazy:
+            self._groups.append(ExplorationTaskGroup())
+        self._groups[-1].add_task(task)
+        return self
+
+    def add_group(
+            self,
+            group : 'ExplorationTaskGroup',
+    ):
+        """Add another group to the group. The group is not expanded."""
+        self._groups.append(group)
+        return self
+
+
 class FooTask(ExplorationTask):
     def __init__(
             self, 
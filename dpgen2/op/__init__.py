@@ -1,7 +1,7 @@
 from .prep_dp_train import PrepDPTrain
 from .run_dp_train import RunDPTrain
 from .prep_lmp import PrepLmp
-from .run_lmp import RunLmp
+from .run_lmp import RunLmp, RunLmpPartition
 from .prep_vasp import PrepVasp
 from .run_vasp import RunVasp
 from .collect_data import CollectData
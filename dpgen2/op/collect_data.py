@@ -2,11 +2,22 @@ from dflow.python import (
     OP,
     OPIO,
     OPIOSign,
-    Artifact
+    Artifact,
+    Parameter,
 )
 import os, json, dpdata
+import numpy as np
 from typing import Tuple, List, Set
 from pathlib import Path
+from dpgen2.utils.fingerprint import (
+    radial_fingerprints,
+    default_fingerprint_rcut,
+    default_fingerprint_nbins,
+)
+from dpgen2.utils.fingerprint_index import (
+    write_fingerprints,
+    write_fingerprint_index,
+)
 
 class CollectData(OP):
     """Collect labeled data and add to the iteration dataset.
@@ -15,7 +26,12 @@ class CollectData(OP):
     directories.  This OP collect the labeled data in one data
     directory and add it to the iteration data. The data generated by
     this iteration will be place in `ip["name"]` subdirectory of the
-    iteration data directory.
+    iteration data directory. If `ip["fingerprint_config"]` is set, the
+    fingerprints of the collected frames are written in the same 
+    directory, and are used to skip the near-duplicates of the labeled 
+    frames in the later selections. The hash tables of the index of the
+    fingerprints of all the iterations are also persisted in the 
+    directory, so the later selections only hash the new fingerprints.
 
     """
 
@@ -26,6 +42,7 @@ class CollectData(OP):
             "type_map" : List[str],
             "labeled_data" : Artifact(List[Path]),
             "iter_data" : Artifact(List[Path]),
+            "fingerprint_config" : Parameter(dict, default=None),
         })
 
     @classmethod
@@ -51,6 +68,7 @@ class CollectData(OP):
             - `name`: (`str`) The name of this iteration. The data generated by this iteration will be place in a sub-directory of `name`.
             - `labeled_data`: (`Artifact(List[Path])`) The paths of labeled data generated by FP tasks of the current iteration.
             - `iter_data`: (`Artifact(List[Path])`) The data paths previous iterations.
+            - `fingerprint_config`: (`dict`, optional) The cut-off radius `rcut` and the number of bins `nbins` of the radial fingerprints, and the dedup tolerance `tol`, which should be the same as the conf selector. No fingerprint is written if not set. The index is not persisted if `tol` is not set.
 
         Returns
         -------
@@ -73,10 +91,38 @@ class CollectData(OP):
         # if ms.get_nframes() == 0, ms.to_deepmd_npy would not make the dir Path(name)
         Path(name).mkdir()
         ms.to_deepmd_npy(name)
+        fingerprint_config = ip.get('fingerprint_config')
+        if fingerprint_config is not None:
+            CollectData._write_fingerprints(
+                name, ms, type_map, 
+                rcut = fingerprint_config.get('rcut', default_fingerprint_rcut),
+                nbins = fingerprint_config.get('nbins', default_fingerprint_nbins),
+            )
         iter_data.append(Path(name))
+        if fingerprint_config is not None and fingerprint_config.get('tol') is not None:
+            write_fingerprint_index(
+                iter_data,
+                fingerprint_config['tol'],
+                fingerprint_config.get('rcut', default_fingerprint_rcut),
+                fingerprint_config.get('nbins', default_fingerprint_nbins),
+            )
 
         return OPIO({
             'iter_data' : iter_data,
         })
-            
 
+    @staticmethod
+    def _write_fingerprints(
+            name,
+            ms : dpdata.MultiSystems,
+            type_map : List[str],
+            rcut : float = default_fingerprint_rcut,
+            nbins : int = default_fingerprint_nbins,
+    ):
+        ntypes = len(type_map)
+        fps = [np.zeros([0, ntypes * (ntypes + 1) // 2 * nbins])]
+        for ss in ms:
+            fps.append(radial_fingerprints(
+                ss['coords'], ss['cells'], ss['atom_types'], ntypes,
+                rcut, nbins, ss.nopbc))
+        write_fingerprints(name, np.concatenate(fps), rcut, nbins)
@@ -12,6 +12,10 @@ from pathlib import Path
 from dpgen2.exploration.task import ExplorationTaskGroup
 from dpgen2.constants import (
     lmp_task_pattern,
+    lmp_file_store_name,
+)
+from dpgen2.utils.content_store import (
+    ContentStore,
 )
 
 class PrepLmp(OP):
@@ -23,6 +27,9 @@ class PrepLmp(OP):
     `op["task_paths"]`. The identities of the tasks are returned as
     `op["task_names"]`.
 
+    Each distinct file content is written once to a content-addressed
+    store, and hard linked into the task directories.
+
     """
 
     @classmethod
@@ -49,7 +56,7 @@ class PrepLmp(OP):
         ----------
         ip : dict
             Input dict with components:
-            - `lmp_task_grp` : (`Artifact(Path)`) Can be pickle loaded as a ExplorationTaskGroup. Definitions for LAMMPS tasks
+            - `lmp_task_grp` : (`Artifact(Path)`) Can be pickle loaded as a ExplorationTaskGroup. Definitions for LAMMPS tasks. The tasks of a lazy group are made and written one by one.
         
         Returns
         -------
@@ -61,11 +68,12 @@ class PrepLmp(OP):
         """
 
         lmp_task_grp = ip['lmp_task_grp']
+        store = ContentStore(lmp_file_store_name)
         cc = 0
         task_paths = []
         for tt in lmp_task_grp:
             ff = tt.files()
-            tname = _mk_task_from_files(cc, ff)
+            tname = _mk_task_from_files(cc, ff, store)
             task_paths.append(tname)
             cc += 1
         task_names = [str(ii) for ii in task_paths]
@@ -76,11 +84,14 @@ class PrepLmp(OP):
 
 PrepExplorationTaskGroup = PrepLmp
 
-def _mk_task_from_files(cc, ff):
+def _mk_task_from_files(cc, ff, store=None):
     tname = Path(lmp_task_pattern % cc)
     tname.mkdir(exist_ok=True, parents=True)
     for nn in ff.keys():
-        (tname/nn).write_text(ff[nn])
+        if store is None:
+            (tname/nn).write_text(ff[nn])
+        else:
+            store.link(ff[nn], tname/nn)
     return tname
 
 
@@ -20,9 +20,12 @@ from dpgen2.utils import (
 from dpgen2.constants import (
     lmp_conf_name,
     lmp_input_name,
+    lmp_input_spec_name,
     lmp_log_name,
     lmp_traj_name,
     lmp_model_devi_name,
+    lmp_partition_input_name,
+    lmp_partition_log_name,
     model_name_pattern,
 )
 from dargs import (
@@ -31,6 +34,7 @@ from dargs import (
     Variant, 
     ArgumentEncoder,
 )
+from dpgen2.exploration.task.lmp import make_lmp_input, make_lmp_partition_input
 
 
 class RunLmp(OP):
@@ -42,7 +46,13 @@ class RunLmp(OP):
     and the model deviation will be stored in files `op["traj"]` and
     `op["model_devi"]`, respectively.
 
+    If the task provides the input spec (the json file of the arguments
+    of `make_lmp_input`) instead of the LAMMPS input, the input is
+    rendered in directory `task_name`.
+
     """
+    # if the OP runs a group of tasks in one call
+    run_group = False
 
     @classmethod
     def get_input_sign(cls):
@@ -90,31 +100,23 @@ class RunLmp(OP):
         ----------
         TransientError
             On the failure of LAMMPS execution. Handle different failure cases? e.g. loss atoms.
+            The run stopped by `fix halt` is not a failure.
         """
         config = ip['config'] if ip['config'] is not None else {}
         config = RunLmp.normalize_config(config)
         command = config['command']
         task_name = ip['task_name']
-        task_path = ip['task_path']
+        task_path = Path(ip['task_path']).resolve()
         models = ip['models']
-        input_files = [lmp_conf_name, lmp_input_name]
-        input_files = [(Path(task_path)/ii).resolve() for ii in input_files]
         model_files = [Path(ii).resolve() for ii in models]
         work_dir = Path(task_name)
 
         with set_directory(work_dir):
-            # link input files
-            for ii in input_files:
-                iname = ii.name
-                Path(iname).symlink_to(ii)
-            # link models
-            for idx,mm in enumerate(model_files):
-                mname = model_name_pattern % (idx)
-                Path(mname).symlink_to(mm)
+            RunLmp.prepare_inputs(task_path, model_files)
             # run lmp
             command = ' '.join([command, '-i', lmp_input_name, '-log', lmp_log_name])
             ret, out, err = run_command(command, shell=True)
-            if ret != 0:
+            if ret != 0 and not RunLmp.halted(lmp_log_name):
                 raise TransientError(
                     'lmp failed\n',
                     'out msg', out, '\n',
@@ -128,11 +130,78 @@ class RunLmp(OP):
         })        
 
             
+    @staticmethod
+    def prepare_inputs(
+            task_path : Path,
+            model_files : List[Path],
+    ):
+        r"""Link the input files and the models to the current directory.
+        If the task provides the input spec instead of the LAMMPS input,
+        the input is rendered from the spec. The paths should be absolute.
+
+        """
+        task_path = Path(task_path)
+        input_files = [lmp_conf_name, lmp_input_name]
+        input_spec = None
+        if not (task_path/lmp_input_name).exists() and \
+           (task_path/lmp_input_spec_name).is_file():
+            input_spec = (task_path/lmp_input_spec_name).resolve()
+            input_files = [lmp_conf_name]
+        # link input files
+        for ii in input_files:
+            Path(ii).symlink_to(task_path/ii)
+        # render the input from the spec
+        if input_spec is not None:
+            Path(lmp_input_name).write_text(
+                make_lmp_input(**json.loads(input_spec.read_text())))
+        # link models
+        for idx,mm in enumerate(model_files):
+            mname = model_name_pattern % (idx)
+            Path(mname).symlink_to(mm)
+
+    @staticmethod
+    def halted(
+            log_file : Path,
+            tail_size : int = 65536,
+    ) -> bool:
+        r"""If the run is stopped by `fix halt`, checked by the message
+        in the tail of the LAMMPS log.
+
+        """
+        return RunLmp._log_tail_has(log_file, b'Fix halt condition', tail_size)
+
+    @staticmethod
+    def finished(
+            log_file : Path,
+            tail_size : int = 65536,
+    ) -> bool:
+        r"""If the run has reached the end of its input, checked by the 
+        total wall time printed in the tail of the LAMMPS log.
+
+        """
+        return RunLmp._log_tail_has(log_file, b'Total wall time', tail_size)
+
+    @staticmethod
+    def _log_tail_has(
+            log_file : Path,
+            msg : bytes,
+            tail_size : int,
+    ) -> bool:
+        log_file = Path(log_file)
+        if not log_file.is_file():
+            return False
+        with open(log_file, 'rb') as fp:
+            fp.seek(0, os.SEEK_END)
+            fp.seek(max(fp.tell() - tail_size, 0))
+            return msg in fp.read()
+
     @staticmethod
     def lmp_args():
-        doc_lmp_cmd = "The command of LAMMPS"
+        doc_lmp_cmd = "The command of LAMMPS. In the multi-partition mode, `{nprocs}` in the command is replaced by the total number of the MPI processes, e.g. `mpirun -np {nprocs} lmp`"
+        doc_partition_procs = "The number of the MPI processes of each partition in the multi-partition mode"
         return [
             Argument("command", str, optional=True, default='lmp', doc=doc_lmp_cmd),
+            Argument("partition_procs", int, optional=True, default=1, doc=doc_partition_procs),
         ]
 
     @staticmethod
@@ -144,4 +213,114 @@ class RunLmp(OP):
         return data
 
     
+
+class RunLmpPartition(RunLmp):
+    r"""Execute a group of LAMMPS tasks in one LAMMPS run in the
+    multi-partition mode (`lmp -partition`).
+
+    The working directory of each task is prepared as in `RunLmp`.
+    A master input is written to the current directory, by which each
+    partition enters the directory of one task and runs its input. The
+    log, trajectory and model deviation of each task are thus written to
+    the directory of the task, and no splitting of the outputs is needed.
+
+    The OP should be used in slices with `group_size`, but without
+    `pool_size`, so the tasks of a group are passed to the OP as lists.
+
+    """
+    run_group = True
+
+    @classmethod
+    def get_input_sign(cls):
+        return OPIOSign({
+            "config" : dict,
+            "task_name": List[str],
+            "task_path": Artifact(List[Path]),
+            "models" : Artifact(List[Path]),
+        })
+
+    @classmethod
+    def get_output_sign(cls):
+        return OPIOSign({
+            "log" : Artifact(List[Path]),
+            "traj" : Artifact(List[Path]),
+            "model_devi": Artifact(List[Path]),
+        })
+
+    @OP.exec_sign_check
+    def execute(
+            self,
+            ip : OPIO,
+    ) -> OPIO:
+        r"""Execute the OP.
+
+        Parameters
+        ----------
+        ip : dict
+            Input dict with components:
+        
+            - `config`: (`dict`) The config of lmp task. Check `RunLmp.lmp_args` for definitions.
+            - `task_name`: (`List[str]`) The names of the tasks.
+            - `task_path`: (`Artifact(List[Path])`) The paths that contain all input files prepareed by `PrepLmp`.
+            - `models`: (`Artifact(List[Path])`) The frozen model to estimate the model deviation. The first model with be used to drive molecular dynamics simulation.
+
+        Returns
+        -------
+            Output dict with components:
+        
+            - `log`: (`Artifact(List[Path])`) The log files of LAMMPS.
+            - `traj`: (`Artifact(List[Path])`) The output trajectories.
+            - `model_devi`: (`Artifact(List[Path])`) The model deviations.
+        
+        Exceptions
+        ----------
+        TransientError
+            On the failure of LAMMPS execution in any partition. The
+            partitions stopped by `fix halt` are not failures.
+        """
+        config = ip['config'] if ip['config'] is not None else {}
+        config = RunLmp.normalize_config(config)
+        task_names = list(ip['task_name'])
+        task_paths = [Path(ii).resolve() for ii in ip['task_path']]
+        if len(task_names) != len(task_paths):
+            raise FatalError(
+                f'the number of task names {len(task_names)} does not match '
+                f'the number of task paths {len(task_paths)}')
+        model_files = [Path(ii).resolve() for ii in ip['models']]
+        work_dirs = [Path(ii) for ii in task_names]
+
+        for tp, wd in zip(task_paths, work_dirs):
+            with set_directory(wd):
+                RunLmp.prepare_inputs(tp, model_files)
+        Path(lmp_partition_input_name).write_text(
+            make_lmp_partition_input(task_names))
+        # run lmp
+        npart = len(task_names)
+        procs = config['partition_procs']
+        command = config['command'].replace('{nprocs}', str(npart * procs))
+        command = ' '.join([
+            command, '-partition', f'{npart}x{procs}',
+            '-i', lmp_partition_input_name, '-log', lmp_partition_log_name,
+        ])
+        ret, out, err = run_command(command, shell=True)
+        # the exit code is shared by all the partitions. a partition
+        # stopped by `fix halt` or run to the end is not a failure.
+        failed = [
+            nn for nn, wd in zip(task_names, work_dirs) if
+            not (RunLmp.halted(wd / lmp_log_name) or RunLmp.finished(wd / lmp_log_name))
+        ] if ret != 0 else []
+        if len(failed) > 0:
+            raise TransientError(
+                'lmp failed in tasks ', ' '.join(failed), '\n',
+                'out msg', out, '\n',
+                'err msg', err, '\n'
+            )
+
+        return OPIO({
+            "log" : [ii / lmp_log_name for ii in work_dirs],
+            "traj" : [ii / lmp_traj_name for ii in work_dirs],
+            "model_devi" : [ii / lmp_model_devi_name for ii in work_dirs],
+        })
+
+    
 config_args = RunLmp.lmp_args
@@ -25,6 +25,7 @@ class SelectConfs(OP):
 
             "trajs": Artifact(List[Path]),
             "model_devis": Artifact(List[Path]),
+            "iter_data": Artifact(List[Path], optional=True),
         })
 
     @classmethod
@@ -52,12 +53,13 @@ class SelectConfs(OP):
             - `type_map`: (`List[str]`) The type map.
             - `trajs`: (`Artifact(List[Path])`) The trajectories generated in the exploration.
             - `model_devis`: (`Artifact(List[Path])`) The file storing the model deviation of the trajectory. The order of model deviation storage is consistent with that of the trajectories. The order of frames of one model deviation storage is also consistent with tat of the corresponding trajectory.
+            - `iter_data`: (`Artifact(List[Path])`, optional) The data paths of previous iterations. The selector may skip the configurations near-duplicated to the labeled ones.
 
         Returns
         -------
             Output dict with components:
         
-            - `report`: (`ExplorationReport`) The report on the exploration.
+            - `report`: (`ExplorationReport`) The compact report on the exploration.
             - `conf`: (`Artifact(List[Path])`) The selected configurations.
         
         """
@@ -68,15 +70,17 @@ class SelectConfs(OP):
 
         trajs = ip['trajs']
         model_devis = ip['model_devis']
+        iter_data = ip.get('iter_data')
 
         confs, report = conf_selector.select(
             trajs, 
             model_devis, 
             traj_fmt = traj_fmt,
             type_map = type_map,
+            iter_data = iter_data,
         )
 
         return OPIO({
-            "report" : report,
+            "report" : report.compact(),
             "confs" : confs,
         })
@@ -43,7 +43,21 @@ class ConcurrentLearningBlock(Steps):
             select_confs_config : dict = normalize_step_dict({}),
             collect_data_config : dict = normalize_step_dict({}),
             upload_python_package : str = None,
+            fingerprint_config : dict = None,
     ):
+        """
+        Parameters
+        ----------
+        fingerprint_config : dict
+            The cut-off radius `rcut` and the number of bins `nbins` of the
+            radial fingerprints, and the dedup tolerance `tol` by which the
+            index of the fingerprints is persisted. If set, the fingerprints of the labeled
+            frames are written by the collect-data step, and the iteration
+            data are passed to the select-confs step to skip the 
+            near-duplicates of the labeled frames. Otherwise the iteration
+            data are not passed to the select-confs step.
+
+        """
         self._input_parameters={
             "block_id" : InputParameter(),
             "type_map" : InputParameter(),
@@ -107,6 +121,7 @@ class ConcurrentLearningBlock(Steps):
             select_confs_config = select_confs_config,
             collect_data_config = collect_data_config,
             upload_python_package = upload_python_package,
+            fingerprint_config = fingerprint_config,
         )
 
     @property
@@ -142,6 +157,7 @@ def _block_cl(
         select_confs_config : dict = normalize_step_dict({}),
         collect_data_config : dict = normalize_step_dict({}),
         upload_python_package : str = None,
+        fingerprint_config : dict = None,
 ):
     select_confs_config = deepcopy(select_confs_config)
     collect_data_config = deepcopy(collect_data_config)
@@ -183,6 +199,14 @@ def _block_cl(
     )
     block_steps.add(prep_run_lmp)
         
+    select_confs_artifacts = {
+        "trajs" : prep_run_lmp.outputs.artifacts['trajs'],
+        "model_devis" : prep_run_lmp.outputs.artifacts['model_devis'],
+    }
+    # the iteration data are downloaded only to skip the near-duplicates
+    # of the labeled frames
+    if fingerprint_config is not None:
+        select_confs_artifacts["iter_data"] = block_steps.inputs.artifacts['iter_data']
     select_confs = Step(
         name = name + '-select-confs',
         template=PythonOPTemplate(
@@ -198,10 +222,7 @@ def _block_cl(
             "type_map": block_steps.inputs.parameters["type_map"],
             "traj_fmt": 'lammps/dump',
         },
-        artifacts={
-            "trajs" : prep_run_lmp.outputs.artifacts['trajs'],
-            "model_devis" : prep_run_lmp.outputs.artifacts['model_devis'],
-        },
+        artifacts=select_confs_artifacts,
         key = step_keys['select-confs'],
         executor = select_confs_executor,
         **select_confs_config,
@@ -224,6 +245,12 @@ def _block_cl(
     )
     block_steps.add(prep_run_fp)
 
+    collect_data_parameters = {
+        "name": block_steps.inputs.parameters["block_id"],
+        "type_map": block_steps.inputs.parameters["type_map"],
+    }
+    if fingerprint_config is not None:
+        collect_data_parameters["fingerprint_config"] = fingerprint_config
     collect_data = Step(
         name = name + '-collect-data',
         template=PythonOPTemplate(
@@ -234,10 +261,7 @@ def _block_cl(
             python_packages = upload_python_package,
             **collect_data_template_config,
         ),
-        parameters={
-            "name": block_steps.inputs.parameters["block_id"],
-            "type_map": block_steps.inputs.parameters["type_map"],
-        },
+        parameters=collect_data_parameters,
         artifacts={
             "iter_data" : block_steps.inputs.artifacts['iter_data'],
             "labeled_data" : prep_run_fp.outputs.artifacts['labeled_data'],
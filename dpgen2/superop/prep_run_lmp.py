@@ -42,7 +42,23 @@ class PrepRunLmp(Steps):
             prep_config : dict = normalize_step_dict({}),
             run_config : dict = normalize_step_dict({}),
             upload_python_package : str = None,
+            group_size : int = None,
+            pool_size : int = None,
     ):
+        """
+        Parameters
+        ----------
+        group_size : int
+            The number of LAMMPS tasks packed in one slice of the run
+            step. If `None`, each slice runs one task.
+        pool_size : int
+            The number of the tasks run in parallel in one slice. If
+            `None`, the tasks of a slice are run sequentially. If the
+            `run_op` runs a group of tasks in one call, e.g.
+            `RunLmpPartition`, the `group_size` should be provided and
+            the `pool_size` should be `None`.
+
+        """
         self._input_parameters = {
             "block_id" : InputParameter(type=str, value=""),
             "lmp_config" : InputParameter(),
@@ -91,6 +107,8 @@ class PrepRunLmp(Steps):
             prep_config = prep_config,
             run_config = run_config,
             upload_python_package = upload_python_package,
+            group_size = group_size,
+            pool_size = pool_size,
         )            
         
     @property
@@ -122,7 +140,17 @@ def _prep_run_lmp(
         prep_config : dict = normalize_step_dict({}),
         run_config : dict = normalize_step_dict({}),
         upload_python_package : str = None,
+        group_size : int = None,
+        pool_size : int = None,
 ):
+    if getattr(run_op, 'run_group', False):
+        if group_size is None or pool_size is not None:
+            raise RuntimeError(
+                'the run op running a group of tasks in one call needs '
+                'the group_size, and does not accept the pool_size')
+    elif group_size is not None and pool_size is None:
+        # run the tasks of a group one by one
+        pool_size = 1
     prep_config = deepcopy(prep_config)
     run_config = deepcopy(run_config)
     prep_template_config = prep_config.pop('template_config')
@@ -160,6 +188,10 @@ def _prep_run_lmp(
                 input_parameter = ["task_name"],
                 input_artifact = ["task_path"],
                 output_artifact = ["log", "traj", "model_devi"],
+                # the tasks of a group are run in one pod, the outputs
+                # are in the order of the tasks.
+                group_size = group_size,
+                pool_size = pool_size,
             ),
             python_packages = upload_python_package,
             **run_template_config,
@@ -35,3 +35,36 @@ from .dflow_query import (
     sort_slice_ops,
     print_keys_in_nice_format,
 )
+from .lmp_dump_index import (
+    make_dump_index,
+    read_dump_timesteps,
+    read_dump_frames,
+)
+from .model_devi import (
+    load_model_devi,
+    load_atomic_model_devi,
+)
+from .neighbor_list import (
+    neighbor_pairs,
+    batched_neighbor_pairs,
+    cluster_labels,
+)
+from .fingerprint import (
+    radial_fingerprint,
+    radial_fingerprints,
+    dedup_fingerprints,
+    farthest_point_sampling,
+)
+from .fingerprint_index import (
+    FingerprintIndex,
+    write_fingerprints,
+    load_fingerprint_index,
+    write_fingerprint_index,
+)
+from .cluster_carve import (
+    carve_cluster,
+    carve_system,
+)
+from .content_store import (
+    ContentStore,
+)
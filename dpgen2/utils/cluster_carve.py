@@ -0,0 +1,109 @@
+import dpdata
+import numpy as np
+from typing import (
+    Tuple,
+)
+
+def carve_cluster(
+        coords : np.ndarray,
+        cell : np.ndarray,
+        atom_types : np.ndarray,
+        center : int,
+        radius : float,
+        vacuum : float = 10.,
+        nopbc : bool = False,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Carve a spherical cluster around an atom. The cluster is placed at the
+    center of a cubic box with the vacuum in between the periodic images.
+
+    Parameters
+    ----------
+    coords : numpy.ndarray
+        The coordinates, of shape natoms x 3.
+    cell : numpy.ndarray
+        The cell tensor, of shape 3 x 3.
+    atom_types : numpy.ndarray
+        The atom types, of shape natoms.
+    center : int
+        The index of the atom at the center of the cluster.
+    radius : float
+        The radius of the cluster. The minimum image convention is used,
+        so the radius should be smaller than the half of the cell width.
+    vacuum : float
+        The thickness of the vacuum between the cluster and its images.
+    nopbc : bool
+        If no periodic boundary condition.
+
+    Returns
+    -------
+    coords : numpy.ndarray
+        The coordinates of the cluster, the center atom is the first.
+    atom_types : numpy.ndarray
+        The atom types of the cluster.
+    cell : numpy.ndarray
+        The cubic box of the cluster, of side length 2 * radius + vacuum.
+
+    """
+    coords = np.asarray(coords, dtype=float)
+    atom_types = np.asarray(atom_types, dtype=int)
+    dd = coords - coords[center]
+    if not nopbc:
+        cell = np.asarray(cell, dtype=float)
+        frac = dd @ np.linalg.inv(cell)
+        frac -= np.round(frac)
+        dd = frac @ cell
+    dist = np.linalg.norm(dd, axis=1)
+    sel = np.where(dist < radius)[0]
+    # the center atom first, then by the distance
+    sel = sel[np.argsort(dist[sel], kind='stable')]
+    box = 2. * radius + vacuum
+    return dd[sel] + 0.5 * box, atom_types[sel], np.eye(3) * box
+
+
+def carve_system(
+        system : dpdata.System,
+        centers : np.ndarray,
+        radius : float,
+        vacuum : float = 10.,
+) -> dpdata.MultiSystems:
+    """
+    Carve one cluster from each frame of the system. The clusters are
+    isolated from their periodic images by the vacuum. They are kept
+    periodic because the box of the non-periodic systems is not stored
+    in the deepmd/npy format, while the FP calculations need the box.
+
+    Parameters
+    ----------
+    system : dpdata.System
+        The system.
+    centers : numpy.ndarray
+        The index of the center atom of the cluster in each frame.
+    radius : float
+        The radius of the clusters.
+    vacuum : float
+        The thickness of the vacuum between the cluster and its images.
+
+    Returns
+    -------
+    clusters : dpdata.MultiSystems
+        The clusters. The clusters of the same formula are in one system.
+
+    """
+    atom_names = list(system['atom_names'])
+    ms = dpdata.MultiSystems(type_map=atom_names)
+    for ii in range(system.get_nframes()):
+        cc, tt, bb = carve_cluster(
+            system['coords'][ii], system['cells'][ii], system['atom_types'],
+            centers[ii], radius, vacuum, system.nopbc)
+        # dpdata expects the atoms sorted by the types
+        idx = np.argsort(tt, kind='stable')
+        ss = dpdata.System()
+        ss.data['atom_names'] = atom_names
+        ss.data['atom_numbs'] = [int(np.sum(tt == jj)) for jj in range(len(atom_names))]
+        ss.data['atom_types'] = tt[idx]
+        ss.data['orig'] = np.zeros(3)
+        ss.data['cells'] = bb[None, :, :]
+        ss.data['coords'] = cc[idx][None, :, :]
+        ms.append(ss)
+    return ms
@@ -0,0 +1,71 @@
+import os, hashlib, shutil
+from pathlib import Path
+from typing import (
+    Union,
+)
+
+class ContentStore():
+    """Content-addressed store of files.
+
+    Each content is written once, to a file named by its sha256 hash,
+    and linked to the destinations by hard links. If the hard link is not
+    supported, e.g. the destination is on another file system, the file
+    is copied. The linked files share the data, so they should not be
+    modified in place.
+
+    Parameters
+    ----------
+    root : str or Path
+        The directory of the store.
+
+    """
+    def __init__(
+            self,
+            root : Union[str, Path],
+    ):
+        self.root = Path(root)
+        self.root.mkdir(exist_ok=True, parents=True)
+
+    @staticmethod
+    def content_hash(
+            content : str,
+    ) -> str:
+        """The sha256 hash of the content."""
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def put(
+            self,
+            content : str,
+    ) -> Path:
+        """Write the content to the store if it is not stored.
+
+        Returns
+        -------
+        path : Path
+            The path of the stored file.
+
+        """
+        path = self.root / self.content_hash(content)
+        if not path.is_file():
+            tmp = path.with_name(path.name + f'.{os.getpid()}.tmp')
+            tmp.write_text(content)
+            os.replace(tmp, path)
+        return path
+
+    def link(
+            self,
+            content : str,
+            dest : Union[str, Path],
+    ) -> Path:
+        """Link the stored content to `dest`. An existing `dest` is replaced.
+
+        """
+        src = self.put(content)
+        dest = Path(dest)
+        if dest.is_file() or dest.is_symlink():
+            os.remove(dest)
+        try:
+            os.link(src, dest)
+        except OSError:
+            shutil.copyfile(src, dest)
+        return dest
@@ -0,0 +1,247 @@
+import itertools
+import numpy as np
+from typing import (
+    Tuple,
+)
+from dpgen2.utils.neighbor_list import (
+    batched_neighbor_pairs,
+)
+
+default_fingerprint_rcut = 6.0
+default_fingerprint_nbins = 30
+
+def radial_fingerprint(
+        coords : np.ndarray,
+        cell : np.ndarray,
+        atom_types : np.ndarray,
+        ntypes : int,
+        rcut : float = default_fingerprint_rcut,
+        nbins : int = default_fingerprint_nbins,
+        nopbc : bool = False,
+) -> np.ndarray:
+    """
+    The structural fingerprint of a configuration: the per-type-pair
+    radial distribution of the neighbors, averaged over the atoms.
+    Each pair distance is linearly interpolated onto the two nearest bin
+    centers, so the fingerprint changes continuously with the coordinates.
+
+    Parameters
+    ----------
+    coords : numpy.ndarray
+        The coordinates, of shape natoms x 3.
+    cell : numpy.ndarray
+        The cell tensor, of shape 3 x 3.
+    atom_types : numpy.ndarray
+        The atom types, of shape natoms.
+    ntypes : int
+        The number of atom types.
+    rcut : float
+        The cut-off radius.
+    nbins : int
+        The number of bins of each radial distribution.
+    nopbc : bool
+        If no periodic boundary condition.
+
+    Returns
+    -------
+    fingerprint : numpy.ndarray
+        The fingerprint, of shape ntypes * (ntypes + 1) / 2 * nbins.
+
+    """
+    coords = np.asarray(coords, dtype=float).reshape(1, -1, 3)
+    cell = None if nopbc else np.asarray(cell, dtype=float).reshape(1, 3, 3)
+    return radial_fingerprints(
+        coords, cell, atom_types, ntypes, rcut, nbins, nopbc)[0]
+
+
+def radial_fingerprints(
+        coords : np.ndarray,
+        cells : np.ndarray,
+        atom_types : np.ndarray,
+        ntypes : int,
+        rcut : float = default_fingerprint_rcut,
+        nbins : int = default_fingerprint_nbins,
+        nopbc : bool = False,
+) -> np.ndarray:
+    """
+    The fingerprints of the frames. See `radial_fingerprint`. The 
+    neighbors of all the frames are searched at once, and the pair
+    distances are binned together, with no loop over the frames.
+
+    Parameters
+    ----------
+    coords : numpy.ndarray
+        The coordinates, of shape nframes x natoms x 3.
+    cells : numpy.ndarray
+        The cell tensors, of shape nframes x 3 x 3.
+
+    Returns
+    -------
+    fingerprints : numpy.ndarray
+        The fingerprints, of shape nframes x (ntypes * (ntypes + 1) / 2 * nbins).
+
+    """
+    atom_types = np.asarray(atom_types, dtype=int)
+    natoms = atom_types.size
+    nframes = len(coords)
+    npairs = ntypes * (ntypes + 1) // 2
+    if natoms == 0 or nframes == 0:
+        return np.zeros([nframes, npairs * nbins])
+    ff, ii, jj, dist = batched_neighbor_pairs(coords, cells, rcut, nopbc)
+    # index of the unordered type pair
+    ti = np.minimum(atom_types[ii], atom_types[jj])
+    tj = np.maximum(atom_types[ii], atom_types[jj])
+    pair_idx = ti * ntypes - ti * (ti - 1) // 2 + (tj - ti)
+    # linear interpolation onto the bin centers
+    xx = dist / rcut * nbins - 0.5
+    lo = np.floor(xx).astype(int)
+    ww = xx - lo
+    ret = np.zeros(nframes * npairs * nbins)
+    for bb, weight in ((lo, 1. - ww), (lo + 1, ww)):
+        inside = (bb >= 0) & (bb < nbins)
+        ret += np.bincount(
+            (ff[inside] * npairs + pair_idx[inside]) * nbins + bb[inside],
+            weights=weight[inside], minlength=ret.size)
+    return ret.reshape(nframes, -1) / natoms
+
+
+def _near_pairs(
+        fps : np.ndarray,
+        ref : np.ndarray,
+        tol : float,
+        numb_dims : int = 4,
+        max_pairs : int = 2**20,
+) -> Tuple[np.ndarray, np.ndarray]:
+    # all the pairs of `fps` and `ref` within `tol`. the fingerprints are
+    # bucketed by a grid of cell size `tol` on a few random orthonormal
+    # projections. a pair within `tol` is within `tol` on any projection,
+    # so it is found in the adjacent cells, and the lookup is exact.
+    empty = np.zeros(0, dtype=np.int64)
+    if len(fps) == 0 or len(ref) == 0:
+        return empty, empty
+    dim = fps.shape[1]
+    numb_dims = min(numb_dims, dim)
+    rng = np.random.default_rng(0)
+    proj = np.linalg.qr(rng.normal(size=[dim, numb_dims]))[0]
+    mixer = rng.integers(1, 2**62, numb_dims) | 1
+    # any cell size not smaller than tol works
+    size = tol if tol > 0. else 1.
+    cell_fps = np.floor(fps @ proj / size).astype(np.int64)
+    cell_ref = np.floor(ref @ proj / size).astype(np.int64)
+    ref_keys = cell_ref @ mixer
+    order = np.argsort(ref_keys, kind='stable')
+    ref_keys = ref_keys[order]
+    pairs = [empty]
+    for offset in itertools.product([-1, 0, 1], repeat=numb_dims):
+        keys = (cell_fps + np.array(offset)) @ mixer
+        left = np.searchsorted(ref_keys, keys, side='left')
+        cnt = np.searchsorted(ref_keys, keys, side='right') - left
+        # the candidate pairs are compared in chunks of at most max_pairs
+        ends = np.cumsum(cnt)
+        for start in range(0, int(ends[-1]), max_pairs):
+            pp = np.arange(start, min(start + max_pairs, int(ends[-1])))
+            qq = np.searchsorted(ends, pp, side='right')
+            cc = order[left[qq] + pp - (ends[qq] - cnt[qq])]
+            near = np.linalg.norm(ref[cc] - fps[qq], axis=1) <= tol
+            pairs.append(qq[near] * len(ref) + cc[near])
+    # a pair is found more than once only if the keys of cells collide
+    pairs = np.unique(np.concatenate(pairs))
+    return pairs // len(ref), pairs % len(ref)
+
+
+def dedup_fingerprints(
+        fingerprints : np.ndarray,
+        tol : float,
+        chunk_size : int = 4096,
+) -> np.ndarray:
+    """
+    Greedily remove the near-duplicates. A fingerprint is kept if its
+    Euclidean distance to all the kept fingerprints before it is larger 
+    than `tol`. The near-duplicates are looked up in the buckets of a grid
+    on a few random projections of the fingerprints, instead of compared
+    with all the kept fingerprints.
+
+    The fingerprints are visited in chunks. The ones near-duplicated to
+    the kept fingerprints of the previous chunks are dropped, and the 
+    greedy choice among the rest of the chunk is resolved on their 
+    near-duplicated pairs in rounds: a fingerprint is dropped once any of
+    its earlier near-duplicates is kept, and kept once all of them are 
+    dropped.
+
+    Parameters
+    ----------
+    fingerprints : numpy.ndarray
+        The fingerprints, of shape nframes x dim.
+    tol : float
+        The tolerance.
+    chunk_size : int
+        The number of fingerprints visited at once.
+
+    Returns
+    -------
+    keep : numpy.ndarray
+        Boolean array of shape nframes, `True` for the kept frames.
+
+    """
+    fingerprints = np.asarray(fingerprints)
+    nframes = len(fingerprints)
+    keep = np.zeros(nframes, dtype=bool)
+    for start in range(0, nframes, chunk_size):
+        fps = fingerprints[start:start+chunk_size]
+        dup, _ = _near_pairs(fps, fingerprints[:start][keep[:start]], tol)
+        cand = np.setdiff1d(np.arange(len(fps)), dup)
+        qq, cc = _near_pairs(fps[cand], fps[cand], tol)
+        # each fingerprint with its earlier near-duplicates
+        earlier = cc < qq
+        qq, cc = qq[earlier], cc[earlier]
+        # 1 for kept, -1 for dropped, 0 for not decided
+        state = np.zeros(cand.size, dtype=np.int8)
+        while np.any(state == 0):
+            drop = np.zeros(cand.size, dtype=bool)
+            drop[qq[state[cc] == 1]] = True
+            wait = np.zeros(cand.size, dtype=bool)
+            wait[qq[state[cc] != -1]] = True
+            todo = state == 0
+            state[todo & drop] = -1
+            state[todo & np.logical_not(drop | wait)] = 1
+        keep[start + cand[state == 1]] = True
+    return keep
+
+
+def farthest_point_sampling(
+        fingerprints : np.ndarray,
+        nsel : int,
+) -> np.ndarray:
+    """
+    Select the most diverse fingerprints by the farthest point sampling.
+    Starting from the first fingerprint, the one farthest from the selected
+    ones is selected in turn. The cost is O(nsel * nframes).
+
+    Parameters
+    ----------
+    fingerprints : numpy.ndarray
+        The fingerprints, of shape nframes x dim.
+    nsel : int
+        The number of fingerprints to select.
+
+    Returns
+    -------
+    sel : numpy.ndarray
+        The indexes of the selected fingerprints, in the order of selection.
+
+    """
+    nframes = len(fingerprints)
+    nsel = min(nsel, nframes)
+    sel = np.zeros(nsel, dtype=int)
+    if nsel == 0:
+        return sel
+    # distance to the nearest selected fingerprint
+    min_dist = np.full(nframes, np.inf)
+    for ii in range(1, nsel):
+        dist = np.linalg.norm(fingerprints - fingerprints[sel[ii-1]], axis=1)
+        np.minimum(min_dist, dist, out=min_dist)
+        # the selected ones are never selected again, even if all the
+        # remaining ones are duplicates
+        min_dist[sel[ii-1]] = -1.
+        sel[ii] = np.argmax(min_dist)
+    return sel
@@ -0,0 +1,302 @@
+import numpy as np
+from pathlib import Path
+from typing import (
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+from dpgen2.constants import (
+    fingerprint_index_name,
+    fingerprint_table_name,
+)
+
+class FingerprintIndex():
+    """Index of fingerprints for the near-duplicate lookup.
+
+    The fingerprints are hashed by the locality-sensitive hashing of
+    random projections: each table hashes a fingerprint `x` to the bucket
+    `floor((A x + b) / w)`, with `w` a few times the tolerance. A query
+    compares the fingerprint only with the ones in the same bucket of any
+    table, so the cost does not grow with the size of the index. A
+    neighbor within the tolerance is found with a high probability, but
+    not guaranteed.
+
+    Parameters
+    ----------
+    tol : float
+        Two fingerprints are near-duplicates if their Euclidean distance
+        is not larger than `tol`.
+    numb_tables : int
+        The number of hash tables.
+    numb_hashes : int
+        The number of random projections of each hash table.
+    bucket_ratio : float
+        The width of the buckets in the unit of `tol`.
+    seed : int
+        The random seed of the projections.
+    max_pairs : int
+        The maximal number of the candidate pairs compared at once in a
+        query. The queried fingerprints are processed in chunks, so the
+        memory does not blow up when the buckets are crowded.
+
+    """
+    def __init__(
+            self,
+            tol : float,
+            numb_tables : int = 6,
+            numb_hashes : int = 6,
+            bucket_ratio : float = 4.,
+            seed : int = 0,
+            max_pairs : int = 2**20,
+    ):
+        self.tol = tol
+        self.numb_tables = numb_tables
+        self.numb_hashes = numb_hashes
+        self.width = max(bucket_ratio * tol, np.finfo(np.float32).tiny)
+        self.seed = seed
+        self.max_pairs = max_pairs
+        self.fingerprints = None
+        self.tables = []
+
+    def __len__(self):
+        return 0 if self.fingerprints is None else len(self.fingerprints)
+
+    def _init_hashes(
+            self,
+            dim : int,
+    ):
+        rng = np.random.default_rng(self.seed)
+        self.proj = rng.normal(size=[self.numb_tables, dim, self.numb_hashes])
+        self.shift = rng.uniform(0, self.width, [self.numb_tables, self.numb_hashes])
+        # mixes the bucket indexes of a table into one integer key
+        self.mixer = rng.integers(1, 2**62, self.numb_hashes) | 1
+
+    def _keys(
+            self,
+            fps : np.ndarray,
+            table : int,
+    ) -> np.ndarray:
+        buckets = np.floor((fps @ self.proj[table] + self.shift[table]) / self.width)
+        return np.sum(buckets.astype(np.int64) * self.mixer, axis=1)
+
+    def add(
+            self,
+            fps : np.ndarray,
+    ):
+        """Add fingerprints to the index. Only the new fingerprints are 
+        hashed, and their keys are merged into the sorted tables.
+
+        Parameters
+        ----------
+        fps : numpy.ndarray
+            The fingerprints, of shape nframes x dim.
+
+        """
+        fps = np.asarray(fps, dtype=np.float32)
+        if fps.size == 0:
+            return
+        if self.fingerprints is None:
+            self._init_hashes(fps.shape[1])
+            self.fingerprints = fps
+            empty = np.zeros(0, dtype=np.int64)
+            self.tables = [(empty, empty)] * self.numb_tables
+        else:
+            if fps.shape[1] != self.fingerprints.shape[1]:
+                raise RuntimeError(
+                    f'the dimension of fingerprints {fps.shape[1]} does not '
+                    f'match the index {self.fingerprints.shape[1]}')
+            self.fingerprints = np.concatenate((self.fingerprints, fps))
+        # each table is the sorted keys and the indexes of the fingerprints
+        new_idx = np.arange(len(self.fingerprints) - len(fps), len(self.fingerprints))
+        for tt in range(self.numb_tables):
+            keys = self._keys(fps, tt)
+            order = np.argsort(keys, kind='stable')
+            sorted_keys, sorted_idx = self.tables[tt]
+            pos = np.searchsorted(sorted_keys, keys[order], side='right')
+            self.tables[tt] = (
+                np.insert(sorted_keys, pos, keys[order]),
+                np.insert(sorted_idx, pos, new_idx[order]),
+            )
+
+    def query(
+            self,
+            fps : np.ndarray,
+    ) -> np.ndarray:
+        """Query if the fingerprints have near-duplicates in the index.
+
+        Parameters
+        ----------
+        fps : numpy.ndarray
+            The fingerprints, of shape nframes x dim.
+
+        Returns
+        -------
+        found : numpy.ndarray
+            Boolean array of shape nframes. `True` if a near-duplicate is
+            found in the index.
+
+        """
+        fps = np.asarray(fps, dtype=np.float32)
+        found = np.zeros(len(fps), dtype=bool)
+        if len(self) == 0 or len(fps) == 0:
+            return found
+        if fps.shape[1] != self.fingerprints.shape[1]:
+            raise RuntimeError(
+                f'the dimension of fingerprints {fps.shape[1]} does not '
+                f'match the index {self.fingerprints.shape[1]}')
+        for tt in range(self.numb_tables):
+            todo = np.where(np.logical_not(found))[0]
+            if todo.size == 0:
+                break
+            sorted_keys, order = self.tables[tt]
+            keys = self._keys(fps[todo], tt)
+            left = np.searchsorted(sorted_keys, keys, side='left')
+            cnt = np.searchsorted(sorted_keys, keys, side='right') - left
+            # the candidate pairs are numbered consecutively by the queries,
+            # and are compared in chunks of at most max_pairs
+            ends = np.cumsum(cnt)
+            npairs = int(ends[-1])
+            for start in range(0, npairs, self.max_pairs):
+                pp = np.arange(start, min(start + self.max_pairs, npairs))
+                jj = np.searchsorted(ends, pp, side='right')
+                qq = todo[jj]
+                cc = order[left[jj] + pp - (ends[jj] - cnt[jj])]
+                dist = np.linalg.norm(self.fingerprints[cc] - fps[qq], axis=1)
+                found[qq[dist <= self.tol]] = True
+        return found
+
+
+def write_fingerprints(
+        dirname : Union[str, Path],
+        fps : np.ndarray,
+        rcut : float,
+        nbins : int,
+):
+    """
+    Write the fingerprints of the frames in an iteration data directory.
+
+    """
+    np.savez(
+        Path(dirname) / fingerprint_index_name,
+        fingerprints = np.asarray(fps, dtype=np.float32),
+        rcut = rcut,
+        nbins = nbins,
+    )
+
+
+def _read_shards(
+        iter_data : List[Path],
+        rcut : float,
+        nbins : int,
+) -> List[Tuple[str, np.ndarray]]:
+    # the names of the directories and the fingerprints written in them
+    shards = []
+    for ii in iter_data:
+        fname = Path(ii) / fingerprint_index_name
+        if not fname.is_file():
+            continue
+        with np.load(fname) as data:
+            if float(data['rcut']) != float(rcut) or int(data['nbins']) != int(nbins):
+                raise RuntimeError(
+                    f'the fingerprints in {ii} are written with rcut '
+                    f'{float(data["rcut"])} and nbins {int(data["nbins"])}, '
+                    f'which do not match rcut {rcut} and nbins {nbins}')
+            shards.append((Path(ii).name, data['fingerprints']))
+    return shards
+
+
+def _read_tables(
+        fname : Path,
+        tol : float,
+        shards : List[Tuple[str, np.ndarray]],
+) -> Optional[Tuple[FingerprintIndex, int]]:
+    # the persisted index and the number of the shards it covers. None if
+    # the index is built with other parameters or other shards.
+    index = FingerprintIndex(tol)
+    with np.load(fname) as data:
+        params = [index.tol, index.width, index.numb_tables, index.numb_hashes, index.seed]
+        if data['params'].tolist() != params:
+            return None
+        covered = list(zip(data['shard_names'].tolist(), data['shard_sizes'].tolist()))
+        if [(nn, len(ff)) for nn, ff in shards[:len(covered)]] != covered:
+            return None
+        fps = [ff for _, ff in shards[:len(covered)] if ff.size > 0]
+        if len(fps) > 0:
+            index.fingerprints = np.concatenate(fps).astype(np.float32)
+            index._init_hashes(index.fingerprints.shape[1])
+            index.tables = list(zip(data['keys'], data['order']))
+    return index, len(covered)
+
+
+def _build_index(
+        iter_data : List[Path],
+        tol : float,
+        rcut : float,
+        nbins : int,
+) -> Tuple[FingerprintIndex, List[Tuple[str, np.ndarray]]]:
+    shards = _read_shards(iter_data, rcut, nbins)
+    index, nold = None, 0
+    # the index persisted in the latest directory
+    for ii in reversed(iter_data):
+        fname = Path(ii) / fingerprint_table_name
+        if fname.is_file():
+            read = _read_tables(fname, tol, shards)
+            if read is not None:
+                index, nold = read
+            break
+    if index is None:
+        index = FingerprintIndex(tol)
+    fps = [ff for _, ff in shards[nold:] if ff.size > 0]
+    if len(fps) > 0:
+        index.add(np.concatenate(fps))
+    return index, shards
+
+
+def load_fingerprint_index(
+        iter_data : List[Path],
+        tol : float,
+        rcut : float,
+        nbins : int,
+) -> FingerprintIndex:
+    """
+    Build the index from the fingerprints written in the iteration data
+    directories. The directories without fingerprints are skipped. A
+    `RuntimeError` is raised if the fingerprints are written with a
+    different `rcut` or `nbins`.
+
+    The hash tables persisted by `write_fingerprint_index` in the latest
+    directory are reused if they are built with the same parameters from
+    the leading directories, so only the fingerprints written after them
+    are hashed.
+
+    """
+    return _build_index(iter_data, tol, rcut, nbins)[0]
+
+
+def write_fingerprint_index(
+        iter_data : List[Path],
+        tol : float,
+        rcut : float,
+        nbins : int,
+) -> FingerprintIndex:
+    """
+    Build the index of the iteration data directories, see 
+    `load_fingerprint_index`, and persist its hash tables in the last
+    directory. The fingerprints are not copied, they are read from the
+    directories when the index is loaded.
+
+    """
+    index, shards = _build_index(iter_data, tol, rcut, nbins)
+    keys = np.array([kk for kk, _ in index.tables], dtype=np.int64).reshape(index.numb_tables, -1)
+    order = np.array([oo for _, oo in index.tables], dtype=np.int64).reshape(index.numb_tables, -1)
+    np.savez(
+        Path(iter_data[-1]) / fingerprint_table_name,
+        params = np.array(
+            [index.tol, index.width, index.numb_tables, index.numb_hashes, index.seed]),
+        shard_names = np.array([nn for nn, _ in shards], dtype=str),
+        shard_sizes = np.array([len(ff) for _, ff in shards], dtype=np.int64),
+        keys = keys,
+        order = order,
+    )
+    return index
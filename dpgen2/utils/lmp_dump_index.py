@@ -0,0 +1,125 @@
+import os, mmap, tempfile
+import dpdata
+import numpy as np
+from pathlib import Path
+from typing import (
+    List,
+    Union,
+)
+
+dump_frame_key = b'ITEM: TIMESTEP'
+
+def make_dump_index(
+        fname : Union[str, Path],
+) -> np.ndarray:
+    """
+    Make the frame index of a LAMMPS dump file.
+
+    Parameters
+    ----------
+    fname : str or Path
+        The LAMMPS dump file.
+
+    Returns
+    -------
+    index : numpy.ndarray
+        The byte offsets of the frames. The `ii`-th frame starts at
+        `index[ii]` and ends at `index[ii+1]`. The length of the array is
+        number of frames plus one, the last element is the file size.
+
+    """
+    offsets = []
+    with open(fname, 'rb') as fp:
+        size = os.fstat(fp.fileno()).st_size
+        if size > 0:
+            with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                pos = mm.find(dump_frame_key)
+                while pos >= 0:
+                    # only the keys at the beginning of a line count,
+                    # leading white spaces are allowed.
+                    line_start = mm.rfind(b'\n', 0, pos) + 1
+                    if mm[line_start:pos].strip() == b'':
+                        offsets.append(line_start)
+                    pos = mm.find(dump_frame_key, pos + len(dump_frame_key))
+    offsets.append(size)
+    return np.array(offsets, dtype=np.int64)
+
+
+def read_dump_timesteps(
+        fname : Union[str, Path],
+        index : np.ndarray = None,
+) -> np.ndarray:
+    """
+    Read the timesteps of the frames of a LAMMPS dump file. Only the
+    timestep line at the beginning of each frame is read.
+
+    Parameters
+    ----------
+    fname : str or Path
+        The LAMMPS dump file.
+    index : numpy.ndarray
+        The frame index of the dump file. If not provided, the index is
+        made by `make_dump_index`.
+
+    Returns
+    -------
+    timesteps : numpy.ndarray
+        The timesteps of the frames, in the order of the frames.
+
+    """
+    if index is None:
+        index = make_dump_index(fname)
+    steps = []
+    with open(fname, 'rb') as fp:
+        for ii in index[:-1]:
+            fp.seek(int(ii))
+            # the key line, then the timestep
+            fp.readline()
+            steps.append(int(fp.readline().split()[0]))
+    return np.array(steps, dtype=np.int64)
+
+
+def read_dump_frames(
+        fname : Union[str, Path],
+        frames : List[int],
+        type_map : List[str] = None,
+        index : np.ndarray = None,
+) -> dpdata.System:
+    """
+    Read frames from a LAMMPS dump file by random access. Only the
+    requested frames are read and parsed.
+
+    Parameters
+    ----------
+    fname : str or Path
+        The LAMMPS dump file.
+    frames : List[int]
+        The indexes of the frames to read.
+    type_map : List[str]
+        The type map.
+    index : numpy.ndarray
+        The frame index of the dump file. If not provided, the index is
+        made by `make_dump_index`.
+
+    Returns
+    -------
+    system : dpdata.System
+        The system of the requested frames, in the order of `frames`.
+
+    """
+    if index is None:
+        index = make_dump_index(fname)
+    nframes = index.size - 1
+    with tempfile.TemporaryDirectory() as tmpdir:
+        sub_fname = Path(tmpdir) / Path(fname).name
+        with open(fname, 'rb') as fin, open(sub_fname, 'wb') as fout:
+            for ii in frames:
+                if ii < 0 or ii >= nframes:
+                    raise IndexError(
+                        f'frame {ii} out of range, {fname} has {nframes} frames')
+                fin.seek(index[ii])
+                buff = fin.read(index[ii+1] - index[ii])
+                fout.write(buff)
+                if not buff.endswith(b'\n'):
+                    fout.write(b'\n')
+        return dpdata.System(str(sub_fname), fmt='lammps/dump', type_map=type_map)
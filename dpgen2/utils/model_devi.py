@@ -0,0 +1,92 @@
+import numpy as np
+from pathlib import Path
+from typing import (
+    List,
+    Tuple,
+    Union,
+)
+
+# number of the columns of the model deviations of the frame, i.e.
+# step, max_devi_v, min_devi_v, avg_devi_v, max_devi_f, min_devi_f, avg_devi_f.
+# the per-atom force model deviations, if any, follow these columns.
+model_devi_numb_columns = 7
+
+def load_model_devi(
+        fname : Union[str, Path],
+        columns : List[int] = None,
+) -> np.ndarray:
+    """
+    Load the model deviations of the frames from the model deviation file.
+    The model deviations are returned by columns.
+
+    Parameters
+    ----------
+    fname : str or Path
+        The model deviation file written by LAMMPS.
+    columns : List[int]
+        The columns to read. If `None`, all the columns of the model
+        deviations of the frames are read. The other columns, including
+        the per-atom ones (see `load_atomic_model_devi`), are not parsed.
+
+    Returns
+    -------
+    model_devi : numpy.ndarray
+        The requested columns, of shape len(columns) x nframes.
+
+    """
+    if columns is None:
+        columns = range(model_devi_numb_columns)
+    data = np.loadtxt(fname, usecols=list(columns), ndmin=2)
+    return np.ascontiguousarray(data.T)
+
+
+def load_atomic_model_devi(
+        fname : Union[str, Path],
+        frames : List[int] = None,
+) -> np.ndarray:
+    """
+    Load the per-atom force model deviations from the model deviation
+    file, which are written by LAMMPS if the `atomic` keyword of the
+    deepmd pair style is set. Only the lines of the requested frames are
+    parsed, and the deviations are stored in single precision.
+
+    Parameters
+    ----------
+    fname : str or Path
+        The model deviation file written by LAMMPS.
+    frames : List[int]
+        The frames to read. If `None`, all the frames are read.
+
+    Returns
+    -------
+    model_devi : numpy.ndarray
+        The per-atom force model deviations, of shape nframes x natoms.
+        The atoms are in the order of the atom ids. natoms is zero if the
+        per-atom model deviations are not written.
+
+    """
+    wanted = None if frames is None else set(frames)
+    last = None if frames is None else max(frames, default=-1)
+    rows = {}
+    iframe = 0
+    with open(fname) as fp:
+        for line in fp:
+            words = line.split()
+            if len(words) == 0 or words[0].startswith('#'):
+                continue
+            if last is not None and iframe > last:
+                break
+            if wanted is None or iframe in wanted:
+                rows[iframe] = np.array(
+                    words[model_devi_numb_columns:], dtype=np.float32)
+            iframe += 1
+    if frames is None:
+        frames = range(iframe)
+    missing = [ii for ii in frames if ii not in rows]
+    if len(missing) > 0:
+        raise RuntimeError(f'the frames {missing} are not found in {fname}')
+    natoms = len(rows[frames[0]]) if len(frames) > 0 else 0
+    ret = np.zeros([len(frames), natoms], dtype=np.float32)
+    for ii, ff in enumerate(frames):
+        ret[ii] = rows[ff]
+    return ret
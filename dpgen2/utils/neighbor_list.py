@@ -0,0 +1,212 @@
+import itertools
+import numpy as np
+from typing import (
+    Tuple,
+)
+
+def neighbor_pairs(
+        coords : np.ndarray,
+        cell : np.ndarray,
+        rcut : float,
+        nopbc : bool = False,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Find the pairs of atoms within the cut-off radius by a cell list.
+    The cost scales linearly with the number of atoms.
+
+    Parameters
+    ----------
+    coords : numpy.ndarray
+        The coordinates, of shape natoms x 3.
+    cell : numpy.ndarray
+        The cell tensor, of shape 3 x 3. Not used if `nopbc` is `True`.
+    rcut : float
+        The cut-off radius.
+    nopbc : bool
+        If no periodic boundary condition.
+
+    Returns
+    -------
+    ii : numpy.ndarray
+        The indexes of the center atoms.
+    jj : numpy.ndarray
+        The indexes of the neighbor atoms. Each pair appears twice, as
+        (i, j) and (j, i). An atom may be the neighbor of itself through
+        a periodic image.
+    dist : numpy.ndarray
+        The distances between the atoms.
+
+    """
+    coords = np.asarray(coords, dtype=float).reshape(1, -1, 3)
+    cell = None if nopbc else np.asarray(cell, dtype=float).reshape(1, 3, 3)
+    _, ii, jj, dist = batched_neighbor_pairs(coords, cell, rcut, nopbc)
+    return ii, jj, dist
+
+
+def _ravel_bins(
+        bin3 : np.ndarray,
+        nbins : np.ndarray,
+) -> np.ndarray:
+    return (bin3[...,0] * nbins[...,1] + bin3[...,1]) * nbins[...,2] + bin3[...,2]
+
+
+def batched_neighbor_pairs(
+        coords : np.ndarray,
+        cells : np.ndarray,
+        rcut : float,
+        nopbc : bool = False,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Find the pairs of atoms within the cut-off radius in all the frames
+    at once. The frames are binned by their own cell lists, which are
+    searched together, so the cost scales linearly with the total number
+    of atoms and there is no Python loop over the frames.
+
+    Parameters
+    ----------
+    coords : numpy.ndarray
+        The coordinates, of shape nframes x natoms x 3.
+    cells : numpy.ndarray
+        The cell tensors, of shape nframes x 3 x 3. Not used if `nopbc` 
+        is `True`.
+    rcut : float
+        The cut-off radius.
+    nopbc : bool
+        If no periodic boundary condition.
+
+    Returns
+    -------
+    ff : numpy.ndarray
+        The indexes of the frames of the pairs.
+    ii : numpy.ndarray
+        The indexes of the center atoms in the frames.
+    jj : numpy.ndarray
+        The indexes of the neighbor atoms in the frames. See 
+        `neighbor_pairs`.
+    dist : numpy.ndarray
+        The distances between the atoms.
+
+    """
+    coords = np.asarray(coords, dtype=float)
+    if coords.size == 0:
+        return tuple(np.zeros(0, dtype=int) for _ in range(3)) + (np.zeros(0),)
+    nframes = coords.shape[0]
+    coords = coords.reshape(nframes, -1, 3)
+    natoms = coords.shape[1]
+    if nopbc:
+        # bins of size rcut spanning the bounding box of each frame
+        cells = np.zeros([nframes, 3, 3])
+        origin = coords.min(axis=1, keepdims=True)
+        nbins = np.maximum(((coords.max(axis=1) - origin[:,0]) // rcut).astype(int) + 1, 1)
+        bin3 = ((coords - origin) // rcut).astype(int)
+        reach = np.ones(3, dtype=int)
+        wrapped = coords
+    else:
+        cells = np.asarray(cells, dtype=float).reshape(nframes, 3, 3)
+        frac = coords @ np.linalg.inv(cells)
+        frac -= np.floor(frac)
+        # the rounding may leave frac == 1
+        frac[frac >= 1.] = 0.
+        wrapped = frac @ cells
+        # the distance between the opposite faces of the cells
+        volume = np.abs(np.linalg.det(cells))
+        width = volume[:,None] / np.linalg.norm(
+            np.cross(cells[:,[1, 2, 0]], cells[:,[2, 0, 1]]), axis=2)
+        nbins = np.maximum((width // rcut).astype(int), 1)
+        # number of bins to search in each direction. larger than 1 only if
+        # a cell is thinner than rcut, then multiple images are searched.
+        # searching further than needed only visits more images, which are
+        # dropped by the distance.
+        reach = np.ceil(rcut * nbins / width).astype(int).max(axis=0)
+        bin3 = (frac * nbins[:,None,:]).astype(int)
+    bin3 = np.minimum(bin3, nbins[:,None,:] - 1).reshape(-1, 3)
+    wrapped = wrapped.reshape(-1, 3)
+    # the atoms and the bins of all the frames are numbered globally
+    frame = np.repeat(np.arange(nframes), natoms)
+    frame_nbins = np.prod(nbins, axis=1)
+    frame_start = np.cumsum(frame_nbins) - frame_nbins
+    atom_nbins = nbins[frame]
+    bin_id = frame_start[frame] + _ravel_bins(bin3, atom_nbins)
+    order = np.argsort(bin_id, kind='stable')
+    counts = np.bincount(bin_id, minlength=frame_nbins.sum())
+    starts = np.cumsum(counts) - counts
+
+    max_pairs = 2**18
+    all_ii = [np.zeros(0, dtype=int)]
+    all_jj = [np.zeros(0, dtype=int)]
+    all_dd = [np.zeros(0)]
+    for offset in itertools.product(*[range(-rr, rr + 1) for rr in reach]):
+        nb3 = bin3 + np.array(offset)
+        atoms = np.arange(nframes * natoms)
+        nb_nbins = atom_nbins
+        if nopbc:
+            inside = np.all((nb3 >= 0) & (nb3 < nb_nbins), axis=1)
+            atoms = atoms[inside]
+            nb3 = nb3[inside]
+            nb_nbins = nb_nbins[inside]
+            shift = np.zeros_like(nb3)
+        else:
+            shift = np.floor_divide(nb3, nb_nbins)
+            nb3 = nb3 - shift * nb_nbins
+        nb_id = frame_start[frame[atoms]] + _ravel_bins(nb3, nb_nbins)
+        # the centers are moved by the image of the neighbor bin, which
+        # is computed once for each atom, not for each pair
+        center = wrapped[atoms] - np.einsum('ni,nij->nj', shift, cells[frame[atoms]])
+        shifted = np.any(shift != 0, axis=1)
+        cnt = counts[nb_id]
+        if cnt.sum() == 0:
+            continue
+        # the candidate pairs are compared in blocks of the atoms having
+        # about max_pairs pairs, which keeps the temporaries small
+        ends = np.cumsum(cnt)
+        bounds = np.searchsorted(ends, np.arange(max_pairs, ends[-1], max_pairs))
+        for sl in map(slice, np.concatenate(([0], bounds)), np.concatenate((bounds, [len(atoms)]))):
+            bcnt = cnt[sl]
+            ii = np.repeat(atoms[sl], bcnt)
+            pos = np.arange(bcnt.sum()) - np.repeat(np.cumsum(bcnt) - bcnt, bcnt)
+            jj = order[np.repeat(starts[nb_id[sl]], bcnt) + pos]
+            diff = wrapped[jj] - np.repeat(center[sl], bcnt, axis=0)
+            dist = np.sqrt(np.einsum('ij,ij->i', diff, diff))
+            mask = (dist < rcut) & ((ii != jj) | np.repeat(shifted[sl], bcnt))
+            all_ii.append(ii[mask])
+            all_jj.append(jj[mask])
+            all_dd.append(dist[mask])
+    ii = np.concatenate(all_ii)
+    jj = np.concatenate(all_jj)
+    return frame[ii], ii % natoms, jj % natoms, np.concatenate(all_dd)
+
+
+def cluster_labels(
+        natoms : int,
+        ii : np.ndarray,
+        jj : np.ndarray,
+) -> np.ndarray:
+    """
+    Label the connected clusters of atoms.
+
+    Parameters
+    ----------
+    natoms : int
+        The number of atoms.
+    ii : numpy.ndarray
+        The indexes of the bonded atoms.
+    jj : numpy.ndarray
+        The indexes of the bonded atoms.
+
+    Returns
+    -------
+    labels : numpy.ndarray
+        The cluster label of each atom, which is the smallest index of
+        the atoms in the cluster.
+
+    """
+    labels = np.arange(natoms)
+    while True:
+        new_labels = labels.copy()
+        np.minimum.at(new_labels, ii, labels[jj])
+        np.minimum.at(new_labels, jj, labels[ii])
+        # pointer jumping
+        new_labels = new_labels[new_labels]
+        if np.array_equal(new_labels, labels):
+            return labels
+        labels = new_labels
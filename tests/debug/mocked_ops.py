@@ -702,6 +702,7 @@ class MockedConfSelector(ConfSelector):
             model_devis : List[Path],
             traj_fmt : str = 'deepmd/npy',
             type_map : List[str] = None,
+            iter_data : List[Path] = None,
     ) -> Tuple[List[ Path ], TrustLevel] :
         confs = []
         if len(trajs) == mocked_numb_lmp_tasks:
@@ -38,10 +38,10 @@ class TestArgs(unittest.TestCase):
         self.assertEqual(normalize_step_dict(old_data.get('prep_train_config', default_config)), new_data['step_configs']['prep_train_config'])
         self.assertEqual(normalize_step_dict(old_data.get('run_train_config', default_config)), new_data['step_configs']['run_train_config'])
         self.assertEqual(normalize_step_dict(old_data.get('prep_explore_config', default_config)), new_data['step_configs']['prep_explore_config'])
-        self.assertEqual(normalize_step_dict(old_data.get('run_explore_config', default_config)), new_data['step_configs']['run_explore_config'])
+        self.assertEqual(dict(normalize_step_dict(old_data.get('run_explore_config', default_config)), group_size=None, pool_size=None, partition=False), new_data['step_configs']['run_explore_config'])
         self.assertEqual(normalize_step_dict(old_data.get('prep_fp_config', default_config)), new_data['step_configs']['prep_fp_config'])
         self.assertEqual(normalize_step_dict(old_data.get('run_fp_config', default_config)), new_data['step_configs']['run_fp_config'])
-        self.assertEqual(normalize_step_dict(old_data.get('select_confs_config', default_config)), new_data['step_configs']['select_confs_config'])
+        self.assertEqual(dict(normalize_step_dict(old_data.get('select_confs_config', default_config)), nproc=1), new_data['step_configs']['select_confs_config'])
         self.assertEqual(normalize_step_dict(old_data.get('collect_data_config', default_config)), new_data['step_configs']['collect_data_config'])
         self.assertEqual(normalize_step_dict(old_data.get('cl_step_config', default_config)), new_data['step_configs']['cl_step_config'])
         self.assertEqual(old_data.get('upload_python_package', None), new_data['upload_python_package'])
@@ -49,7 +49,7 @@ class TestArgs(unittest.TestCase):
         self.assertEqual(old_data['numb_models'], new_data['train']['numb_models'])
         self.assertEqual(old_data['default_training_param'], new_data['train']['template_script'])
         self.assertEqual(RunDPTrain.normalize_config({}), new_data['train']['config'])
-        self.assertEqual(old_data.get('lmp_config', {}), new_data['explore']['config'])
+        self.assertEqual(dict(old_data.get('lmp_config', {}), partition_procs=1), new_data['explore']['config'])
         self.assertEqual(old_data.get('fp_config', {}), new_data['fp']['config'])
         self.assertEqual(old_data['fp_pp_files'], new_data['fp']['pp_files'])
         self.assertEqual(old_data['fp_incar'], new_data['fp']['incar'])
@@ -2,7 +2,7 @@ import os
 import numpy as np
 import unittest, dpdata
 from .context import dpgen2
-from dpgen2.exploration.selector import ConfFilter, ConfFilters
+from dpgen2.exploration.selector import ConfFilter, BatchedConfFilter, ConfFilters
 from fake_data_set import fake_system
 from mock import patch
 
@@ -17,6 +17,18 @@ class FooFilter(ConfFilter):
         return True
 
 
+class BatchedFooFilter(BatchedConfFilter):
+    def batched_check(
+            self,
+            coords : np.array,
+            cells : np.array,
+            atom_types : np.array,
+            nopbc : bool,
+    ) -> np.array :
+        # valid if the x coordinate of the first atom is positive
+        return coords[:,0,0] > 0.
+
+
 class faked_filter():
     myiter = -1
     myret = [True]
@@ -98,3 +110,40 @@ class TestConfFilter(unittest.TestCase):
         sel_sys = filters.check(faked_sys)
         self.assertEqual(sel_sys.get_nframes(), 0)
         
+
+
+class TestBatchedConfFilter(unittest.TestCase):
+    def setUp(self):
+        self.faked_sys = fake_system(4, 3)
+        self.faked_sys['coords'][1][0][0] = 1.
+        self.faked_sys['coords'][3][0][0] = 3.
+
+    def test_batched(self):
+        filters = ConfFilters()
+        filters.add(BatchedFooFilter())
+        sel_sys = filters.check(self.faked_sys)
+        self.assertEqual(sel_sys.get_nframes(), 2)
+        self.assertAlmostEqual(sel_sys['coords'][0][0][0], 1)
+        self.assertAlmostEqual(sel_sys['coords'][1][0][0], 3)
+
+    def test_per_frame_adapter(self):
+        ff = BatchedFooFilter()
+        ss = self.faked_sys
+        self.assertEqual(
+            [ff.check(ss['coords'][ii], ss['cells'][ii], ss['atom_types'], ss.nopbc) 
+             for ii in range(4)],
+            [False, True, False, True],
+        )
+
+    def test_default_batched(self):
+        ff = FooFilter()
+        ss = self.faked_sys
+        valid = ff.batched_check(ss['coords'], ss['cells'], ss['atom_types'], ss.nopbc)
+        self.assertEqual(valid.dtype, bool)
+        np.testing.assert_equal(valid, [True] * 4)
+
+    def test_mixed(self):
+        filters = ConfFilters()
+        filters.add(FooFilter()).add(BatchedFooFilter())
+        sel_sys = filters.check(self.faked_sys)
+        self.assertEqual(sel_sys.get_nframes(), 2)
@@ -3,10 +3,19 @@ import os, textwrap, dpdata, shutil
 import numpy as np
 import unittest
 from pathlib import Path
+from mock import patch
 from dpgen2.exploration.selector import (
     TrustLevel,
     ConfSelectorLammpsFrames,
+    ConfFilters,
+    BatchedConfFilter,
+    DistanceConfFilter,
 )
+from dpgen2.utils.model_devi import load_model_devi
+
+class FooBatchedFilter(BatchedConfFilter):
+    def batched_check(self, coords, cells, atom_types, nopbc):
+        return coords[:,0,1] < 4.
 
 class TestConfSelectorLammpsFrames(unittest.TestCase):
     def setUp(self):
@@ -157,4 +166,402 @@ class TestConfSelectorLammpsFrames(unittest.TestCase):
         self.assertAlmostEqual(report.candidate_ratio(), 1./3.)
         self.assertAlmostEqual(report.accurate_ratio(), 0./3.)
         self.assertAlmostEqual(report.failed_ratio(), 2./3.)
-        
+
+    def test_ref_trust_level(self):
+        conf_selector = ConfSelectorLammpsFrames(
+            TrustLevel(0.25, 0.35),
+            ref_trust_level = TrustLevel(0.25, 0.35, 0.05, 0.15),
+        )
+        confs, report = conf_selector.select(
+            self.trajs, self.model_devis, self.traj_fmt, self.type_map)
+        self.assertAlmostEqual(report.accurate_ratio(), 1./3.)
+        # judged by the reference trust levels, the same as test_fv_0
+        np.testing.assert_almost_equal(report.reference_ratios(), [0., 1./3., 2./3.])
+        np.testing.assert_almost_equal(
+            report.compact().reference_ratios(), [0., 1./3., 2./3.])
+        conf_selector.ref_trust_level = None
+        confs, report = conf_selector.select(
+            self.trajs, self.model_devis, self.traj_fmt, self.type_map)
+        self.assertTrue(report.reference_ratios() is None)
+
+    def test_load_traj_once(self):
+        conf_selector = ConfSelectorLammpsFrames(
+            TrustLevel(0.25, 0.35),
+        )
+        load_traj = ConfSelectorLammpsFrames._load_traj
+        with patch.object(
+                ConfSelectorLammpsFrames, '_load_traj', 
+                side_effect=load_traj) as mocked_load:
+            confs, report = conf_selector.select(
+                self.trajs, self.model_devis, self.traj_fmt, self.type_map)
+        self.assertEqual(mocked_load.call_count, 2)
+        self.assertEqual(
+            sorted([str(ii[0][0]) for ii in mocked_load.call_args_list]),
+            sorted([str(ii) for ii in self.trajs]),
+        )
+
+    def test_parse_model_devi_once(self):
+        conf_selector = ConfSelectorLammpsFrames(
+            TrustLevel(0.25, 0.35),
+            dedup_tol = 1e-3,
+        )
+        with patch(
+                'dpgen2.exploration.selector.conf_selector_frame.load_model_devi',
+                side_effect=load_model_devi) as mocked_load:
+            confs, report = conf_selector.select(
+                self.trajs, self.model_devis, self.traj_fmt, self.type_map)
+        self.assertEqual(mocked_load.call_count, 2)
+        self.assertEqual(
+            [ii[1]['columns'] for ii in mocked_load.call_args_list], [[0, 4, 1]] * 2)
+
+    def test_no_cand_no_load(self):
+        conf_selector = ConfSelectorLammpsFrames(
+            TrustLevel(0.5, 0.6),
+        )
+        with patch.object(
+                ConfSelectorLammpsFrames, '_load_traj') as mocked_load:
+            confs, report = conf_selector.select(
+                self.trajs, self.model_devis, self.traj_fmt, self.type_map)
+        mocked_load.assert_not_called()
+        self.assertAlmostEqual(report.accurate_ratio(), 1.)
+
+    def test_record_one_traj(self):
+        conf_selector = ConfSelectorLammpsFrames(
+            TrustLevel(0.25, 0.35),
+        )
+        with patch.object(
+                ConfSelectorLammpsFrames, '_load_traj') as mocked_load:
+            conf_selector.record_one_traj(
+                self.trajs[0], self.model_devis[0], self.traj_fmt, self.type_map)
+        mocked_load.assert_not_called()
+        self.assertEqual(conf_selector.report.traj_nframes, [3])
+        self.assertEqual(conf_selector.report.traj_cand, [set([1])])
+
+
+    def test_nproc(self):
+        conf_selector = ConfSelectorLammpsFrames(
+            TrustLevel(0.25, 0.35, 0.05, 0.15),
+            nproc = 2,
+        )
+        confs, report = conf_selector.select(
+            self.trajs, self.model_devis, self.traj_fmt, self.type_map)
+        ms = dpdata.MultiSystems(type_map=self.type_map)
+        ms.from_deepmd_npy(confs[0], labeled=False)
+        self.assertEqual(len(ms), 1)
+        ss = ms[0]
+        self.assertEqual(ss.get_nframes(), 2)
+        self.assertAlmostEqual(ss['coords'][0][0][1], 2.87, places=2)
+        self.assertAlmostEqual(ss['coords'][1][0][1], 2.87, places=2)
+        self.assertAlmostEqual(report.candidate_ratio(), 1./3.)
+        self.assertAlmostEqual(report.accurate_ratio(), 0./3.)
+        self.assertAlmostEqual(report.failed_ratio(), 2./3.)
+
+    def test_conf_filters(self):
+        conf_selector = ConfSelectorLammpsFrames(
+            TrustLevel(0.1, 0.5),
+            conf_filters = ConfFilters().add(FooBatchedFilter()),
+        )
+        confs, report = conf_selector.select(
+            self.trajs, self.model_devis, self.traj_fmt, self.type_map)
+        ms = dpdata.MultiSystems(type_map=self.type_map)
+        ms.from_deepmd_npy(confs[0], labeled=False)
+        self.assertEqual(len(ms), 1)
+        ss = ms[0]
+        self.assertEqual(ss.get_nframes(), 4)
+        self.assertAlmostEqual(ss['coords'][0][0][1], 2.87, places=2)
+        self.assertAlmostEqual(ss['coords'][1][0][1], 3.87, places=2)
+        # the report is not affected by the filters
+        self.assertAlmostEqual(report.candidate_ratio(), 1.)
+
+    def test_conf_filters_reject_all(self):
+        conf_selector = ConfSelectorLammpsFrames(
+            TrustLevel(0.1, 0.5),
+            conf_filters = ConfFilters().add(DistanceConfFilter(5.0)),
+        )
+        confs, report = conf_selector.select(
+            self.trajs, self.model_devis, self.traj_fmt, self.type_map)
+        ms = dpdata.MultiSystems(type_map=self.type_map)
+        ms.from_deepmd_npy(confs[0], labeled=False)
+        self.assertEqual(len(ms), 0)
+
+
+class TestConfSelectorLammpsFramesRank(unittest.TestCase):
+    def setUp(self):
+        TestConfSelectorLammpsFrames.setUp(self)
+        Path('bar.md').write_text(textwrap.dedent(
+            """ #
+            0 0.1 0.0 0.0 0.25 0.0 0.0
+            0 0.2 0.0 0.0 0.45 0.0 0.0
+            0 0.3 0.0 0.0 0.15 0.0 0.0
+            """))
+
+    def tearDown(self):
+        TestConfSelectorLammpsFrames.tearDown(self)
+
+    def test_topk(self):
+        conf_selector = ConfSelectorLammpsFrames(
+            TrustLevel(0.1, 0.5),
+            max_numb_sel = 3,
+            select_mode = 'topk',
+        )
+        confs, report = conf_selector.select(
+            self.trajs, self.model_devis, self.traj_fmt, self.type_map)
+        self.assertEqual(report.traj_cand_picked, [(0, 1), (0, 2), (1, 1)])
+        ms = dpdata.MultiSystems(type_map=self.type_map)
+        ms.from_deepmd_npy(confs[0], labeled=False)
+        ss = ms[0]
+        self.assertEqual(ss.get_nframes(), 3)
+        self.assertAlmostEqual(ss['coords'][0][0][1], 3.87, places=2)
+        self.assertAlmostEqual(ss['coords'][1][0][1], 4.87, places=2)
+        self.assertAlmostEqual(ss['coords'][2][0][1], 3.87, places=2)
+        self.assertAlmostEqual(report.candidate_ratio(), 1.)
+
+    def test_topk_nproc(self):
+        conf_selector = ConfSelectorLammpsFrames(
+            TrustLevel(0.1, 0.5),
+            max_numb_sel = 3,
+            select_mode = 'topk',
+            nproc = 2,
+        )
+        confs, report = conf_selector.select(
+            self.trajs, self.model_devis, self.traj_fmt, self.type_map)
+        self.assertEqual(report.traj_cand_picked, [(0, 1), (0, 2), (1, 1)])
+
+    def test_topk_fv(self):
+        conf_selector = ConfSelectorLammpsFrames(
+            TrustLevel(0.1, 0.5, 0.05, 0.25),
+            max_numb_sel = 2,
+            select_mode = 'topk',
+        )
+        confs, report = conf_selector.select(
+            self.trajs, self.model_devis, self.traj_fmt, self.type_map)
+        # frames 2 are failed by virial
+        # scores: (0,0) 0.4, (0,1) 0.8, (1,0) 0.5, (1,1) 0.9
+        self.assertEqual(report.traj_cand_picked, [(0, 1), (1, 1)])
+
+    def test_weighted(self):
+        conf_selector = ConfSelectorLammpsFrames(
+            TrustLevel(0.1, 0.5),
+            max_numb_sel = 3,
+            select_mode = 'weighted',
+            seed = 10,
+        )
+        confs, report = conf_selector.select(
+            self.trajs, self.model_devis, self.traj_fmt, self.type_map)
+        picked = report.traj_cand_picked
+        self.assertEqual(len(picked), 3)
+        self.assertEqual(len(set(picked)), 3)
+        self.assertEqual(picked, sorted(picked))
+        confs, report = conf_selector.select(
+            self.trajs, self.model_devis, self.traj_fmt, self.type_map)
+        self.assertEqual(report.traj_cand_picked, picked)
+        ms = dpdata.MultiSystems(type_map=self.type_map)
+        ms.from_deepmd_npy(confs[0], labeled=False)
+        self.assertEqual(ms.get_nframes(), 3)
+
+    def test_unknown_mode(self):
+        with self.assertRaises(RuntimeError):
+            ConfSelectorLammpsFrames(TrustLevel(0.1, 0.5), select_mode = 'foo')
+
+    def test_dedup(self):
+        # frames are translations of each other, the two trajectories
+        # are the same, thus all the candidates are near-duplicates.
+        conf_selector = ConfSelectorLammpsFrames(
+            TrustLevel(0.1, 0.5),
+            max_numb_sel = 3,
+            dedup_tol = 1e-6,
+        )
+        confs, report = conf_selector.select(
+            self.trajs, self.model_devis, self.traj_fmt, self.type_map)
+        self.assertEqual(report.traj_cand_picked, [(0, 0)])
+        self.assertAlmostEqual(report.candidate_ratio(), 1.)
+        ms = dpdata.MultiSystems(type_map=self.type_map)
+        ms.from_deepmd_npy(confs[0], labeled=False)
+        self.assertEqual(ms.get_nframes(), 1)
+
+    def test_dedup_topk(self):
+        conf_selector = ConfSelectorLammpsFrames(
+            TrustLevel(0.1, 0.5),
+            max_numb_sel = 3,
+            select_mode = 'topk',
+            dedup_tol = 1e-6,
+            nproc = 2,
+        )
+        confs, report = conf_selector.select(
+            self.trajs, self.model_devis, self.traj_fmt, self.type_map)
+        # the first frame is the representative of the duplicates
+        self.assertEqual(report.traj_cand_picked, [(0, 0)])
+
+    def test_dedup_none(self):
+        # nothing is removed with a negative tolerance
+        conf_selector = ConfSelectorLammpsFrames(
+            TrustLevel(0.1, 0.5),
+            dedup_tol = -1.,
+        )
+        confs, report = conf_selector.select(
+            self.trajs, self.model_devis, self.traj_fmt, self.type_map)
+        self.assertEqual(len(report.traj_cand_picked), 6)
+
+    def test_dedup_iter_data(self):
+        from dpgen2.utils.fingerprint import radial_fingerprints
+        from dpgen2.utils.fingerprint_index import write_fingerprints
+        ss = dpdata.System('foo.dump', fmt='lammps/dump', type_map=self.type_map)
+        Path('iter.000').mkdir()
+        try:
+            write_fingerprints(
+                'iter.000',
+                radial_fingerprints(ss['coords'][:1], ss['cells'][:1], ss['atom_types'], 2),
+                6.0, 30)
+            conf_selector = ConfSelectorLammpsFrames(
+                TrustLevel(0.1, 0.5),
+                dedup_tol = 1e-6,
+            )
+            # all the candidates are labeled
+            confs, report = conf_selector.select(
+                self.trajs, self.model_devis, self.traj_fmt, self.type_map,
+                iter_data = [Path('iter.000')])
+            self.assertEqual(report.traj_cand_picked, [])
+            # the index is not used without iter_data
+            confs, report = conf_selector.select(
+                self.trajs, self.model_devis, self.traj_fmt, self.type_map)
+            self.assertEqual(report.traj_cand_picked, [(0, 0)])
+        finally:
+            shutil.rmtree('iter.000')
+
+    def test_fps(self):
+        conf_selector = ConfSelectorLammpsFrames(
+            TrustLevel(0.1, 0.5),
+            max_numb_sel = 2,
+            select_mode = 'fps',
+        )
+        with patch('dpgen2.exploration.selector.conf_selector_frame.radial_fingerprints') as mocked_fp:
+            # fingerprints of the 3 frames of a trajectory
+            mocked_fp.side_effect = lambda coords, *args : coords[:,0,1:2]
+            confs, report = conf_selector.select(
+                self.trajs, self.model_devis, self.traj_fmt, self.type_map)
+        # the first frame, then the farthest one
+        self.assertEqual(report.traj_cand_picked, [(0, 0), (0, 2)])
+        ms = dpdata.MultiSystems(type_map=self.type_map)
+        ms.from_deepmd_npy(confs[0], labeled=False)
+        ss = ms[0]
+        self.assertEqual(ss.get_nframes(), 2)
+        self.assertAlmostEqual(ss['coords'][0][0][1], 2.87, places=2)
+        self.assertAlmostEqual(ss['coords'][1][0][1], 4.87, places=2)
+
+    def test_fps_dedup(self):
+        conf_selector = ConfSelectorLammpsFrames(
+            TrustLevel(0.1, 0.5),
+            max_numb_sel = 2,
+            select_mode = 'fps',
+            dedup_tol = 0.5,
+        )
+        with patch('dpgen2.exploration.selector.conf_selector_frame.radial_fingerprints') as mocked_fp:
+            mocked_fp.side_effect = lambda coords, *args : coords[:,0,1:2]
+            confs, report = conf_selector.select(
+                self.trajs, self.model_devis, self.traj_fmt, self.type_map)
+        # the second trajectory is a duplicate of the first one
+        self.assertEqual(report.traj_cand_picked, [(0, 0), (0, 2)])
+        np.testing.assert_equal(report.candidate_frames(1), [])
+
+
+class TestConfSelectorLammpsFramesCarve(unittest.TestCase):
+    def setUp(self):
+        TestConfSelectorLammpsFrames.setUp(self)
+        # the per-atom force model deviations follow the 7 columns
+        for ii in self.model_devis:
+            ii.write_text(textwrap.dedent(
+                """ #
+                0 0.1 0.0 0.0 0.2 0.0 0.0 0.2 0.1 0.0
+                0 0.2 0.0 0.0 0.3 0.0 0.0 0.1 0.3 0.2
+                0 0.3 0.0 0.0 0.6 0.0 0.0 0.0 0.1 0.6
+                """))
+
+    def tearDown(self):
+        TestConfSelectorLammpsFrames.tearDown(self)
+
+    def test_carve(self):
+        conf_selector = ConfSelectorLammpsFrames(
+            TrustLevel(0.1, 0.5),
+            carve_radius = 1.2,
+            carve_vacuum = 5.,
+        )
+        confs, report = conf_selector.select(
+            self.trajs, self.model_devis, self.traj_fmt, self.type_map)
+        ms = dpdata.MultiSystems(type_map=self.type_map)
+        ms.from_deepmd_npy(confs[0], labeled=False)
+        self.assertEqual(ms.get_nframes(), 4)
+        # centered at the first atom (H) in the first frame, and the 
+        # second atom (O) in the second frame
+        natoms = sorted([(ss.get_natoms(), ss.get_nframes()) for ss in ms])
+        self.assertEqual(natoms, [(2, 2), (3, 2)])
+        for ss in ms:
+            self.assertFalse(ss.nopbc)
+            np.testing.assert_almost_equal(ss['cells'][0], np.eye(3) * 7.4)
+
+    def test_carve_no_atomic(self):
+        for ii in self.model_devis:
+            ii.write_text(self.model_devi_file)
+        conf_selector = ConfSelectorLammpsFrames(
+            TrustLevel(0.1, 0.5),
+            carve_radius = 1.2,
+        )
+        with self.assertRaises(RuntimeError):
+            conf_selector.select(
+                self.trajs, self.model_devis, self.traj_fmt, self.type_map)
+
+
+class TestConfSelectorLammpsFramesDumpSkip(unittest.TestCase):
+    def setUp(self):
+        TestConfSelectorLammpsFrames.setUp(self)
+
+    def tearDown(self):
+        TestConfSelectorLammpsFrames.tearDown(self)
+
+    def test_dump_skip(self):
+        # the first frame is accurate and not dumped, the model deviations
+        # of all the frames are written.
+        frames = self.dump_file.split('ITEM: TIMESTEP\n')[1:]
+        dumped = ''.join(
+            ['ITEM: TIMESTEP\n%d\n' % (10 * ii) + ff.split('\n', 1)[1]
+             for ii, ff in enumerate(frames) if ii > 0])
+        model_devi = textwrap.dedent(
+            """ #
+            0 0.1 0.0 0.0 0.05 0.0 0.0
+            10 0.2 0.0 0.0 0.3 0.0 0.0
+            20 0.3 0.0 0.0 0.2 0.0 0.0
+            """)
+        for ii, jj in zip(self.trajs, self.model_devis):
+            ii.write_text(dumped)
+            jj.write_text(model_devi)
+        conf_selector = ConfSelectorLammpsFrames(
+            TrustLevel(0.25, 0.5),
+        )
+        confs, report = conf_selector.select(
+            self.trajs, self.model_devis, self.traj_fmt, self.type_map)
+        ms = dpdata.MultiSystems(type_map=self.type_map)
+        ms.from_deepmd_npy(confs[0], labeled=False)
+        ss = ms[0]
+        self.assertEqual(ss.get_nframes(), 2)
+        # the frame of step 10
+        self.assertAlmostEqual(ss['coords'][0][0][1], 3.87, places=2)
+        self.assertAlmostEqual(ss['coords'][1][0][1], 3.87, places=2)
+        self.assertAlmostEqual(report.accurate_ratio(), 2./3.)
+
+    def test_dump_skip_missing(self):
+        frames = self.dump_file.split('ITEM: TIMESTEP\n')[1:]
+        dumped = 'ITEM: TIMESTEP\n20\n' + frames[2].split('\n', 1)[1]
+        model_devi = textwrap.dedent(
+            """ #
+            0 0.1 0.0 0.0 0.05 0.0 0.0
+            10 0.2 0.0 0.0 0.3 0.0 0.0
+            20 0.3 0.0 0.0 0.2 0.0 0.0
+            """)
+        for ii, jj in zip(self.trajs, self.model_devis):
+            ii.write_text(dumped)
+            jj.write_text(model_devi)
+        conf_selector = ConfSelectorLammpsFrames(
+            TrustLevel(0.25, 0.5),
+        )
+        with self.assertRaises(RuntimeError):
+            conf_selector.select(
+                self.trajs, self.model_devis, self.traj_fmt, self.type_map)
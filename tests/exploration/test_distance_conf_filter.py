@@ -0,0 +1,65 @@
+import os
+import numpy as np
+import unittest, dpdata
+from .context import dpgen2
+from dpgen2.exploration.selector import (
+    ConfFilters,
+    DistanceConfFilter,
+    ClusterConfFilter,
+)
+from fake_data_set import fake_system
+
+
+class TestDistanceConfFilter(unittest.TestCase):
+    def setUp(self):
+        self.sys = fake_system(3, 2)
+        self.sys.data['cells'] = np.tile(np.eye(3) * 10., [3, 1, 1])
+        self.sys.data['coords'][:,0,:] = [1., 1., 1.]
+        self.sys.data['coords'][0,1,:] = [2.5, 1., 1.]
+        self.sys.data['coords'][1,1,:] = [1.5, 1., 1.]
+        # close to atom 0 via periodic image
+        self.sys.data['coords'][2,1,:] = [9.8, 1., 1.]
+
+    def test_pbc(self):
+        ff = DistanceConfFilter(1.3)
+        valid = ff.batched_check(
+            self.sys['coords'], self.sys['cells'], self.sys['atom_types'], False)
+        np.testing.assert_equal(valid, [True, False, False])
+
+    def test_nopbc(self):
+        ff = DistanceConfFilter(1.3)
+        valid = ff.batched_check(
+            self.sys['coords'], self.sys['cells'], self.sys['atom_types'], True)
+        np.testing.assert_equal(valid, [True, False, True])
+
+    def test_conf_filters(self):
+        filters = ConfFilters().add(DistanceConfFilter(1.3))
+        sel_sys = filters.check(self.sys)
+        self.assertEqual(sel_sys.get_nframes(), 1)
+        self.assertAlmostEqual(sel_sys['coords'][0][1][0], 2.5)
+
+
+class TestClusterConfFilter(unittest.TestCase):
+    def setUp(self):
+        self.sys = fake_system(2, 4)
+        self.sys.data['cells'] = np.tile(np.eye(3) * 10., [2, 1, 1])
+        # frame 0: a chain of 4 atoms
+        self.sys.data['coords'][0] = [[1., 1., 1.], [2., 1., 1.], [3., 1., 1.], [4., 1., 1.]]
+        # frame 1: two fragments, connected only via periodic image
+        self.sys.data['coords'][1] = [[0.5, 1., 1.], [1.5, 1., 1.], [8.5, 1., 1.], [9.5, 1., 1.]]
+
+    def test_pbc(self):
+        ff = ClusterConfFilter(1.2)
+        valid = ff.batched_check(
+            self.sys['coords'], self.sys['cells'], self.sys['atom_types'], False)
+        np.testing.assert_equal(valid, [True, True])
+
+    def test_nopbc(self):
+        ff = ClusterConfFilter(1.2)
+        valid = ff.batched_check(
+            self.sys['coords'], self.sys['cells'], self.sys['atom_types'], True)
+        np.testing.assert_equal(valid, [True, False])
+        ff = ClusterConfFilter(1.2, max_numb_clusters=2)
+        valid = ff.batched_check(
+            self.sys['coords'], self.sys['cells'], self.sys['atom_types'], True)
+        np.testing.assert_equal(valid, [True, True])
@@ -1,4 +1,4 @@
-import os, textwrap
+import os, re, textwrap, pickle, jsonpickle, json
 import numpy as np
 import unittest
 
@@ -11,9 +11,14 @@ except ModuleNotFoundError:
     pass
 from dpgen2.exploration.task import (
     NPTTaskGroup, 
+    LazyNPTTaskGroup,
+    ExplorationTask,
+    ExplorationTaskGroup,
+    LazyExplorationTaskGroup,
     ExplorationStage,
 )
-from dpgen2.constants import lmp_conf_name, lmp_input_name
+from dpgen2.constants import lmp_conf_name, lmp_input_name, lmp_input_spec_name
+from dpgen2.exploration.task.lmp import make_lmp_input
 from unittest.mock import Mock, patch
 
 in_template_npt = textwrap.dedent("""variable        NSTEPS          equal 1000
@@ -329,6 +334,318 @@ class TestCPTGroup(unittest.TestCase):
             )
 
 
+class TestCPTGroupInputSpec(unittest.TestCase):
+    @patch('dpgen2.exploration.task.npt_task_group.random.randrange')
+    def test_npt(self, mock_randrange):
+        mock_randrange.return_value = 1110
+        confs = ['foo', 'bar']
+        tt = [100, 200]
+        pp = [1, 10, 100]
+        cpt_group = NPTTaskGroup()
+        cpt_group.set_md(3, [10, 20], tt, pp, input_spec = True)
+        cpt_group.set_conf(confs)
+        task_group = cpt_group.make_task()
+        self.assertEqual(len(task_group), 12)
+        for ii in range(len(task_group)):
+            i_idx, rr = divmod(ii, len(tt) * len(pp))
+            j_idx, k_idx = divmod(rr, len(pp))
+            files = task_group[ii].files()
+            self.assertEqual(set(files.keys()), {lmp_conf_name, lmp_input_spec_name})
+            self.assertEqual(files[lmp_conf_name], confs[i_idx])
+            # the spec renders the same input as the eager rendering
+            self.assertEqual(
+                make_lmp_input(**json.loads(files[lmp_input_spec_name])),
+                in_template_npt % (tt[j_idx], pp[k_idx]),
+            )
+
+
+class TestCPTGroupDumpSkip(unittest.TestCase):
+    def setUp(self):
+        self.model_devi = Path('model_devi.out')
+
+    def tearDown(self):
+        if self.model_devi.is_file():
+            os.remove(self.model_devi)
+
+    def _dump_skip(self, lmp_input, world_size = 1):
+        # the python function embedded in the LAMMPS input, the LAMMPS
+        # python module is mocked by the size of the world
+        code = lmp_input.split('here """\n')[1].split('"""')[0]
+        ns = {}
+        exec(code, ns)
+        lammps = Mock()
+        lammps.lammps.return_value.extract_setting.return_value = world_size
+        def dump_skip(step):
+            with patch.dict('sys.modules', {'lammps' : lammps}):
+                return ns['dump_skip'](None, step)
+        return dump_skip
+
+    def test(self):
+        cpt_group = NPTTaskGroup()
+        cpt_group.set_md(2, [10, 20], [100], ens = 'nvt', dump_f_trust_lo = 0.1)
+        cpt_group.set_conf(['foo'])
+        task_group = cpt_group.make_task()
+        lmp_input = task_group[0].files()[lmp_input_name]
+        self.assertIn('dump_modify     1 skip v_DUMP_SKIP\n', lmp_input)
+        dump_skip = self._dump_skip(lmp_input)
+        # dumped if model_devi.out is not written
+        self.assertEqual(dump_skip(0), 0)
+        self.model_devi.write_text(
+            '#       step         max_devi_v         min_devi_v         avg_devi_v         max_devi_f         min_devi_f         avg_devi_f\n'
+            '           0 0.1 0.0 0.0 0.05 0.0 0.0\n'
+            '          10 0.1 0.0 0.0 0.20 0.0 0.0\n'
+        )
+        self.assertEqual(dump_skip(10), 0)
+        # the last line is not of the step
+        self.assertEqual(dump_skip(20), 0)
+        with open(self.model_devi, 'a') as fp:
+            fp.write('          20 0.1 0.0 0.0 0.05' + ' 0.0' * 4000 + '\n')
+        self.assertEqual(dump_skip(20), 1)
+
+    def test_virial(self):
+        cpt_group = NPTTaskGroup()
+        cpt_group.set_md(
+            2, [10, 20], [100], ens = 'nvt', 
+            dump_f_trust_lo = 0.1, dump_v_trust_lo = 0.2, input_spec = True)
+        cpt_group.set_conf(['foo'])
+        task_group = cpt_group.make_task()
+        lmp_input = make_lmp_input(**json.loads(task_group[0].files()[lmp_input_spec_name]))
+        dump_skip = self._dump_skip(lmp_input)
+        self.model_devi.write_text('           0 0.3 0.0 0.0 0.05 0.0 0.0\n')
+        self.assertEqual(dump_skip(0), 0)
+        self.model_devi.write_text('           0 0.1 0.0 0.0 0.05 0.0 0.0\n')
+        self.assertEqual(dump_skip(0), 1)
+
+    def test_deepmd_0(self):
+        with self.assertRaises(RuntimeError):
+            make_lmp_input(
+                lmp_conf_name, 'nvt', ['model.000.pb'], 100, 0.001, None, 10,
+                [10.], 100., deepmd_version = '0.12', dump_f_trust_lo = 0.1)
+
+    def test_multi_ranks(self):
+        cpt_group = NPTTaskGroup()
+        cpt_group.set_md(2, [10, 20], [100], ens = 'nvt', dump_f_trust_lo = 0.1)
+        cpt_group.set_conf(['foo'])
+        lmp_input = cpt_group.make_task()[0].files()[lmp_input_name]
+        self.assertIn('python          dump_skip input 2 SELF v_DUMP_STEP', lmp_input)
+        dump_skip = self._dump_skip(lmp_input, world_size = 2)
+        with self.assertRaises(RuntimeError):
+            dump_skip(0)
+
+
+class TestCPTGroupHalt(unittest.TestCase):
+    def setUp(self):
+        self.model_devi = Path('model_devi.out')
+
+    def tearDown(self):
+        if self.model_devi.is_file():
+            os.remove(self.model_devi)
+
+    def test(self):
+        cpt_group = NPTTaskGroup()
+        cpt_group.set_md(
+            2, [10, 20], [100], ens = 'nvt', 
+            halt_f_trust_hi = 0.5, halt_patience = 2)
+        cpt_group.set_conf(['foo'])
+        task_group = cpt_group.make_task()
+        lmp_input = task_group[0].files()[lmp_input_name]
+        self.assertIn(
+            'fix             halt all halt ${THERMO_FREQ} v_HALT_COUNT >= 2 error soft\n', 
+            lmp_input)
+        # the halt fix is defined before the run
+        self.assertLess(lmp_input.index('fix             halt'), lmp_input.index('run '))
+        code = lmp_input.split('here """\n')[1].split('"""')[0]
+        ns = {}
+        exec(code, ns)
+        halt_count = ns['halt_count']
+        md = []
+        for step, devi in [(0, 0.6), (10, 0.1), (20, 0.6), (30, 0.7)]:
+            md.append('%d 0.0 0.0 0.0 %f 0.0 0.0\n' % (step, devi))
+            self.model_devi.write_text(''.join(md))
+            md_count = halt_count(step)
+        self.assertEqual(md_count, 2)
+        # the count is reset by the accurate frame
+        md.append('40 0.0 0.0 0.0 0.1 0.0 0.0\n')
+        self.model_devi.write_text(''.join(md))
+        self.assertEqual(halt_count(40), 0)
+
+    def test_patience(self):
+        cpt_group = NPTTaskGroup()
+        cpt_group.set_md(
+            2, [10, 20], [100], ens = 'nvt', 
+            halt_f_trust_hi = 0.5, halt_patience = 0)
+        cpt_group.set_conf(['foo'])
+        with self.assertRaises(RuntimeError):
+            cpt_group.make_task()
+
+
+dump_frame_template = textwrap.dedent("""ITEM: TIMESTEP
+%d
+ITEM: NUMBER OF ATOMS
+2
+ITEM: BOX BOUNDS xy xz yz pp pp pp
+0.0000000000000000e+00 1.0000000000000000e+01 0.0000000000000000e+00
+0.0000000000000000e+00 1.0000000000000000e+01 0.0000000000000000e+00
+0.0000000000000000e+00 1.0000000000000000e+01 0.0000000000000000e+00
+ITEM: ATOMS id type x y z fx fy fz
+1 1 %f 1.0 1.0 0.0 0.0 0.0
+2 2 2.0 2.0 2.0 0.0 0.0 0.0
+""")
+
+class TestCPTGroupTrajSeeds(unittest.TestCase):
+    def setUp(self):
+        self.trajs = [Path('foo0.dump'), Path('foo1.dump')]
+        for ii in self.trajs:
+            ii.write_text(''.join(
+                [dump_frame_template % (jj * 10, 0.5 * (jj + 1)) for jj in range(3)]))
+
+    def tearDown(self):
+        for ii in self.trajs:
+            if ii.is_file():
+                os.remove(ii)
+
+    def _test(self, cpt_group):
+        cpt_group.set_md(2, [10, 20, 30], [100, 200], ens = 'nvt')
+        cpt_group.set_conf(['foo', 'bar'], n_sample = 1)
+        task_group = cpt_group.make_task()
+        self.assertEqual([tt.files()[lmp_conf_name] for tt in task_group], ['foo', 'foo'])
+        with self.assertRaises(RuntimeError):
+            cpt_group.set_traj_seeds(self.trajs[:1], [1])
+        cpt_group.set_traj_seeds(self.trajs, [1, -1])
+        task_group = cpt_group.make_task()
+        confs = [tt.files()[lmp_conf_name] for tt in task_group]
+        # the first task starts from the frame, the second from its conf
+        self.assertIn('3 atom types', confs[0])
+        self.assertIn('1.0000000000    1.0000000000    1.0000000000', confs[0])
+        self.assertEqual(confs[1], 'foo')
+        # the temperatures are kept
+        self.assertIn('variable        TEMP            equal 200.000000', task_group[1].files()[lmp_input_name])
+        # the seeds are used once
+        task_group = cpt_group.make_task()
+        self.assertEqual([tt.files()[lmp_conf_name] for tt in task_group], ['bar', 'bar'])
+
+    def test(self):
+        self._test(NPTTaskGroup())
+
+    def test_lazy(self):
+        self._test(LazyNPTTaskGroup())
+
+
+class TestCPTGroupPruning(unittest.TestCase):
+    def _conds(self, task_group):
+        ret = []
+        for tt in task_group:
+            lines = tt.files()[lmp_input_name].split('\n')
+            temp = [ii.split()[-1] for ii in lines if ii.startswith('variable        TEMP')]
+            pres = [ii.split()[-1] for ii in lines if ii.startswith('variable        PRES')]
+            ret.append((tt.files()[lmp_conf_name], float(temp[0]), float(pres[0])))
+        return ret
+
+    def _test(self, cpt_group, n_sample):
+        cpt_group.set_md(2, [10, 20], [100, 200], [1, 10])
+        cpt_group.set_conf(['foo', 'bar', 'baz'], n_sample = 2)
+        cpt_group.set_pruning(0.9, patience = 2, n_sample = n_sample)
+        # the condition of T 100 P 1 is accurate
+        good = [[10, 0, 0]] + [[5, 5, 0]] * 3
+        task_group = cpt_group.make_task()
+        self.assertEqual(len(task_group), 8)
+        cpt_group.record_traj_counts(np.array(good * 2))
+        self.assertEqual(cpt_group.cond_accuracy, [1., .5, .5, .5])
+        task_group = cpt_group.make_task()
+        self.assertEqual(len(task_group), 8)
+        cpt_group.record_traj_counts(np.array(good * 2))
+        # pruned after 2 iterations
+        task_group = cpt_group.make_task()
+        conds = self._conds(task_group)
+        self.assertEqual(len(task_group), 6 + n_sample)
+        expected = [
+            ('bar', 100., 1.), ('bar', 100., 10.), ('bar', 200., 1.), ('bar', 200., 10.),
+            ('baz', 100., 10.), ('baz', 200., 1.), ('baz', 200., 10.),
+        ]
+        self.assertEqual(conds, expected[1-n_sample:])
+        # the counts do not match the tasks
+        with self.assertRaises(RuntimeError):
+            cpt_group.record_traj_counts(np.array(good * 2))
+        self.assertEqual(cpt_group.cond_accuracy, [1., .5, .5, .5])
+        # not pruned any more once it is not accurate
+        cpt_group.record_traj_counts(np.array(
+            [[0, 0, 10]] * n_sample + [[5, 5, 0]] * 6))
+        task_group = cpt_group.make_task()
+        self.assertEqual(len(task_group), 8 - 2 * (1 - n_sample))
+        return task_group
+
+    def test(self):
+        self._test(NPTTaskGroup(), 1)
+        self._test(NPTTaskGroup(), 0)
+
+    def test_lazy(self):
+        lazy = self._test(LazyNPTTaskGroup(), 1)
+        eager = self._test(NPTTaskGroup(), 1)
+        self.assertEqual(self._conds(lazy), self._conds(eager))
+        self.assertEqual(
+            self._conds([lazy[ii] for ii in range(-1, -len(lazy)-1, -1)]),
+            self._conds(eager)[::-1])
+
+    def test_lazy_pickle(self):
+        cpt_group = LazyNPTTaskGroup()
+        cpt_group.set_md(2, [10, 20], [100, 200], [1, 10])
+        cpt_group.set_conf(['foo', 'bar'])
+        cpt_group.set_pruning(0.9, patience = 1)
+        cpt_group.make_task()
+        cpt_group.record_traj_counts(np.array(([[10, 0, 0]] + [[5, 5, 0]] * 3) * 2))
+        task_group = cpt_group.make_task()
+        self.assertEqual(len(task_group), 6)
+        for loaded in [
+                pickle.loads(pickle.dumps(task_group)), 
+                jsonpickle.loads(jsonpickle.dumps(task_group)),
+        ]:
+            self.assertEqual(self._conds(loaded), self._conds(task_group))
+
+    def test_old_pickle(self):
+        cpt_group = NPTTaskGroup()
+        cpt_group.set_md(2, [10, 20], [100], ens = 'nvt')
+        cpt_group.set_conf(['foo', 'bar', 'baz'], n_sample = 2)
+        cpt_group.make_task()
+        # the state of the groups pickled at baseline, whose queue stores
+        # the confs
+        baseline = [
+            'conf_set', 'md_set', 'conf_list', 'n_sample', 'random_sample',
+            'conf_queue', 'graphs', 'mass_map', 'temps', 'press', 'ens', 'dt',
+            'nsteps', 'trj_freq', 'tau_t', 'tau_p', 'pka_e', 'neidelay',
+            'no_pbc', 'use_clusters', 'relative_f_epsilon', 
+            'relative_v_epsilon', 'ele_temp_f', 'ele_temp_a', '_task_list',
+        ]
+        state = {kk : vv for kk, vv in cpt_group.__dict__.items() if kk in baseline}
+        state['conf_queue'] = ['baz']
+        old = NPTTaskGroup.__new__(NPTTaskGroup)
+        old.__dict__.update(state)
+        loaded = pickle.loads(pickle.dumps(old))
+        self.assertEqual(loaded.conf_queue, [2])
+        task_group = loaded.make_task()
+        self.assertEqual(
+            [tt.files()[lmp_conf_name] for tt in task_group], ['baz', 'foo'])
+
+    def test_all_pruned(self):
+        cpt_group = NPTTaskGroup()
+        cpt_group.set_md(2, [10, 20], [100, 200], ens = 'nvt')
+        cpt_group.set_conf(['foo', 'bar'])
+        cpt_group.set_pruning(0.9, patience = 1)
+        cpt_group.make_task()
+        cpt_group.record_traj_counts(np.array([[10, 0, 0]] * 4))
+        # each condition from one conf
+        task_group = cpt_group.make_task()
+        self.assertEqual(
+            [tt.files()[lmp_conf_name] for tt in task_group], ['foo', 'foo'])
+
+    def test_not_set(self):
+        cpt_group = NPTTaskGroup()
+        cpt_group.set_md(2, [10, 20], [100, 200], ens = 'nvt')
+        cpt_group.set_conf(['foo', 'bar'])
+        cpt_group.make_task()
+        cpt_group.record_traj_counts(np.array([[10, 0, 0]] * 4))
+        self.assertEqual(len(cpt_group.make_task()), 4)
+
+
 class TestCPTStage(unittest.TestCase):
     # def setUp(self):
     #     self.mock_random = Mock()
@@ -394,3 +711,150 @@ class TestCPTStage(unittest.TestCase):
             in_template_nvt % (300.),
         )
     
+
+
+class TestLazyCPTGroup(unittest.TestCase):
+    def make_group(self, cls, confs):
+        grp = cls()
+        grp.set_md(3, [10, 20], [100., 200.], [1., 10., 100.])
+        grp.set_conf(confs, n_sample = 3, random_sample = True)
+        return grp
+
+    def files(self, task_group):
+        # the lazy tasks have their own velocity seeds
+        ret = []
+        for tt in task_group:
+            files = dict(tt.files())
+            files[lmp_input_name] = re.sub(
+                r'create \$\{TEMP\} \d+', 'create ${TEMP} SEED', files[lmp_input_name])
+            ret.append(files)
+        return ret
+
+    @patch('dpgen2.exploration.task.npt_task_group.random.shuffle')
+    @patch('dpgen2.exploration.task.lmp.lmp_input.random')
+    def test_same_as_eager(self, mock_random, mock_shuffle):
+        mock_random.randrange.return_value = 1110
+        mock_shuffle.side_effect = swap_element
+        confs = ['foo', 'bar']
+        eager = self.make_group(NPTTaskGroup, confs)
+        lazy = self.make_group(LazyNPTTaskGroup, confs)
+        for ii in range(3):
+            lazy_tasks = lazy.make_task()
+            eager_tasks = eager.make_task()
+            self.assertTrue(lazy_tasks.lazy)
+            self.assertEqual(len(lazy_tasks), 18)
+            self.assertEqual(self.files(lazy_tasks), self.files(eager_tasks))
+            self.assertEqual(
+                self.files([lazy_tasks[-1]]), self.files([eager_tasks[17]]))
+            self.assertEqual(
+                self.files(lazy_tasks.task_list), self.files(eager_tasks))
+        with self.assertRaises(IndexError):
+            lazy_tasks[18]
+
+    @patch('dpgen2.exploration.task.lmp.lmp_input.random')
+    def test_snapshot(self, mock_random):
+        mock_random.randrange.return_value = 1110
+        lazy = self.make_group(LazyNPTTaskGroup, ['foo', 'bar'])
+        lazy.random_sample = False
+        tasks0 = lazy.make_task()
+        tasks1 = lazy.make_task()
+        # the tasks made earlier are not changed by the later sampling
+        self.assertEqual(
+            [tt.files()[lmp_conf_name] for tt in tasks0][::6], ['foo', 'bar', 'foo'])
+        self.assertEqual(
+            [tt.files()[lmp_conf_name] for tt in tasks1][::6], ['bar', 'foo', 'bar'])
+
+    @patch('dpgen2.exploration.task.lmp.lmp_input.random')
+    def test_pickle(self, mock_random):
+        mock_random.randrange.return_value = 1110
+        confs = ['foo' * 1000, 'bar' * 1000]
+        lazy = self.make_group(LazyNPTTaskGroup, confs)
+        eager = self.make_group(NPTTaskGroup, confs)
+        lazy.random_sample = eager.random_sample = False
+        lazy, eager = lazy.make_task(), eager.make_task()
+        lazy1 = pickle.loads(pickle.dumps(lazy))
+        self.assertEqual(
+            [tt.files() for tt in lazy1], [tt.files() for tt in lazy])
+        self.assertEqual(self.files(lazy1), self.files(eager))
+        # the task contents are not stored, the size does not grow 
+        # with the number of tasks
+        self.assertLess(len(pickle.dumps(lazy)), len(pickle.dumps(eager)))
+        lazy_large = self.make_group(LazyNPTTaskGroup, confs)
+        lazy_large.set_md(3, [10, 20], list(range(100, 2000, 100)), [1., 10., 100.])
+        lazy_large = lazy_large.make_task()
+        self.assertEqual(len(lazy_large), 171)
+        self.assertLess(len(pickle.dumps(lazy_large)), len(pickle.dumps(lazy)) + 500)
+
+    def test_seeds(self):
+        lazy = self.make_group(LazyNPTTaskGroup, ['foo', 'bar'])
+        lazy.set_md(3, [10, 20], [100., 200.], [1., 10., 100.], input_spec = True)
+        tasks = lazy.make_task()
+        seeds = [json.loads(tt.files()[lmp_input_spec_name])['seed'] for tt in tasks]
+        # the same seeds however many times the tasks are accessed
+        self.assertEqual(
+            [json.loads(tt.files()[lmp_input_spec_name])['seed'] for tt in tasks], seeds)
+        self.assertEqual(
+            json.loads(tasks[-1].files()[lmp_input_spec_name])['seed'], seeds[-1])
+        self.assertEqual(len(set(seeds)), len(seeds))
+        lazy.input_spec = False
+        tasks = lazy.make_task()
+        self.assertEqual(tasks[5].files(), tasks[5].files())
+
+    @patch('dpgen2.exploration.task.lmp.lmp_input.random')
+    def test_stage(self, mock_random):
+        mock_random.randrange.return_value = 1110
+        grp0 = self.make_group(NPTTaskGroup, ['foo'])
+        grp1 = self.make_group(LazyNPTTaskGroup, ['bar'])
+        stage = ExplorationStage()
+        stage.add_task_group(grp0).add_task_group(grp1)
+        task_group = stage.make_task()
+        self.assertTrue(isinstance(task_group, LazyExplorationTaskGroup))
+        self.assertEqual(len(task_group), 36)
+        confs = [tt.files()[lmp_conf_name] for tt in task_group]
+        self.assertEqual(confs, ['foo'] * 18 + ['bar'] * 18)
+        self.assertEqual(task_group[17].files()[lmp_conf_name], 'foo')
+        self.assertEqual(task_group[18].files()[lmp_conf_name], 'bar')
+        self.assertEqual(task_group[-1].files()[lmp_conf_name], 'bar')
+        # an eager group expands the lazy group
+        eager = ExplorationTaskGroup()
+        eager += grp1.make_task()
+        self.assertEqual(len(eager.task_list), 18)
+
+    def test_add_task(self):
+        task_group = LazyExplorationTaskGroup()
+        task_group.add_task(ExplorationTask().add_file('foo', 'foo'))
+        task_group.add_task(ExplorationTask().add_file('foo', 'bar'))
+        self.assertEqual(len(task_group), 2)
+        self.assertEqual(
+            [tt.files()['foo'] for tt in task_group], ['foo', 'bar'])
+
+
+class TestTaskGroupState(unittest.TestCase):
+    def setUp(self):
+        self.conf = 'foo' * 1000
+        self.task_group = ExplorationTaskGroup()
+        for ii in range(10):
+            self.task_group.add_task(
+                ExplorationTask()
+                .add_file(lmp_conf_name, self.conf)
+                .add_file(lmp_input_name, f'input {ii}')
+            )
+
+    def check_same(self, task_group):
+        self.assertEqual(len(task_group), 10)
+        for ii in range(10):
+            self.assertEqual(
+                task_group[ii].files(),
+                {lmp_conf_name : self.conf, lmp_input_name : f'input {ii}'},
+            )
+
+    def test_pickle(self):
+        self.check_same(pickle.loads(pickle.dumps(self.task_group)))
+        # the state does not change the group
+        self.check_same(self.task_group)
+
+    def test_jsonpickle(self):
+        dumped = jsonpickle.dumps(self.task_group)
+        self.check_same(jsonpickle.loads(dumped))
+        # the shared conf is serialized once
+        self.assertLess(len(dumped), 2 * len(self.conf))
@@ -15,10 +15,11 @@ from dflow.python import (
 from dpgen2.exploration.scheduler import (
     ConvergenceCheckStageScheduler,
     ExplorationScheduler,
+    MDLengthPolicy,
 )
-from dpgen2.exploration.report import ExplorationReport
-from dpgen2.exploration.task import ExplorationTaskGroup, ExplorationStage
-from dpgen2.exploration.selector import TrustLevel, ConfSelectorLammpsFrames
+from dpgen2.exploration.report import ExplorationReport, TrajsExplorationReport, CompactExplorationReport
+from dpgen2.exploration.task import ExplorationTaskGroup, ExplorationStage, NPTTaskGroup
+from dpgen2.exploration.selector import TrustLevel, TrustLevelPolicy, ConfSelectorLammpsFrames
 from mocked_ops import (
     MockedExplorationReport,
     MockedExplorationTaskGroup,
@@ -97,6 +98,213 @@ class TestConvergenceCheckStageScheduler(unittest.TestCase):
         # self.assertTrue(sel.trust_level.level_v_hi is None)
 
         
+    def test_trust_level_policy(self):
+        class FooPolicy(TrustLevelPolicy):
+            def update(self, trust_level, report, ref_trust_level = None):
+                return TrustLevel(trust_level.level_f_lo * 2, trust_level.level_f_hi * 2)
+        self.trust_level = TrustLevel(0.1, 0.3)
+        self.selector = ConfSelectorLammpsFrames(self.trust_level)
+        self.scheduler = ConvergenceCheckStageScheduler(
+            MockedStage(),
+            self.selector,
+            trust_level_policy = FooPolicy(10),
+        )
+        self.assertTrue(self.selector.ref_trust_level is self.trust_level)
+        foo_report = MockedExplorationReport()
+        foo_report.accurate = 0.
+        foo_report.candidate = .5
+        foo_report.failed = .5
+        conv, ltg, sel = self.scheduler.plan_next_iteration()
+        self.assertEqual(sel.trust_level.level_f_lo, 0.1)
+        conv, ltg, sel = self.scheduler.plan_next_iteration(foo_report, [])
+        self.assertEqual(conv, False)
+        self.assertAlmostEqual(sel.trust_level.level_f_lo, 0.2)
+        self.assertAlmostEqual(sel.trust_level.level_f_hi, 0.6)
+        # no candidate, still fatal with the policy
+        foo_report.candidate = 0.
+        foo_report.failed = 1.
+        with self.assertRaises(FatalError):
+            self.scheduler.plan_next_iteration(foo_report, [])
+
+    def test_trust_level_policy_convergence(self):
+        self.trust_level = TrustLevel(0.1, 0.3)
+        self.selector = ConfSelectorLammpsFrames(self.trust_level)
+        self.scheduler = ConvergenceCheckStageScheduler(
+            MockedStage(),
+            self.selector,
+            conv_accuracy = 0.9,
+            trust_level_policy = TrustLevelPolicy(10),
+        )
+        self.scheduler.plan_next_iteration()
+        # the levels are tuned down, so no frame is accurate by the tuned
+        # levels, while all the frames are accurate by the configured ones.
+        self.selector.trust_level = TrustLevel(0.01, 0.03)
+        report = TrajsExplorationReport()
+        report.record_traj(
+            np.array([], dtype=int), np.array([0]), np.array([1, 2, 3]), 
+            None, None, None, ref_counts = [4, 0, 0])
+        self.assertEqual(report.accurate_ratio(), 0.)
+        conv, ltg, sel = self.scheduler.plan_next_iteration(report.compact(), [])
+        self.assertTrue(conv)
+
+    def test_trust_level_policy_candidates(self):
+        self.trust_level = TrustLevel(0.1, 0.3)
+        self.selector = ConfSelectorLammpsFrames(self.trust_level)
+        self.scheduler = ConvergenceCheckStageScheduler(
+            MockedStage(),
+            self.selector,
+            conv_accuracy = 0.9,
+            trust_level_policy = TrustLevelPolicy(10),
+        )
+        self.scheduler.plan_next_iteration()
+        # no candidate by the configured levels, while the tuned levels 
+        # select candidates, so the stage is not stalled.
+        report = TrajsExplorationReport()
+        report.record_traj(
+            np.array([0]), np.array([1, 2]), np.array([3]), 
+            None, None, None, ref_counts = [1, 0, 3])
+        conv, ltg, sel = self.scheduler.plan_next_iteration(report.compact(), [])
+        self.assertFalse(conv)
+        # no candidate by the tuned levels is fatal
+        report = TrajsExplorationReport()
+        report.record_traj(
+            np.array([0]), np.array([], dtype=int), np.array([1, 2, 3]), 
+            None, None, None, ref_counts = [1, 2, 1])
+        with self.assertRaises(FatalError):
+            self.scheduler.plan_next_iteration(report.compact(), [])
+
+    def test_compact_reports(self):
+        self.trust_level = TrustLevel(0.1, 0.3)
+        self.selector = ConfSelectorLammpsFrames(self.trust_level)
+        self.scheduler = ConvergenceCheckStageScheduler(
+            MockedStage(),
+            self.selector,
+        )
+        report = TrajsExplorationReport()
+        report.record_traj(
+            np.array([0]), np.array([1, 2]), np.array([3]),
+            None, None, None,
+        )
+        self.scheduler.plan_next_iteration()
+        self.scheduler.plan_next_iteration(report, [])
+        self.assertEqual(len(self.scheduler.reports), 1)
+        self.assertTrue(isinstance(self.scheduler.reports[0], CompactExplorationReport))
+        self.assertAlmostEqual(self.scheduler.reports[0].candidate_ratio(), 0.5)
+
+    def test_restart_from_trajs(self):
+        trajs = [Path('foo0.dump'), Path('foo1.dump')]
+        for ii in trajs:
+            ii.write_text(''.join([textwrap.dedent(
+                """ITEM: TIMESTEP
+                %d
+                ITEM: NUMBER OF ATOMS
+                1
+                ITEM: BOX BOUNDS xy xz yz pp pp pp
+                0.0 10.0 0.0
+                0.0 10.0 0.0
+                0.0 10.0 0.0
+                ITEM: ATOMS id type x y z
+                1 1 %f 1.0 1.0
+                """) % (jj, 0.5 * (jj + 1)) for jj in range(3)]))
+        tgroup = NPTTaskGroup()
+        tgroup.set_md(2, [10], [100, 200], ens = 'nvt')
+        tgroup.set_conf(['foo'])
+        stage = ExplorationStage().add_task_group(tgroup)
+        self.scheduler = ConvergenceCheckStageScheduler(
+            stage,
+            ConfSelectorLammpsFrames(TrustLevel(0.1, 0.3)),
+            restart_from_trajs = True,
+        )
+        report = TrajsExplorationReport()
+        report.record_traj(
+            np.array([0]), np.array([1]), np.array([2]), None, None, None)
+        report.record_traj(
+            np.array([], dtype=int), np.array([], dtype=int), np.array([0, 1, 2]), 
+            None, None, None)
+        conv, ltg, sel = self.scheduler.plan_next_iteration()
+        conv, ltg, sel = self.scheduler.plan_next_iteration(report.compact(), trajs)
+        for ii in trajs:
+            os.remove(ii)
+        confs = [tt.files()['conf.lmp'] for tt in ltg]
+        self.assertIn('1.0000000000    1.0000000000    1.0000000000', confs[0])
+        self.assertEqual(confs[1], 'foo')
+
+    def test_record_traj_counts(self):
+        tgroup = NPTTaskGroup()
+        tgroup.set_md(2, [10], [100, 200], ens = 'nvt')
+        tgroup.set_conf(['foo'])
+        self.assertFalse(ExplorationStage().add_task_group(tgroup).pruning_enabled())
+        tgroup.set_pruning(0.9)
+        stage = ExplorationStage().add_task_group(tgroup)
+        self.assertTrue(stage.pruning_enabled())
+        self.scheduler = ConvergenceCheckStageScheduler(
+            stage,
+            ConfSelectorLammpsFrames(TrustLevel(0.1, 0.3)),
+        )
+        report = TrajsExplorationReport()
+        report.record_traj(
+            np.array([0, 1, 2]), np.array([], dtype=int), np.array([], dtype=int), 
+            None, None, None)
+        report.record_traj(
+            np.array([0]), np.array([1]), np.array([2]), None, None, None)
+        conv, ltg, sel = self.scheduler.plan_next_iteration()
+        self.assertEqual(len(ltg), 2)
+        conv, ltg, sel = self.scheduler.plan_next_iteration(report.compact(), [])
+        self.assertFalse(conv)
+        # the condition of T 100 is pruned
+        self.assertEqual(len(ltg), 1)
+        self.assertIn('variable        TEMP            equal 200.000000', ltg[0].files()['in.lammps'])
+
+    def test_record_traj_counts_mismatch(self):
+        tgroup = NPTTaskGroup()
+        tgroup.set_md(2, [10], [100, 200], ens = 'nvt')
+        tgroup.set_conf(['foo'])
+        tgroup.set_pruning(0.9)
+        stage = ExplorationStage().add_task_group(tgroup)
+        self.assertEqual(len(stage.make_task()), 2)
+        with self.assertRaises(RuntimeError) as ee:
+            stage.record_traj_counts(np.array([[3, 0, 0]] * 3))
+        self.assertIn('counts 3', str(ee.exception))
+        self.assertIn('tasks 2', str(ee.exception))
+        # nothing is recorded
+        self.assertEqual(tgroup.cond_streak, [])
+
+    def test_md_length_policy(self):
+        tgroup = NPTTaskGroup()
+        tgroup.set_md(2, [10], [100], ens = 'nvt', nsteps = 100, trj_freq = 10)
+        tgroup.set_conf(['foo'])
+        stage = ExplorationStage().add_task_group(tgroup)
+        self.scheduler = ConvergenceCheckStageScheduler(
+            stage,
+            ConfSelectorLammpsFrames(TrustLevel(0.1, 0.3)),
+            md_length_policy = MDLengthPolicy(),
+        )
+        report = MockedExplorationReport()
+        report.accurate = 0.5
+        report.candidate = 0.2
+        report.failed = 0.3
+        conv, ltg, sel = self.scheduler.plan_next_iteration()
+        self.assertIn('variable        NSTEPS          equal 100', ltg[0].files()['in.lammps'])
+        conv, ltg, sel = self.scheduler.plan_next_iteration(report, [])
+        self.assertEqual(self.scheduler.md_scale, 0.5)
+        self.assertIn('variable        NSTEPS          equal 50', ltg[0].files()['in.lammps'])
+        self.assertIn('variable        THERMO_FREQ     equal 5', ltg[0].files()['in.lammps'])
+
+    def test_no_candidate_fatal(self):
+        self.trust_level = TrustLevel(0.1, 0.3)
+        self.selector = ConfSelectorLammpsFrames(self.trust_level)
+        self.scheduler = ConvergenceCheckStageScheduler(
+            MockedStage(),
+            self.selector,
+        )
+        foo_report = MockedExplorationReport()
+        foo_report.accurate = 0.
+        foo_report.candidate = 0.
+        foo_report.failed = 1.
+        self.scheduler.plan_next_iteration()
+        with self.assertRaises(FatalError):
+            self.scheduler.plan_next_iteration(foo_report, [])
+
     def test_max_numb_iter(self):
         self.trust_level = TrustLevel(0.1, 0.3)
         self.selector = ConfSelectorLammpsFrames(self.trust_level)
@@ -0,0 +1,41 @@
+import os
+import numpy as np
+import unittest
+from .context import dpgen2
+from dpgen2.exploration.scheduler import MDLengthPolicy
+from mocked_ops import MockedExplorationReport
+
+
+class TestMDLengthPolicy(unittest.TestCase):
+    def make_report(self, accurate, failed):
+        report = MockedExplorationReport()
+        report.accurate = accurate
+        report.failed = failed
+        report.candidate = 1. - accurate - failed
+        return report
+
+    def test_shrink(self):
+        policy = MDLengthPolicy()
+        self.assertAlmostEqual(policy.update(1., self.make_report(0.5, 0.2)), 0.5)
+
+    def test_grow(self):
+        policy = MDLengthPolicy()
+        self.assertAlmostEqual(policy.update(1., self.make_report(0.6, 0.)), 2.)
+
+    def test_keep(self):
+        policy = MDLengthPolicy()
+        # neither failing nor mostly accurate
+        self.assertAlmostEqual(policy.update(1., self.make_report(0.3, 0.05)), 1.)
+        # mostly accurate, but failing
+        self.assertAlmostEqual(policy.update(1., self.make_report(0.9, 0.05)), 1.)
+
+    def test_bounds(self):
+        policy = MDLengthPolicy(scale_bounds = (0.5, 3.))
+        self.assertAlmostEqual(policy.update(2., self.make_report(0.6, 0.)), 3.)
+        self.assertAlmostEqual(policy.update(0.5, self.make_report(0.5, 0.2)), 0.5)
+        policy = MDLengthPolicy(scale_bounds = (None, None))
+        self.assertAlmostEqual(policy.update(8., self.make_report(0.6, 0.)), 16.)
+
+    def test_factor(self):
+        with self.assertRaises(RuntimeError):
+            MDLengthPolicy(factor = 1.)
@@ -1,9 +1,9 @@
 from context import dpgen2
-import os, textwrap
+import os, textwrap, pickle
 import numpy as np
 import unittest
 from collections import Counter
-from dpgen2.exploration.report import NaiveExplorationReport, TrajsExplorationReport
+from dpgen2.exploration.report import NaiveExplorationReport, TrajsExplorationReport, CompactExplorationReport
 
 class TestNaiveExplorationReport(unittest.TestCase):
     def test_naive_fv(self):
@@ -163,3 +163,184 @@ class TestTrajsExplorationResport(unittest.TestCase):
             set(picked),
             set(all_cand_sel),
         )
+
+
+    def test_status_array(self):
+        id_f_accu = [ [3, 5, 1], [1, 7, 5] ]
+        id_f_cand = [ [4, 7, 6], [8, 6, 0] ]
+        id_f_fail = [ [2, 0, 8], [4, 2, 3] ]
+        id_v_accu = [ [1, 2, 6], [7, 8, 6] ]
+        id_v_cand = [ [0, 5, 8], [0, 5, 4] ]
+        id_v_fail = [ [4, 3, 7], [2, 3, 1] ]
+        ter = TrajsExplorationReport()
+        for ii in range(2):
+            ter.record_traj(
+                np.array(id_f_accu[ii]), np.array(id_f_cand[ii]), np.array(id_f_fail[ii]),
+                np.array(id_v_accu[ii]), np.array(id_v_cand[ii]), np.array(id_v_fail[ii]),
+            )
+        self.assertEqual(len(ter.traj_status), 2)
+        for ii in ter.traj_status:
+            self.assertEqual(ii.dtype, np.int8)
+        np.testing.assert_equal(ter.traj_status[0], [2, 0, 2, 2, 2, 1, 1, 2, 2])
+        np.testing.assert_equal(ter.traj_status[1], [1, 2, 2, 2, 2, 1, 1, 0, 1])
+        self.assertEqual(ter.numb_accu, 2)
+        self.assertEqual(ter.numb_cand, 6)
+        self.assertEqual(ter.numb_fail, 10)
+
+    def test_old_pickle(self):
+        # the state of the reports pickled before the status arrays
+        state = {
+            'traj_nframes' : [4, 2],
+            'traj_accu' : [set([0, 3]), set()],
+            'traj_cand' : [set([1]), set([1])],
+            'traj_fail' : [set([2]), set([0])],
+            'traj_cand_picked' : [(0, 1)],
+        }
+        ter = TrajsExplorationReport.__new__(TrajsExplorationReport)
+        ter.__setstate__(state)
+        np.testing.assert_equal(ter.traj_status[0], [0, 1, 2, 0])
+        np.testing.assert_equal(ter.traj_status[1], [2, 1])
+        self.assertEqual(ter.traj_accu, state['traj_accu'])
+        self.assertEqual(ter.traj_cand, state['traj_cand'])
+        self.assertEqual(ter.traj_fail, state['traj_fail'])
+        self.assertEqual(ter.traj_cand_picked, [(0, 1)])
+        self.assertAlmostEqual(ter.accurate_ratio(), 2./6.)
+        self.assertAlmostEqual(ter.failed_ratio(), 2./6.)
+        # the new reports are not converted
+        ter1 = pickle.loads(pickle.dumps(ter))
+        np.testing.assert_equal(ter1.traj_status[0], [0, 1, 2, 0])
+
+    def test_get_candidates_seed(self):
+        ter = TrajsExplorationReport()
+        nframes = [20, 0, 35, 7]
+        for nn in nframes:
+            # even frames are candidates, odd frames are accurate
+            ter.record_traj(
+                np.arange(1, nn, 2), np.arange(0, nn, 2), np.array([], dtype=int),
+                None, None, None,
+            )
+        all_cand = set((ii, jj) for ii, nn in enumerate(nframes) for jj in range(0, nn, 2))
+        picked = ter.get_candidates(10, seed=1)
+        self.assertEqual(len(picked), 10)
+        self.assertEqual(len(set(picked)), 10)
+        self.assertTrue(set(picked) <= all_cand)
+        self.assertEqual(picked, sorted(picked))
+        self.assertEqual(picked, ter.get_candidates(10, seed=1))
+        # all candidates are returned if max_nframes is not set
+        self.assertEqual(set(ter.get_candidates()), all_cand)
+        self.assertEqual(set(ter.get_candidates(100, seed=1)), all_cand)
+
+
+    def test_model_devi_hist(self):
+        ter = TrajsExplorationReport()
+        edges, counts = ter.model_devi_hist()
+        self.assertEqual(edges.size, counts.size)
+        self.assertEqual(np.sum(counts), 0)
+        mdf = np.array([0.0, 0.0005, 0.02, 0.2, 0.21, 500.])
+        ter.record_traj(
+            np.array([0, 1, 2]), np.array([3, 4]), np.array([5]),
+            None, None, None,
+            model_devi_f = mdf,
+        )
+        edges, counts = ter.model_devi_hist()
+        self.assertEqual(np.sum(counts), 6)
+        # the first and the last bins collect the out-of-range deviations
+        self.assertEqual(counts[0], 2)
+        self.assertEqual(counts[-1], 1)
+        for ii in mdf[2:5]:
+            idx = np.searchsorted(edges, ii, side='right') - 1
+            self.assertTrue(edges[idx] <= ii < edges[idx+1])
+            self.assertTrue(counts[idx] >= 1)
+        ter.clear()
+        self.assertEqual(np.sum(ter.model_devi_hist()[1]), 0)
+
+
+    def test_exclude_candidates(self):
+        ter = TrajsExplorationReport()
+        for nn in [6, 4]:
+            ter.record_traj(
+                np.arange(1, nn, 2), np.arange(0, nn, 2), np.array([], dtype=int),
+                None, None, None,
+            )
+        ter.exclude_candidates(0, [2])
+        ter.exclude_candidates(0, [4])
+        ter.exclude_candidates(1, [0, 2])
+        np.testing.assert_equal(ter.candidate_frames(0), [0])
+        np.testing.assert_equal(ter.candidate_frames(1), [])
+        self.assertEqual(ter.get_candidates(), [(0, 0)])
+        self.assertEqual(ter.get_candidates(1, seed=0), [(0, 0)])
+        # the ratios are not changed
+        self.assertAlmostEqual(ter.candidate_ratio(), 0.5)
+
+
+class TestCompactExplorationReport(unittest.TestCase):
+    def setUp(self):
+        self.ter = TrajsExplorationReport()
+        self.ter.record_traj(
+            np.array([0, 1]), np.array([2, 3, 4]), np.array([5]),
+            None, None, None,
+            model_devi_f = np.array([0.01, 0.02, 0.2, 0.3, 0.4, 1.0]),
+        )
+        self.ter.record_traj(
+            np.array([0, 1, 2]), np.array([3]), np.array([], dtype=int),
+            None, None, None,
+            model_devi_f = np.array([0.01, 0.02, 0.03, 0.3]),
+        )
+        self.ter.get_candidates(2, seed=0)
+
+    def check_same(self, ter, cer):
+        self.assertAlmostEqual(ter.accurate_ratio(), cer.accurate_ratio())
+        self.assertAlmostEqual(ter.candidate_ratio(), cer.candidate_ratio())
+        self.assertAlmostEqual(ter.failed_ratio(), cer.failed_ratio())
+        self.assertEqual(ter.traj_nframes, cer.traj_nframes)
+        self.assertEqual(ter.traj_cand_picked, cer.traj_cand_picked)
+        self.assertEqual(ter.traj_last_good_frames(), cer.traj_last_good_frames())
+        np.testing.assert_equal(ter.traj_frame_counts(), cer.traj_frame_counts())
+        np.testing.assert_equal(ter.model_devi_hist()[0], cer.model_devi_hist()[0])
+        np.testing.assert_equal(ter.model_devi_hist()[1], cer.model_devi_hist()[1])
+
+    def test_compact(self):
+        cer = self.ter.compact()
+        self.assertTrue(isinstance(cer, CompactExplorationReport))
+        self.check_same(self.ter, cer)
+        self.assertEqual(len(cer.traj_cand_picked), 2)
+        np.testing.assert_equal(cer.traj_counts, [[2, 3, 1], [3, 1, 0]])
+        # the compact report does not change with the report
+        self.ter.clear()
+        self.assertEqual(cer.numb_cand, 4)
+        self.assertEqual(np.sum(cer.model_devi_hist()[1]), 10)
+
+    def test_pickle(self):
+        cer = self.ter.compact()
+        cer1 = pickle.loads(pickle.dumps(cer))
+        self.check_same(self.ter, cer1)
+        self.assertEqual(cer1.compact(), cer1)
+        # the per-frame status is not kept
+        self.assertFalse(hasattr(cer1, 'traj_status'))
+        # the bin edges shared by the reports are not pickled
+        self.assertNotIn('hist_edges', cer.__getstate__())
+        self.assertIs(cer1.model_devi_hist()[0], CompactExplorationReport.hist_edges)
+        self.assertLess(len(pickle.dumps(cer)), len(pickle.dumps(self.ter)))
+
+    def test_last_good_frames(self):
+        self.ter.record_traj(
+            np.array([], dtype=int), np.array([], dtype=int), np.array([0, 1]),
+            None, None, None,
+        )
+        self.assertEqual(self.ter.traj_last_good_frames(), [4, 3, -1])
+        self.assertEqual(self.ter.compact().traj_last_good_frames(), [4, 3, -1])
+
+    def test_no_hist(self):
+        cer = CompactExplorationReport([[1, 2, 1]])
+        self.assertIsNone(cer.model_devi_hist())
+        self.assertEqual(cer.traj_cand_picked, [])
+        self.assertAlmostEqual(cer.candidate_ratio(), 0.5)
+        cer1 = pickle.loads(pickle.dumps(cer))
+        self.assertIsNone(cer1.model_devi_hist())
+
+    def test_naive_compact(self):
+        ner = NaiveExplorationReport(
+            Counter({'candidate': 1, 'accurate': 1, 'failed': 0}),
+            Counter({'candidate': 1, 'accurate': 1, 'failed': 0}),
+        )
+        self.assertIs(ner.compact(), ner)
@@ -0,0 +1,69 @@
+import os
+import numpy as np
+import unittest
+from .context import dpgen2
+from dpgen2.exploration.report import TrajsExplorationReport
+from dpgen2.exploration.selector import TrustLevel, TrustLevelPolicy
+from mocked_ops import MockedExplorationReport
+
+
+class TestTrustLevelPolicy(unittest.TestCase):
+    def setUp(self):
+        # 1000 frames, deviations log-uniform in [0.01, 1)
+        self.mdf = np.geomspace(0.01, 1., 1000, endpoint=False)
+        self.report = TrajsExplorationReport()
+        self.report.record_traj(
+            np.arange(1000), np.array([], dtype=int), np.array([], dtype=int),
+            None, None, None,
+            model_devi_f = self.mdf,
+        )
+
+    def count(self, tl):
+        return np.sum(np.logical_and(self.mdf >= tl.level_f_lo, self.mdf < tl.level_f_hi))
+
+    def test_target(self):
+        policy = TrustLevelPolicy(100, max_scale = None)
+        tl = policy.update(TrustLevel(0.001, 0.002, 0.1, 0.2), self.report)
+        self.assertAlmostEqual(tl.level_f_hi / tl.level_f_lo, 2.)
+        self.assertTrue(abs(self.count(tl) - 100) <= 5)
+        self.assertEqual(tl.level_v_lo, 0.1)
+        self.assertEqual(tl.level_v_hi, 0.2)
+
+    def test_target_too_large(self):
+        # at most 150 frames fit in a window of ratio 2.
+        policy = TrustLevelPolicy(400, max_scale = None)
+        tl = policy.update(TrustLevel(0.001, 0.002), self.report)
+        self.assertTrue(self.count(tl) >= 140)
+
+    def test_bounds(self):
+        policy = TrustLevelPolicy(100, level_f_hi_bounds = (None, 0.015))
+        tl = policy.update(TrustLevel(0.001, 0.002), self.report)
+        self.assertAlmostEqual(tl.level_f_hi, 0.015)
+        self.assertAlmostEqual(tl.level_f_lo, 0.0075)
+        policy = TrustLevelPolicy(200, level_f_lo_bounds = (0.5, None))
+        tl = policy.update(TrustLevel(0.001, 0.002), self.report)
+        self.assertAlmostEqual(tl.level_f_lo, 0.5)
+
+    def test_default_bounds(self):
+        # bounded around the configured trust levels
+        policy = TrustLevelPolicy(100, max_scale = 1.2)
+        tl = policy.update(TrustLevel(0.5, 1.0), self.report)
+        self.assertAlmostEqual(tl.level_f_lo, 0.6)
+        self.assertAlmostEqual(tl.level_f_hi, 1.2)
+        # not around the tuned ones
+        tl = policy.update(tl, self.report, ref_trust_level = TrustLevel(0.5, 1.0))
+        self.assertAlmostEqual(tl.level_f_lo, 0.6)
+        policy = TrustLevelPolicy(100, max_scale = 100.)
+        tl = policy.update(TrustLevel(0.1, 0.2), self.report)
+        self.assertTrue(abs(self.count(tl) - 100) <= 5)
+        # the bounds set explicitly replace the default ones
+        policy = TrustLevelPolicy(100, level_f_lo_bounds = (None, 0.006))
+        tl = policy.update(TrustLevel(0.1, 0.2), self.report)
+        self.assertAlmostEqual(tl.level_f_lo, 0.006)
+        self.assertAlmostEqual(tl.level_f_hi, 0.012)
+
+    def test_no_hist(self):
+        policy = TrustLevelPolicy(100)
+        tl0 = TrustLevel(0.1, 0.2)
+        self.assertTrue(policy.update(tl0, MockedExplorationReport()) is tl0)
+        self.assertTrue(policy.update(tl0, TrajsExplorationReport()) is tl0)
@@ -19,6 +19,7 @@ from dpgen2.constants import (
     lmp_model_devi_name,
 )
 from dpgen2.op.collect_data import CollectData
+from dpgen2.constants import fingerprint_index_name, fingerprint_table_name
 from fake_data_set import fake_system, fake_multi_sys
 
 class TestRunLmp(unittest.TestCase):
@@ -123,4 +124,62 @@ class TestRunLmpEmpty(unittest.TestCase):
         ms = dpdata.MultiSystems(type_map=self.type_map)        
         ms.from_deepmd_npy(out['iter_data'][0])
         self.assertEqual(ms.get_nframes(), 0)
+        # no fingerprint without the config
+        self.assertFalse((Path('iter1') / fingerprint_index_name).is_file())
+        self.assertFalse((Path('iter1') / fingerprint_table_name).is_file())
 
+    def test_fingerprint_config(self):
+        op = CollectData()
+        self.type_map = ['bar', 'foo']
+        out = op.execute(
+            OPIO({
+                'name' : 'iter1',
+                'type_map' : self.type_map,
+                'iter_data' : self.iter_data,
+                'labeled_data' : self.labeled_data,
+                'fingerprint_config' : {'rcut' : 5.0, 'nbins' : 20},
+            }))
+        data = np.load(Path('iter1') / fingerprint_index_name)
+        self.assertEqual(data['fingerprints'].shape, (0, 60))
+        self.assertEqual(float(data['rcut']), 5.0)
+        self.assertEqual(int(data['nbins']), 20)
+        # the index is persisted only with the tolerance
+        self.assertFalse((Path('iter1') / fingerprint_table_name).is_file())
+
+    def test_fingerprint_index(self):
+        op = CollectData()
+        self.type_map = ['bar', 'foo']
+        out = op.execute(
+            OPIO({
+                'name' : 'iter1',
+                'type_map' : self.type_map,
+                'iter_data' : self.iter_data,
+                'labeled_data' : self.labeled_data,
+                'fingerprint_config' : {'rcut' : 5.0, 'nbins' : 20, 'tol' : 0.1},
+            }))
+        data = np.load(Path('iter1') / fingerprint_table_name)
+        self.assertEqual(data['shard_names'].tolist(), ['iter1'])
+
+
+class TestWriteFingerprints(unittest.TestCase):
+    def setUp(self):
+        self.natoms = [1, 2]
+        self.nframes = [3, 4]
+        self.atom_name_ms = 'foo'
+
+    def tearDown(self):
+        if Path('iter1').is_dir():
+            shutil.rmtree('iter1')
+
+    def test_write_fingerprints(self):
+        ms = dpdata.MultiSystems(type_map=['bar', 'foo'])
+        for nf, na in zip(self.nframes, self.natoms):
+            ss = fake_system(nf, na, self.atom_name_ms)
+            ss.data['atom_types'] = np.array(ss['atom_types'], dtype=int)
+            ms.append(ss)
+        Path('iter1').mkdir()
+        CollectData._write_fingerprints('iter1', ms, ['bar', 'foo'])
+        data = np.load(Path('iter1') / fingerprint_index_name)
+        self.assertEqual(data['fingerprints'].shape, (7, 90))
+        self.assertEqual(float(data['rcut']), 6.0)
+        self.assertEqual(int(data['nbins']), 30)
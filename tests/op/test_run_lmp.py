@@ -1,6 +1,6 @@
 from op.context import dpgen2
 import numpy as np
-import unittest, json, shutil
+import os, unittest, json, shutil
 from mock import mock, patch, call
 from dflow.python import (
     OP,
@@ -13,12 +13,16 @@ from pathlib import Path
 from dpgen2.constants import (
     lmp_conf_name,
     lmp_input_name,
+    lmp_input_spec_name,
     lmp_log_name,
     lmp_traj_name,
     lmp_model_devi_name,
+    lmp_partition_input_name,
+    lmp_partition_log_name,
     model_name_pattern,
 )
-from dpgen2.op.run_lmp import RunLmp
+from dpgen2.op.run_lmp import RunLmp, RunLmpPartition
+from dpgen2.exploration.task.lmp import make_lmp_input
 
 
 class TestRunLmp(unittest.TestCase):
@@ -70,6 +74,50 @@ class TestRunLmp(unittest.TestCase):
             self.assertEqual((work_dir/(model_name_pattern%ii)).read_text(), f'model{ii}')
 
     
+    @patch('dpgen2.op.run_lmp.run_command')
+    def test_input_spec(self, mocked_run):
+        mocked_run.side_effect = [ (0, 'foo\n', '') ]
+        spec = {
+            'conf_file' : lmp_conf_name, 'ensemble' : 'nvt', 
+            'graphs' : ['model.000.pb', 'model.001.pb'], 'nsteps' : 100, 
+            'dt' : 0.001, 'neidelay' : None, 'trj_freq' : 10, 
+            'mass_map' : [1., 16.], 'temp' : 300., 
+            'trj_seperate_files' : False, 'seed' : 1234,
+        }
+        (self.task_path/lmp_input_name).unlink()
+        (self.task_path/lmp_input_spec_name).write_text(json.dumps(spec))
+        op = RunLmp()
+        out = op.execute(
+            OPIO({
+                'config' : {'command' : 'mylmp'},
+                'task_name' : self.task_name,
+                'task_path' : self.task_path,
+                'models' : self.models,
+            }))
+        work_dir = Path(self.task_name)
+        self.assertEqual((work_dir/lmp_conf_name).read_text(), 'foo')
+        self.assertFalse((work_dir/lmp_input_name).is_symlink())
+        self.assertEqual(
+            (work_dir/lmp_input_name).read_text(), make_lmp_input(**spec))
+        self.assertIn('all create ${TEMP} 1234', (work_dir/lmp_input_name).read_text())
+
+    @patch('dpgen2.op.run_lmp.run_command')
+    def test_halted(self, mocked_run):
+        def run_halted(*args, **kwargs):
+            Path(lmp_log_name).write_text(
+                'WARNING: Fix halt condition for fix-id halt met on step 100 with value 2\n')
+            return (1, 'foo\n', '')
+        mocked_run.side_effect = run_halted
+        op = RunLmp()
+        out = op.execute(
+            OPIO({
+                'config' : {'command' : 'mylmp'},
+                'task_name' : self.task_name,
+                'task_path' : self.task_path,
+                'models' : self.models,
+            }))
+        self.assertEqual(out['log'], Path(self.task_name)/lmp_log_name)
+
     @patch('dpgen2.op.run_lmp.run_command')
     def test_error(self, mocked_run):
         mocked_run.side_effect = [ (1, 'foo\n', '') ]
@@ -89,3 +137,122 @@ class TestRunLmp(unittest.TestCase):
         mocked_run.assert_has_calls(calls)
                         
         
+
+
+class TestRunLmpPartition(unittest.TestCase):
+    def setUp(self):
+        self.task_paths = [Path(f'task/path{ii}') for ii in range(2)]
+        for idx,ii in enumerate(self.task_paths):
+            ii.mkdir(parents=True, exist_ok=True)
+            (ii/lmp_conf_name).write_text(f'foo{idx}')
+            (ii/lmp_input_name).write_text(f'bar{idx}')
+        self.model_path = Path('models/path')
+        self.model_path.mkdir(parents=True, exist_ok=True)
+        self.task_names = ['task_000', 'task_001']
+        self.models = [self.model_path/Path(f'model_{ii}.pb') for ii in range(2)]
+        for idx,ii in enumerate(self.models):
+            ii.write_text(f'model{idx}')
+        
+    def tearDown(self):
+        for ii in ['task', 'models'] + self.task_names:
+            if Path(ii).is_dir():
+                shutil.rmtree(ii)
+        if Path(lmp_partition_input_name).is_file():
+            os.remove(lmp_partition_input_name)
+
+    @patch('dpgen2.op.run_lmp.run_command')
+    def test_success(self, mocked_run):
+        mocked_run.side_effect = [ (0, 'foo\n', '') ]
+        op = RunLmpPartition()
+        out = op.execute(
+            OPIO({
+                'config' : {'command' : 'mpirun -np {nprocs} mylmp', 'partition_procs' : 2},
+                'task_name' : self.task_names,
+                'task_path' : self.task_paths,
+                'models' : self.models,
+            }))
+        work_dirs = [Path(ii) for ii in self.task_names]
+        # check output
+        self.assertEqual(out['log'], [ii/lmp_log_name for ii in work_dirs])
+        self.assertEqual(out['traj'], [ii/lmp_traj_name for ii in work_dirs])
+        self.assertEqual(out['model_devi'], [ii/lmp_model_devi_name for ii in work_dirs])
+        # check call
+        calls = [
+            call(' '.join(['mpirun -np 4 mylmp', '-partition', '2x2', '-i', lmp_partition_input_name, '-log', lmp_partition_log_name]), shell=True),
+        ]
+        mocked_run.assert_has_calls(calls)
+        # check the master input
+        self.assertEqual(
+            Path(lmp_partition_input_name).read_text().split('\n'),
+            [
+                'variable        TASK            world task_000 task_001',
+                'shell           cd ${TASK}',
+                f'log             {lmp_log_name}',
+                f'include         {lmp_input_name}',
+                '',
+            ])
+        # check input files are correctly linked
+        for idx,ii in enumerate(work_dirs):
+            self.assertEqual((ii/lmp_conf_name).read_text(), f'foo{idx}')
+            self.assertEqual((ii/lmp_input_name).read_text(), f'bar{idx}')
+            for jj in range(2):
+                self.assertEqual((ii/(model_name_pattern%jj)).read_text(), f'model{jj}')
+
+    @patch('dpgen2.op.run_lmp.run_command')
+    def test_error(self, mocked_run):
+        mocked_run.side_effect = [ (1, 'foo\n', '') ]
+        op = RunLmpPartition()
+        with self.assertRaises(TransientError) as ee:
+            out = op.execute(
+                OPIO({
+                    'config' : {'command' : 'mylmp'},
+                    'task_name' : self.task_names,
+                    'task_path' : self.task_paths,
+                    'models' : self.models,
+                }))
+        calls = [
+            call(' '.join(['mylmp', '-partition', '2x1', '-i', lmp_partition_input_name, '-log', lmp_partition_log_name]), shell=True),
+        ]
+        mocked_run.assert_has_calls(calls)
+
+    @patch('dpgen2.op.run_lmp.run_command')
+    def test_halted(self, mocked_run):
+        # one partition halted, the other finished
+        def run_halted(*args, **kwargs):
+            Path(self.task_names[0], lmp_log_name).write_text(
+                'WARNING: Fix halt condition for fix-id halt met on step 100 with value 2\n')
+            Path(self.task_names[1], lmp_log_name).write_text(
+                'Total wall time: 0:00:10\n')
+            return (1, 'foo\n', '')
+        mocked_run.side_effect = run_halted
+        op = RunLmpPartition()
+        out = op.execute(
+            OPIO({
+                'config' : {'command' : 'mylmp'},
+                'task_name' : self.task_names,
+                'task_path' : self.task_paths,
+                'models' : self.models,
+            }))
+        self.assertEqual(out['log'], [Path(ii)/lmp_log_name for ii in self.task_names])
+
+    @patch('dpgen2.op.run_lmp.run_command')
+    def test_halted_error(self, mocked_run):
+        # one partition halted, the other failed
+        def run_halted(*args, **kwargs):
+            Path(self.task_names[0], lmp_log_name).write_text(
+                'WARNING: Fix halt condition for fix-id halt met on step 100 with value 2\n')
+            Path(self.task_names[1], lmp_log_name).write_text(
+                'ERROR: Lost atoms\n')
+            return (1, 'foo\n', '')
+        mocked_run.side_effect = run_halted
+        op = RunLmpPartition()
+        with self.assertRaises(TransientError) as ee:
+            out = op.execute(
+                OPIO({
+                    'config' : {'command' : 'mylmp'},
+                    'task_name' : self.task_names,
+                    'task_path' : self.task_paths,
+                    'models' : self.models,
+                }))
+        self.assertIn(self.task_names[1], str(ee.exception))
+        self.assertNotIn(self.task_names[0], str(ee.exception))
@@ -42,7 +42,7 @@ from context import (
 )
 from dpgen2.op.prep_lmp import PrepLmp
 from dpgen2.superop.prep_run_lmp import PrepRunLmp
-from dpgen2.exploration.task import ExplorationTask, ExplorationTaskGroup
+from dpgen2.exploration.task import ExplorationTask, ExplorationTaskGroup, LazyExplorationTaskGroup
 from mocked_ops import (
     mocked_numb_models,
     MockedRunLmp,
@@ -58,6 +58,7 @@ from dpgen2.constants import (
     lmp_traj_name,
     lmp_log_name,
     lmp_model_devi_name,
+    lmp_file_store_name,
 )
 from dpgen2.utils.step_config import normalize as normalize_step_dict
 default_config = normalize_step_dict(
@@ -109,6 +110,8 @@ class TestPrepLmp(unittest.TestCase):
             work_path = Path(lmp_task_pattern % ii)
             if work_path.is_dir():
                 shutil.rmtree(work_path)
+        if Path(lmp_file_store_name).is_dir():
+            shutil.rmtree(lmp_file_store_name)
 
     def test(self):
         op = PrepLmp()
@@ -121,6 +124,41 @@ class TestPrepLmp(unittest.TestCase):
         self.assertEqual(tdirs, out['task_names'])
         self.assertEqual(tdirs, [str(ii) for ii in out['task_paths']])
 
+    def test_lazy(self):
+        # the tasks of the lazy group are streamed to the task dirs
+        lazy_group = LazyExplorationTaskGroup()
+        for ii in range(self.ngrp):
+            grp = ExplorationTaskGroup()
+            for jj in range(self.ntask_per_grp):
+                grp.add_task(self.task_group_list[ii * self.ntask_per_grp + jj])
+            lazy_group.add_group(grp)
+        op = PrepLmp()
+        out = op.execute( OPIO({
+            'lmp_task_grp' : lazy_group,
+        }) )
+        tdirs = check_lmp_tasks(self, self.ngrp, self.ntask_per_grp)
+        self.assertEqual([str(ii) for ii in tdirs], out['task_names'])
+
+    def test_shared_files(self):
+        # the tasks sharing the conf are linked to the same file
+        task_group = ExplorationTaskGroup()
+        for ii in range(3):
+            task_group.add_task(
+                ExplorationTask()
+                .add_file(lmp_conf_name, 'shared conf')
+                .add_file(lmp_input_name, f'input {ii}')
+            )
+        op = PrepLmp()
+        out = op.execute( OPIO({
+            'lmp_task_grp' : task_group,
+        }) )
+        confs = [Path(ii)/lmp_conf_name for ii in out['task_paths']]
+        for ii in range(3):
+            self.assertEqual(confs[ii].read_text(), 'shared conf')
+            self.assertEqual(
+                (Path(out['task_paths'][ii])/lmp_input_name).read_text(), f'input {ii}')
+        self.assertEqual(len(set(os.stat(ii).st_ino for ii in confs)), 1)
+
 
 
 class TestMockedRunLmp(unittest.TestCase):
@@ -273,3 +311,46 @@ class TestPrepRunLmp(unittest.TestCase):
         for ii in step.outputs.parameters['task_names'].value:
             self.check_run_lmp_output(ii, self.model_list)
             
+
+
+    def test_group(self):
+        # 4 slices, the tasks of each slice are run in parallel
+        steps = PrepRunLmp(
+            "prep-run-lmp",
+            PrepLmp,
+            MockedRunLmp,
+            upload_python_package = upload_python_package,
+            prep_config = default_config,
+            run_config = default_config,
+            group_size = 2,
+            pool_size = 2,
+        )        
+        prep_run_step = Step(
+            'prep-run-step', 
+            template = steps,
+            parameters = {
+                "lmp_config" : {},
+                "lmp_task_grp" : self.task_group_list,
+            },
+            artifacts = {
+                "models" : self.models,
+            },
+        )
+
+        wf = Workflow(name="dp-train", host=default_host)
+        wf.add(prep_run_step)
+        wf.submit()
+        
+        while wf.query_status() in ["Pending", "Running"]:
+            time.sleep(4)
+
+        self.assertEqual(wf.query_status(), "Succeeded")
+        step = wf.query_step(name="prep-run-step")[0]
+        self.assertEqual(step.phase, "Succeeded")
+
+        download_artifact(step.outputs.artifacts["model_devis"])
+        download_artifact(step.outputs.artifacts["trajs"])
+        download_artifact(step.outputs.artifacts["logs"])
+
+        for ii in step.outputs.parameters['task_names'].value:
+            self.check_run_lmp_output(ii, self.model_list)
@@ -0,0 +1,50 @@
+from utils.context import dpgen2
+import numpy as np
+import unittest, dpdata
+from dpgen2.utils.cluster_carve import (
+    carve_cluster,
+    carve_system,
+)
+
+class TestCarveCluster(unittest.TestCase):
+    def setUp(self):
+        self.cell = np.eye(3) * 10.
+        self.coords = np.array([
+            [0.5, 0.5, 0.5],
+            [9.5, 0.5, 0.5],
+            [2.0, 0.5, 0.5],
+            [5.0, 5.0, 5.0],
+        ])
+        self.atom_types = np.array([0, 1, 1, 0])
+
+    def test_pbc(self):
+        cc, tt, bb = carve_cluster(
+            self.coords, self.cell, self.atom_types, 0, 2.0, vacuum=6.)
+        np.testing.assert_equal(tt, [0, 1, 1])
+        np.testing.assert_almost_equal(bb, np.eye(3) * 10.)
+        # the center atom is at the center of the box
+        np.testing.assert_almost_equal(cc[0], [5., 5., 5.])
+        # the periodic image is used
+        np.testing.assert_almost_equal(cc[1], [4., 5., 5.])
+        np.testing.assert_almost_equal(cc[2], [6.5, 5., 5.])
+
+    def test_nopbc(self):
+        cc, tt, bb = carve_cluster(
+            self.coords, self.cell, self.atom_types, 0, 2.0, vacuum=6., nopbc=True)
+        np.testing.assert_equal(tt, [0, 1])
+        np.testing.assert_almost_equal(cc[1], [6.5, 5., 5.])
+
+    def test_carve_system(self):
+        ss = dpdata.System()
+        ss.data['atom_names'] = ['O', 'H']
+        ss.data['atom_numbs'] = [2, 2]
+        ss.data['atom_types'] = self.atom_types
+        ss.data['orig'] = np.zeros(3)
+        ss.data['cells'] = np.tile(self.cell, [2, 1, 1])
+        ss.data['coords'] = np.tile(self.coords, [2, 1, 1])
+        ms = carve_system(ss, [0, 3], 2.0)
+        self.assertEqual(ms.get_nframes(), 2)
+        self.assertEqual(sorted([ii.get_natoms() for ii in ms]), [1, 3])
+        for ii in ms:
+            self.assertFalse(ii.nopbc)
+            np.testing.assert_almost_equal(ii['cells'][0], np.eye(3) * 14.)
@@ -0,0 +1,48 @@
+from utils.context import dpgen2
+import os, shutil
+import unittest
+from pathlib import Path
+from mock import patch
+from dpgen2.utils.content_store import (
+    ContentStore,
+)
+
+class TestContentStore(unittest.TestCase):
+    def setUp(self):
+        self.store = ContentStore('store')
+        self.work = Path('foo')
+        self.work.mkdir(exist_ok=True)
+
+    def tearDown(self):
+        for ii in ['store', 'foo']:
+            if Path(ii).is_dir():
+                shutil.rmtree(ii)
+
+    def test_put(self):
+        p0 = self.store.put('foo')
+        p1 = self.store.put('foo')
+        p2 = self.store.put('bar')
+        self.assertEqual(p0, p1)
+        self.assertNotEqual(p0, p2)
+        self.assertEqual(p0.read_text(), 'foo')
+        self.assertEqual(len(list(Path('store').iterdir())), 2)
+
+    def test_link(self):
+        self.store.link('foo', self.work/'a')
+        self.store.link('foo', self.work/'b')
+        self.store.link('bar', self.work/'c')
+        self.assertEqual((self.work/'a').read_text(), 'foo')
+        self.assertEqual((self.work/'c').read_text(), 'bar')
+        self.assertTrue(os.path.samefile(self.work/'a', self.work/'b'))
+        self.assertFalse(os.path.samefile(self.work/'a', self.work/'c'))
+        # replace the existing file
+        self.store.link('bar', self.work/'a')
+        self.assertEqual((self.work/'a').read_text(), 'bar')
+        self.assertEqual((self.work/'b').read_text(), 'foo')
+
+    @patch('dpgen2.utils.content_store.os.link')
+    def test_link_fallback_copy(self, mocked_link):
+        mocked_link.side_effect = OSError('cross-device link')
+        self.store.link('foo', self.work/'a')
+        self.assertEqual((self.work/'a').read_text(), 'foo')
+        self.assertFalse(os.path.samefile(self.work/'a', self.store.put('foo')))
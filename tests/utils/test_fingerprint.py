@@ -0,0 +1,105 @@
+from utils.context import dpgen2
+import numpy as np
+import unittest
+from dpgen2.utils.fingerprint import (
+    radial_fingerprint,
+    radial_fingerprints,
+    dedup_fingerprints,
+    farthest_point_sampling,
+)
+
+class TestRadialFingerprint(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.cell = np.eye(3) * 8.
+        self.coords = rng.uniform(0, 8., [20, 3])
+        self.atom_types = np.array([0] * 12 + [1] * 8)
+
+    def test_shape(self):
+        fp = radial_fingerprint(self.coords, self.cell, self.atom_types, 2, 4.0, 10)
+        self.assertEqual(fp.shape, (30,))
+        fp = radial_fingerprint(self.coords, self.cell, self.atom_types, 3, 4.0, 10)
+        self.assertEqual(fp.shape, (60,))
+
+    def test_invariance(self):
+        fp0 = radial_fingerprint(self.coords, self.cell, self.atom_types, 2, 4.0, 10)
+        # translation
+        fp1 = radial_fingerprint(self.coords + 3.3, self.cell, self.atom_types, 2, 4.0, 10)
+        np.testing.assert_almost_equal(fp0, fp1)
+        # permutation of the atoms of the same type
+        perm = np.concatenate((np.arange(11, -1, -1), np.arange(12, 20)))
+        fp2 = radial_fingerprint(self.coords[perm], self.cell, self.atom_types, 2, 4.0, 10)
+        np.testing.assert_almost_equal(fp0, fp2)
+
+    def test_continuity(self):
+        fp0 = radial_fingerprint(self.coords, self.cell, self.atom_types, 2, 4.0, 10)
+        coords = self.coords.copy()
+        coords[0,0] += 1e-4
+        fp1 = radial_fingerprint(coords, self.cell, self.atom_types, 2, 4.0, 10)
+        self.assertTrue(np.linalg.norm(fp1 - fp0) < 1e-3)
+
+    def test_count(self):
+        # the weights of each pair sum up to one, if the distance is away
+        # from 0 and rcut.
+        coords = np.array([[0., 0., 0.], [1.5, 0., 0.]])
+        fp = radial_fingerprint(coords, self.cell, [0, 1], 2, 4.0, 10, nopbc=True)
+        fp = fp.reshape(3, 10)
+        np.testing.assert_almost_equal(fp[0], 0.)
+        np.testing.assert_almost_equal(fp[2], 0.)
+        self.assertAlmostEqual(np.sum(fp[1]), 1.)
+
+    def test_frames(self):
+        coords = np.array([self.coords, self.coords + 1.])
+        cells = np.array([self.cell, self.cell])
+        fps = radial_fingerprints(coords, cells, self.atom_types, 2, 4.0, 10)
+        self.assertEqual(fps.shape, (2, 30))
+        np.testing.assert_almost_equal(fps[0], fps[1])
+
+    def test_frames_cells(self):
+        # the frames of different cells are binned together
+        rng = np.random.default_rng(2)
+        cells = np.array([self.cell, np.eye(3) * 5., np.diag([3., 9., 7.])])
+        coords = rng.uniform(0, 1, [3, 20, 3]) @ cells
+        for nopbc in [False, True]:
+            fps = radial_fingerprints(coords, cells, self.atom_types, 2, 4.0, 10, nopbc)
+            for ii in range(3):
+                np.testing.assert_almost_equal(fps[ii], radial_fingerprint(
+                    coords[ii], cells[ii], self.atom_types, 2, 4.0, 10, nopbc))
+
+
+class TestDedupFingerprints(unittest.TestCase):
+    def test_dedup(self):
+        fps = np.array([[0., 0.], [0.05, 0.], [1., 0.], [0., 0.08], [1., 0.2]])
+        np.testing.assert_equal(
+            dedup_fingerprints(fps, 0.1), [True, False, True, False, True])
+        np.testing.assert_equal(
+            dedup_fingerprints(fps, 0.), [True] * 5)
+        np.testing.assert_equal(
+            dedup_fingerprints(fps, 10.), [True] + [False] * 4)
+
+    def test_dedup_greedy(self):
+        # the same as the dense greedy scan
+        rng = np.random.default_rng(5)
+        fps = rng.uniform(0, 1, [500, 4])
+        ref = np.zeros(len(fps), dtype=bool)
+        for ii in range(len(fps)):
+            ref[ii] = not np.any(np.linalg.norm(fps[ref] - fps[ii], axis=1) <= 0.1)
+        np.testing.assert_equal(dedup_fingerprints(fps, 0.1), ref)
+        np.testing.assert_equal(dedup_fingerprints(fps, 0.1, chunk_size=7), ref)
+        self.assertEqual(dedup_fingerprints(fps[:0], 0.1).size, 0)
+
+
+class TestFarthestPointSampling(unittest.TestCase):
+    def test_fps(self):
+        fps = np.array([[0., 0.], [0.1, 0.], [1., 0.], [1., 1.], [0., 1.05], [0.5, 0.5]])
+        sel = farthest_point_sampling(fps, 4)
+        np.testing.assert_equal(sel, [0, 3, 4, 2])
+
+    def test_more_than_frames(self):
+        fps = np.zeros([3, 2])
+        sel = farthest_point_sampling(fps, 5)
+        # duplicates are still selected once
+        self.assertEqual(sorted(sel.tolist()), [0, 1, 2])
+
+    def test_empty(self):
+        self.assertEqual(farthest_point_sampling(np.zeros([0, 2]), 2).size, 0)
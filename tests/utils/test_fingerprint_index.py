@@ -0,0 +1,145 @@
+from utils.context import dpgen2
+import numpy as np
+import unittest, shutil
+from pathlib import Path
+from unittest.mock import patch
+from dpgen2.constants import fingerprint_index_name, fingerprint_table_name
+from dpgen2.utils.fingerprint_index import (
+    FingerprintIndex,
+    write_fingerprints,
+    load_fingerprint_index,
+    write_fingerprint_index,
+)
+
+class TestFingerprintIndex(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(2)
+        self.fps = rng.uniform(0, 1, [2000, 20])
+        self.tol = 0.05
+
+    def brute_force(self, fps, query):
+        dist = np.linalg.norm(fps[None,:,:] - query[:,None,:], axis=2)
+        return np.min(dist, axis=1) <= self.tol
+
+    def test_query(self):
+        index = FingerprintIndex(self.tol)
+        index.add(self.fps[:1000])
+        index.add(self.fps[1000:])
+        self.assertEqual(len(index), 2000)
+        rng = np.random.default_rng(3)
+        # perturbed copies are near-duplicates
+        query = self.fps[:100] + rng.normal(0, 0.005, [100, 20])
+        # far away points are not
+        query = np.concatenate((query, rng.uniform(2, 3, [100, 20])))
+        found = index.query(query)
+        ref = self.brute_force(self.fps, query)
+        # no false positive, and few misses
+        self.assertFalse(np.any(np.logical_and(found, np.logical_not(ref))))
+        self.assertTrue(np.sum(found) >= 0.95 * np.sum(ref))
+        self.assertTrue(np.all(found[:100]))
+        self.assertFalse(np.any(found[100:]))
+
+    def test_chunks(self):
+        index = FingerprintIndex(self.tol)
+        index.add(self.fps)
+        chunked = FingerprintIndex(self.tol, max_pairs=7)
+        chunked.add(self.fps)
+        rng = np.random.default_rng(3)
+        query = self.fps[:300] + rng.normal(0, 0.02, [300, 20])
+        np.testing.assert_equal(chunked.query(query), index.query(query))
+
+    def test_add(self):
+        # the tables extended by the new fingerprints are the same as the
+        # tables built at once
+        index = FingerprintIndex(self.tol)
+        index.add(self.fps[:700])
+        index.add(self.fps[700:])
+        ref = FingerprintIndex(self.tol)
+        ref.add(self.fps)
+        for (kk, oo), (rk, ro) in zip(index.tables, ref.tables):
+            np.testing.assert_equal(kk, rk)
+            np.testing.assert_equal(oo, ro)
+
+    def test_empty(self):
+        index = FingerprintIndex(self.tol)
+        self.assertEqual(len(index), 0)
+        np.testing.assert_equal(index.query(self.fps[:3]), [False] * 3)
+
+    def test_dim_mismatch(self):
+        index = FingerprintIndex(self.tol)
+        index.add(self.fps)
+        with self.assertRaises(RuntimeError):
+            index.query(np.zeros([2, 3]))
+
+
+class TestLoadFingerprintIndex(unittest.TestCase):
+    def setUp(self):
+        self.dirs = [Path('iter.000'), Path('iter.001'), Path('iter.002')]
+        for ii in self.dirs:
+            ii.mkdir()
+        write_fingerprints(self.dirs[0], np.zeros([2, 3]), 6.0, 30)
+        write_fingerprints(self.dirs[1], np.ones([3, 3]), 6.0, 30)
+
+    def tearDown(self):
+        for ii in self.dirs:
+            shutil.rmtree(ii, ignore_errors=True)
+
+    def test_load(self):
+        self.assertTrue((self.dirs[0] / fingerprint_index_name).is_file())
+        index = load_fingerprint_index(self.dirs, 0.1, 6.0, 30)
+        # iter.002 has no fingerprint
+        self.assertEqual(len(index), 5)
+        np.testing.assert_equal(index.query(np.zeros([1, 3])), [True])
+        np.testing.assert_equal(index.query(np.ones([1, 3])), [True])
+        np.testing.assert_equal(index.query(np.full([1, 3], 0.5)), [False])
+
+    def test_mismatch(self):
+        write_fingerprints(self.dirs[2], np.ones([3, 3]), 5.0, 30)
+        with self.assertRaises(RuntimeError):
+            load_fingerprint_index(self.dirs, 0.1, 6.0, 30)
+
+    def count_hashed(self, func, *args):
+        # the number of fingerprints hashed by the first table
+        keys = FingerprintIndex._keys
+        hashed = []
+        def counted(index, fps, table):
+            if table == 0:
+                hashed.append(len(fps))
+            return keys(index, fps, table)
+        with patch.object(FingerprintIndex, '_keys', counted):
+            ret = func(*args)
+        return ret, sum(hashed)
+
+    def test_persist(self):
+        index = write_fingerprint_index(self.dirs[:2], 0.1, 6.0, 30)
+        self.assertTrue((self.dirs[1] / fingerprint_table_name).is_file())
+        self.assertEqual(len(index), 5)
+        # the persisted tables are reused
+        loaded, hashed = self.count_hashed(
+            load_fingerprint_index, self.dirs[:2], 0.1, 6.0, 30)
+        self.assertEqual(hashed, 0)
+        self.assertEqual(len(loaded), 5)
+        for (kk, oo), (rk, ro) in zip(loaded.tables, index.tables):
+            np.testing.assert_equal(kk, rk)
+            np.testing.assert_equal(oo, ro)
+        np.testing.assert_equal(loaded.query(np.ones([1, 3])), [True])
+        # only the new fingerprints are hashed
+        write_fingerprints(self.dirs[2], np.full([4, 3], 0.5), 6.0, 30)
+        loaded, hashed = self.count_hashed(
+            load_fingerprint_index, self.dirs, 0.1, 6.0, 30)
+        self.assertEqual(hashed, 4)
+        self.assertEqual(len(loaded), 9)
+        np.testing.assert_equal(loaded.query(np.full([1, 3], 0.5)), [True])
+        # rebuilt if the tolerance is changed
+        loaded, hashed = self.count_hashed(
+            load_fingerprint_index, self.dirs, 0.2, 6.0, 30)
+        self.assertEqual(hashed, 9)
+
+    def test_persist_changed(self):
+        write_fingerprint_index(self.dirs[:2], 0.1, 6.0, 30)
+        # rebuilt if the covered fingerprints are changed
+        write_fingerprints(self.dirs[0], np.zeros([4, 3]), 6.0, 30)
+        loaded, hashed = self.count_hashed(
+            load_fingerprint_index, self.dirs[:2], 0.1, 6.0, 30)
+        self.assertEqual(hashed, 7)
+        self.assertEqual(len(loaded), 7)
@@ -0,0 +1,70 @@
+from utils.context import dpgen2
+import numpy as np
+import unittest, textwrap, os, dpdata
+from pathlib import Path
+from dpgen2.utils.lmp_dump_index import (
+    make_dump_index,
+    read_dump_timesteps,
+    read_dump_frames,
+)
+
+frame_template = textwrap.dedent(
+    """ITEM: TIMESTEP
+    %d
+    ITEM: NUMBER OF ATOMS
+    2
+    ITEM: BOX BOUNDS xy xz yz pp pp pp
+    0.0000000000000000e+00 1.0000000000000000e+01 0.0000000000000000e+00
+    0.0000000000000000e+00 1.0000000000000000e+01 0.0000000000000000e+00
+    0.0000000000000000e+00 1.0000000000000000e+01 0.0000000000000000e+00
+    ITEM: ATOMS id type x y z fx fy fz
+    1 1 %f 1.0 1.0 0.0 0.0 0.0
+    2 2 2.0 2.0 2.0 0.0 0.0 0.0
+    """)
+
+class TestDumpIndex(unittest.TestCase):
+    def setUp(self):
+        self.fname = Path('foo.dump')
+        self.nframes = 5
+        self.fname.write_text(''.join(
+            [frame_template % (ii * 10, 0.5 * ii) for ii in range(self.nframes)]))
+        self.type_map = ['A', 'B']
+
+    def tearDown(self):
+        if self.fname.is_file():
+            os.remove(self.fname)
+
+    def test_index(self):
+        index = make_dump_index(self.fname)
+        self.assertEqual(index.size, self.nframes + 1)
+        self.assertEqual(index[0], 0)
+        self.assertEqual(index[-1], os.path.getsize(self.fname))
+        content = self.fname.read_bytes()
+        for ii in range(self.nframes):
+            self.assertTrue(content[index[ii]:].startswith(b'ITEM: TIMESTEP'))
+
+    def test_empty(self):
+        self.fname.write_text('')
+        index = make_dump_index(self.fname)
+        np.testing.assert_equal(index, [0])
+
+    def test_read_timesteps(self):
+        steps = read_dump_timesteps(self.fname)
+        np.testing.assert_equal(steps, [0, 10, 20, 30, 40])
+        self.fname.write_text('')
+        self.assertEqual(read_dump_timesteps(self.fname).size, 0)
+
+    def test_read_frames(self):
+        frames = [3, 1, 4]
+        ss = read_dump_frames(self.fname, frames, self.type_map)
+        ref = dpdata.System(str(self.fname), fmt='lammps/dump', type_map=self.type_map)
+        ref = ref.sub_system(frames)
+        self.assertEqual(ss.get_nframes(), 3)
+        self.assertEqual(ss['atom_names'], ref['atom_names'])
+        np.testing.assert_equal(ss['atom_types'], ref['atom_types'])
+        np.testing.assert_almost_equal(ss['coords'], ref['coords'])
+        np.testing.assert_almost_equal(ss['cells'], ref['cells'])
+
+    def test_read_frames_out_of_range(self):
+        with self.assertRaises(IndexError):
+            read_dump_frames(self.fname, [self.nframes], self.type_map)
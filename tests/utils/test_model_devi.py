@@ -0,0 +1,79 @@
+from utils.context import dpgen2
+import numpy as np
+import unittest, textwrap, os
+from pathlib import Path
+from dpgen2.utils.model_devi import (
+    load_model_devi,
+    load_atomic_model_devi,
+)
+
+class TestModelDevi(unittest.TestCase):
+    def setUp(self):
+        self.fname = Path('foo.md')
+        self.fname.write_text(textwrap.dedent(
+            """#       step         max_devi_v         min_devi_v         avg_devi_v         max_devi_f         min_devi_f         avg_devi_f
+            0 0.1 0.0 0.0 0.2 0.0 0.0
+            10 0.2 0.0 0.0 0.3 0.0 0.0
+            20 0.3 0.0 0.0 0.4 0.0 0.0
+            """))
+
+    def tearDown(self):
+        if self.fname.is_file():
+            os.remove(self.fname)
+
+    def test_columns(self):
+        dd = load_model_devi(self.fname, columns=[4, 1])
+        np.testing.assert_almost_equal(dd, [[0.2, 0.3, 0.4], [0.1, 0.2, 0.3]])
+
+    def test_all_columns(self):
+        dd = load_model_devi(self.fname)
+        self.assertEqual(dd.shape, (7, 3))
+        np.testing.assert_almost_equal(dd[0], [0, 10, 20])
+
+    def test_no_atomic(self):
+        dd = load_atomic_model_devi(self.fname)
+        self.assertEqual(dd.shape, (3, 0))
+
+
+class TestAtomicModelDevi(unittest.TestCase):
+    def setUp(self):
+        self.fname = Path('foo.md')
+        self.fname.write_text(textwrap.dedent(
+            """#       step         max_devi_v         min_devi_v         avg_devi_v         max_devi_f         min_devi_f         avg_devi_f
+            0 0.1 0.0 0.0 0.2 0.0 0.0 0.2 0.1 0.0
+            10 0.2 0.0 0.0 0.3 0.0 0.0 0.1 0.3 0.2
+            20 0.3 0.0 0.0 0.4 0.0 0.0 0.0 0.1 0.4
+            """))
+
+    def tearDown(self):
+        if self.fname.is_file():
+            os.remove(self.fname)
+
+    def test_frame_columns(self):
+        dd = load_model_devi(self.fname)
+        self.assertEqual(dd.shape, (7, 3))
+        np.testing.assert_almost_equal(dd[4], [0.2, 0.3, 0.4])
+
+    def test_atomic(self):
+        dd = load_atomic_model_devi(self.fname)
+        self.assertEqual(dd.dtype, np.float32)
+        np.testing.assert_almost_equal(
+            dd, [[0.2, 0.1, 0.0], [0.1, 0.3, 0.2], [0.0, 0.1, 0.4]])
+        dd = load_atomic_model_devi(self.fname, frames=[2, 0])
+        np.testing.assert_almost_equal(dd, [[0.0, 0.1, 0.4], [0.2, 0.1, 0.0]])
+
+    def test_atomic_selected_frames(self):
+        # the lines of the frames not requested are not parsed
+        self.fname.write_text(textwrap.dedent(
+            """#       step         max_devi_v         min_devi_v         avg_devi_v         max_devi_f         min_devi_f         avg_devi_f
+            0 0.1 0.0 0.0 0.2 0.0 0.0 0.2 0.1 0.0
+            10 0.2 0.0 0.0 0.3 0.0 0.0 0.1 0.3 0.2
+            20 0.3 0.0 0.0 0.4 0.0 0.0 foo bar baz
+            """))
+        dd = load_atomic_model_devi(self.fname, frames=[1])
+        np.testing.assert_almost_equal(dd, [[0.1, 0.3, 0.2]])
+        # nor the per-atom columns by the frame columns
+        dd = load_model_devi(self.fname, columns=[0, 4])
+        np.testing.assert_almost_equal(dd, [[0, 10, 20], [0.2, 0.3, 0.4]])
+        with self.assertRaises(RuntimeError):
+            load_atomic_model_devi(self.fname, frames=[3])
@@ -0,0 +1,97 @@
+from utils.context import dpgen2
+import numpy as np
+import unittest, itertools
+from dpgen2.utils.neighbor_list import (
+    neighbor_pairs,
+    batched_neighbor_pairs,
+    cluster_labels,
+)
+
+def brute_force_pairs(coords, cell, rcut, nopbc, nimg=3):
+    natoms = coords.shape[0]
+    rng = range(-nimg, nimg+1) if not nopbc else [0]
+    ret = []
+    for ii in range(natoms):
+        for jj in range(natoms):
+            for shift in itertools.product(rng, rng, rng):
+                shift = np.array(shift)
+                if ii == jj and not shift.any():
+                    continue
+                dd = np.linalg.norm(coords[jj] + shift @ cell - coords[ii])
+                if dd < rcut:
+                    ret.append((ii, jj, round(dd, 8)))
+    return sorted(ret)
+
+
+class TestNeighborPairs(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(20)
+        self.cell = np.array([[4.0, 0.0, 0.0], [1.0, 3.5, 0.0], [0.5, -0.5, 5.0]])
+        self.coords = rng.uniform(0, 1, [30, 3]) @ self.cell
+        # some atoms are out of the cell
+        self.coords[:5] += self.cell[0] * 2.
+
+    def check(self, rcut, nopbc):
+        ii, jj, dd = neighbor_pairs(self.coords, self.cell, rcut, nopbc)
+        got = sorted(zip(ii.tolist(), jj.tolist(), np.round(dd, 8).tolist()))
+        self.assertEqual(got, brute_force_pairs(self.coords, self.cell, rcut, nopbc))
+
+    def test_pbc(self):
+        self.check(1.5, False)
+
+    def test_pbc_large_rcut(self):
+        # rcut is larger than the half of the cell
+        self.check(3.2, False)
+
+    def test_nopbc(self):
+        self.check(1.5, True)
+
+    def test_empty(self):
+        ii, jj, dd = neighbor_pairs(np.zeros([0, 3]), self.cell, 1.5)
+        self.assertEqual(ii.size, 0)
+
+
+class TestBatchedNeighborPairs(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(21)
+        # the cells differ in the numbers of bins, the last one is thinner
+        # than rcut along its first axis
+        self.cells = np.array([
+            [[4.0, 0.0, 0.0], [1.0, 3.5, 0.0], [0.5, -0.5, 5.0]],
+            [[7.0, 0.0, 0.0], [0.0, 6.0, 0.0], [0.0, 0.0, 6.5]],
+            [[1.2, 0.0, 0.0], [0.3, 5.0, 0.0], [0.0, 0.0, 4.0]],
+        ])
+        self.coords = rng.uniform(0, 1, [3, 20, 3]) @ self.cells
+
+    def check(self, rcut, nopbc):
+        ff, ii, jj, dd = batched_neighbor_pairs(self.coords, self.cells, rcut, nopbc)
+        for kk in range(len(self.coords)):
+            sel = ff == kk
+            got = sorted(zip(ii[sel].tolist(), jj[sel].tolist(), np.round(dd[sel], 8).tolist()))
+            self.assertEqual(got, brute_force_pairs(
+                self.coords[kk], self.cells[kk], rcut, nopbc))
+
+    def test_pbc(self):
+        self.check(1.5, False)
+
+    def test_nopbc(self):
+        self.check(1.5, True)
+
+    def test_empty(self):
+        ff, ii, jj, dd = batched_neighbor_pairs(np.zeros([0, 4, 3]), np.zeros([0, 3, 3]), 1.5)
+        self.assertEqual(ff.size, 0)
+
+
+class TestClusterLabels(unittest.TestCase):
+    def test_labels(self):
+        ii = np.array([0, 1, 4, 5])
+        jj = np.array([1, 2, 5, 6])
+        labels = cluster_labels(7, ii, jj)
+        np.testing.assert_equal(labels, [0, 0, 0, 3, 4, 4, 4])
+
+    def test_chain(self):
+        # a long chain in reversed order needs more than one propagation
+        ii = np.arange(99, 0, -1)
+        jj = ii - 1
+        labels = cluster_labels(100, ii, jj)
+        np.testing.assert_equal(labels, np.zeros(100))